@@ -0,0 +1,268 @@
+"""Time the load -> adjust -> quantize -> preview -> export pipeline and record peak memory
+
+Usage:
+    python benchmarks/bench_pipeline.py [IMAGE ...] [-o results.json]
+    python benchmarks/bench_pipeline.py --compare baseline.json [--threshold 0.2]
+
+Every (image, grid width) case runs in a fresh worker process so the peak
+RSS it reports is its own. Per case the stages are timed as the GUI runs
+them: decode, adjustments, quantization, dice list, project save and load,
+the fitted preview, and for every die size a zoomed preview and the
+streamed image export. Previews start from a cold viewport cache. Exports
+larger than --max-export-pixels are skipped and recorded as null. Each
+case also records the fidelity metrics of its grid (see dice_art.metrics).
+
+Results are written as JSON. With --compare the run is checked against an
+earlier results file and the script exits with status 1 when any stage or
+peak RSS got slower or larger than the threshold allows, or the fidelity
+score dropped by more than MAX_SCORE_DROP.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dice_art import metrics, pipeline  # noqa: E402
+from dice_art.loader import IMAGE_LOADER  # noqa: E402
+from dice_art.project import DiceProject, load_project, save_project  # noqa: E402
+from dice_art.viewport import MosaicViewport  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_IMAGES = (os.path.join(ROOT, "example.png"), "synthetic:gradient", "synthetic:noise")
+SYNTHETIC_SIZE = (1600, 1200)
+DEFAULT_WIDTHS = (10, 100, 300, 1000)
+DEFAULT_DIE_SIZES = (5, 20, 100)
+VIEW_SIZE = (800, 600)
+
+# Exports above this many pixels are skipped (1000 dice at 100px is ~5.6 gigapixels)
+MAX_EXPORT_PIXELS = 250_000_000
+
+# Differences below this are timer noise, whatever the ratio
+MIN_DELTA_SECONDS = 0.005
+
+# Largest fall in fidelity score not reported as a quality regression
+MAX_SCORE_DROP = 0.01
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def synthetic_image(kind, size=SYNTHETIC_SIZE):
+    width, height = size
+    if kind == "gradient":
+        x = np.linspace(0, 255, width)
+        y = np.linspace(0, 255, height)[:, None]
+        rgb = np.stack([np.broadcast_to(x, (height, width)), np.broadcast_to(y, (height, width)),
+                        (x + y) / 2], axis=-1)
+    elif kind == "noise":
+        rgb = np.random.default_rng(0).integers(0, 256, (height, width, 3))
+    else:
+        raise ValueError(f"Unknown synthetic image '{kind}'")
+    return Image.fromarray(rgb.astype(np.uint8), "RGB")
+
+
+def best_time(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_case(path, width, die_sizes, mapping, color, repeat, max_export_pixels, work_dir):
+    """Time every stage for one image and grid width; runs in its own process"""
+    start_rss = peak_rss_mb()
+    timings = {}
+
+    # Cleared on every run, so each one times a decode rather than a cache hit
+    def load():
+        IMAGE_LOADER.clear()
+        return pipeline.load_image(path)
+
+    timings["load"], img = best_time(load, repeat)
+    timings["adjust"], adjusted = best_time(lambda: pipeline.adjust_image(img, 1.1, 1.2), repeat)
+    timings["quantize"], grid = best_time(
+        lambda: pipeline.quantize_image(adjusted, width, mapping, color), repeat)
+    reference = pipeline.resample_image(adjusted, width, "perceptual")
+    timings["metrics"], grid_metrics = best_time(lambda: metrics.compare(grid, reference, color), repeat)
+    timings["dice_list"], _ = best_time(lambda: pipeline.format_dice_list(grid, color), repeat)
+
+    project_path = os.path.join(work_dir, f"bench_{os.getpid()}.diceproj")
+    project = DiceProject(grid, width, color, 1.1, 1.2, mapping, source=img)
+    timings["project_save"], _ = best_time(lambda: save_project(project_path, project), repeat)
+
+    def load():
+        loaded = load_project(project_path)
+        return int(np.asarray(loaded.grid).sum()), loaded.source
+    timings["project_load"], _ = best_time(load, repeat)
+    os.remove(project_path)
+
+    export_path = os.path.join(work_dir, f"bench_{os.getpid()}.png")
+    height, grid_width = grid.shape
+    timings["preview"], _ = best_time(lambda: MosaicViewport(grid, color, VIEW_SIZE).render(), repeat)
+
+    def zoomed_preview(die_size):
+        view = MosaicViewport(grid, color, VIEW_SIZE)
+        view.set_zoom(die_size)
+        return view.render()
+
+    for die_size in die_sizes:
+        timings[f"preview[d={die_size}]"], _ = best_time(lambda: zoomed_preview(die_size), repeat)
+        if grid_width * height * die_size * die_size > max_export_pixels:
+            timings[f"export[d={die_size}]"] = None
+            continue
+        timings[f"export[d={die_size}]"], _ = best_time(
+            lambda: pipeline.export_image(grid, export_path, color, die_size), repeat)
+        os.remove(export_path)
+
+    return {
+        "grid": [grid_width, height],
+        "timings": timings,
+        "metrics": grid_metrics,
+        "start_rss_mb": start_rss,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pillow": Image.__version__,
+    }
+
+
+def prepare_images(images, work_dir):
+    """Return [(name, path)], writing synthetic images to work_dir so their decode is timed too"""
+    prepared = []
+    for image in images:
+        if image.startswith("synthetic:"):
+            kind = image.split(":", 1)[1]
+            path = os.path.join(work_dir, f"{kind}.png")
+            synthetic_image(kind).save(path)
+            prepared.append((image, path))
+        else:
+            prepared.append((os.path.basename(image), image))
+    return prepared
+
+
+def run_benchmarks(args):
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name, path in prepare_images(args.images, work_dir):
+            for width in args.widths:
+                case = f"{name} w={width}"
+                # A fresh process per case keeps peak RSS per case
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                    result = pool.submit(run_case, path, width, args.die_sizes, args.mapping, args.color,
+                                         args.repeat, args.max_export_pixels, work_dir).result()
+                result.update(case=case, image=name, width=width)
+                results.append(result)
+                print(format_result(result), flush=True)
+    return {"environment": environment(), "mapping": args.mapping, "color": args.color, "results": results}
+
+
+def format_result(result):
+    stages = " ".join(f"{stage}={'skip' if seconds is None else f'{seconds * 1000:.1f}ms'}"
+                      for stage, seconds in result["timings"].items())
+    rss = result["peak_rss_mb"]
+    return (f"{result['case']:<28} {stages} peak_rss={'n/a' if rss is None else f'{rss:.0f}MB'} "
+            f"score={result['metrics']['score']:.3f}")
+
+
+def compare(current, baseline, threshold):
+    """Return a list of regression messages between two results documents"""
+    previous = {r["case"]: r for r in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = previous.get(result["case"])
+        if old is None:
+            continue
+        for stage, seconds in result["timings"].items():
+            before = old["timings"].get(stage)
+            if seconds is None or before is None:
+                continue
+            if seconds > before * (1 + threshold) and seconds - before > MIN_DELTA_SECONDS:
+                regressions.append(f"{result['case']} {stage}: {before * 1000:.1f}ms -> {seconds * 1000:.1f}ms "
+                                   f"(+{(seconds / before - 1) * 100:.0f}%)")
+        before, after = old.get("peak_rss_mb"), result.get("peak_rss_mb")
+        if before and after and after > before * (1 + threshold):
+            regressions.append(f"{result['case']} peak RSS: {before:.0f}MB -> {after:.0f}MB "
+                               f"(+{(after / before - 1) * 100:.0f}%)")
+        # Results written before metrics were recorded have none
+        before, after = old.get("metrics"), result.get("metrics")
+        if before and after and before["score"] - after["score"] > MAX_SCORE_DROP:
+            regressions.append(f"{result['case']} fidelity score: {before['score']:.3f} -> {after['score']:.3f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("images", nargs="*", default=list(DEFAULT_IMAGES),
+                        help="image files or synthetic:gradient / synthetic:noise")
+    parser.add_argument("--widths", nargs="+", type=int, default=list(DEFAULT_WIDTHS))
+    parser.add_argument("--die-sizes", nargs="+", type=int, default=list(DEFAULT_DIE_SIZES))
+    parser.add_argument("--mapping", default="linear", choices=pipeline.MAPPINGS)
+    parser.add_argument("--color", default="white")
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs per stage")
+    parser.add_argument("--max-export-pixels", type=int, default=MAX_EXPORT_PIXELS)
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON to check this run against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown as a fraction (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
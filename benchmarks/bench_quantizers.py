@@ -0,0 +1,53 @@
+"""Compare the speed and face usage of every quantization mapping
+
+Usage: python benchmarks/bench_quantizers.py [IMAGE] [--sizes 150x200 ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dice_art.quantize import MAPPINGS, quantize_grid  # noqa: E402
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "example.png")
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def time_call(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("image", nargs="?", default=DEFAULT_IMAGE)
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(150, 200), (500, 700)])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    source = Image.open(args.image).convert("L")
+    print(f"{'grid':>10} {'mapping':>16} {'best ms':>9}  faces 1-6")
+    for width, height in args.sizes:
+        gray = np.asarray(source.resize((width, height)))
+        for mapping in MAPPINGS:
+            seconds, grid = time_call(lambda: quantize_grid(gray, mapping), args.repeat)
+            counts = np.bincount(grid.ravel(), minlength=7)[1:]
+            print(f"{f'{width}x{height}':>10} {mapping:>16} {seconds * 1000:9.2f}  {' '.join(map(str, counts))}")
+
+
+if __name__ == "__main__":
+    main()
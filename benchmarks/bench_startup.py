@@ -0,0 +1,190 @@
+"""Time startup of the package, the CLI and the GUI against fixed budgets
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 10] [-o results.json]
+
+Every case runs in a fresh interpreter and is timed from process start to
+exit, best of --repeat runs. Its cost is that time minus the time of its
+baseline (a bare interpreter, or a bare Tk window for the GUI), so the
+budgets hold across machines with different interpreter startup. Cases
+that must not load the engine at all also fail if NumPy or Pillow ends up
+in sys.modules, whatever the timing.
+
+The GUI cases need tkinter and a display; without them they are skipped
+and recorded as null. The script exits with status 1 when any case is over
+its budget or loaded a forbidden module.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_IMAGE = os.path.join(ROOT, "example.png")
+
+# Modules a case may forbid; reported for every case
+HEAVY_MODULES = ("numpy", "PIL")
+
+# Marker before the list of loaded heavy modules on a case's stderr
+REPORT_MARKER = "@@modules:"
+
+REPORT = f"""
+import sys
+sys.stderr.write("\\n{REPORT_MARKER}" + ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules) + "\\n")
+"""
+
+TK_WINDOW = """
+import tkinter as tk
+root = tk.Tk()
+root.wait_visibility()
+"""
+
+GUI_WINDOW = """
+import tkinter as tk
+import dice_art_generator
+root = tk.Tk()
+dice_art_generator.EnhancedDiceArtGenerator(root)
+root.wait_visibility()
+"""
+
+# name: (code, baseline case, budget in ms over the baseline or None, forbidden modules)
+CASES = {
+    "interpreter": ("pass", None, None, ()),
+    "import dice_art": ("import dice_art", "interpreter", 25, HEAVY_MODULES),
+    "cli --help": ("from dice_art.cli import main\ntry:\n    main(['--help'])\nexcept SystemExit:\n    pass",
+                   "interpreter", 60, HEAVY_MODULES),
+    "cli bad args": ("from dice_art.cli import main\ntry:\n    main(['--width'])\nexcept SystemExit:\n    pass",
+                     "interpreter", 60, HEAVY_MODULES),
+    # The engine's own import cost, for reference; bench_pipeline times the work
+    "cli run": ("from dice_art.cli import main\nmain([{image!r}, '-o', {output!r}, '-w', '30', '--formats', 'grid'])",
+                "interpreter", None, ()),
+    "tk window": (TK_WINDOW, None, None, ()),
+    "gui first window": (GUI_WINDOW, "tk window", 150, ()),
+}
+GUI_CASES = ("tk window", "gui first window")
+
+# Longest a single run may take before the case is reported as failed
+RUN_TIMEOUT_SECONDS = 60
+
+
+def gui_available():
+    try:
+        subprocess.run([sys.executable, "-c", "import tkinter; tkinter.Tk().destroy()"], cwd=ROOT,
+                       capture_output=True, timeout=RUN_TIMEOUT_SECONDS, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return True
+
+
+def run_once(code):
+    """Run code in a fresh interpreter; returns (seconds, heavy modules loaded)"""
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-c", code + REPORT], cwd=ROOT, capture_output=True, text=True,
+                             timeout=RUN_TIMEOUT_SECONDS)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else
+                           f"exit status {process.returncode}")
+    report = [line for line in process.stderr.splitlines() if line.startswith(REPORT_MARKER)]
+    modules = report[-1][len(REPORT_MARKER):] if report else ""
+    return elapsed, [name for name in modules.split(",") if name]
+
+
+def run_case(code, repeat):
+    best = float("inf")
+    loaded = set()
+    for _ in range(repeat):
+        seconds, modules = run_once(code)
+        best = min(best, seconds)
+        loaded.update(modules)
+    return best, sorted(loaded)
+
+
+def run_benchmarks(args):
+    gui = gui_available()
+    results = {}
+    with tempfile.TemporaryDirectory() as output:
+        for name, (code, baseline, budget, forbidden) in CASES.items():
+            if name in GUI_CASES and not gui:
+                results[name] = None
+                print(f"{name:<20} skipped (no tkinter or display)", flush=True)
+                continue
+            seconds, loaded = run_case(code.format(image=args.image, output=output), args.repeat)
+            cost = None
+            if baseline is not None and results.get(baseline) is not None:
+                cost = max(0.0, seconds - results[baseline]["seconds"])
+            results[name] = {
+                "seconds": seconds,
+                "baseline": baseline,
+                "cost_seconds": cost,
+                "budget_seconds": None if budget is None else budget / 1000,
+                "loaded": loaded,
+                "forbidden": sorted(set(loaded) & set(forbidden)),
+            }
+            print(format_result(name, results[name]), flush=True)
+    return {"environment": environment(), "repeat": args.repeat, "results": results}
+
+
+def format_result(name, result):
+    text = f"{name:<20} {result['seconds'] * 1000:7.1f}ms"
+    if result["cost_seconds"] is not None:
+        text += f"  +{result['cost_seconds'] * 1000:.1f}ms over {result['baseline']}"
+    if result["budget_seconds"] is not None:
+        text += f" (budget {result['budget_seconds'] * 1000:.0f}ms)"
+    if result["loaded"]:
+        text += f"  loads {', '.join(result['loaded'])}"
+    return text
+
+
+def failures(current):
+    """Return a list of budget and import violations"""
+    messages = []
+    for name, result in current["results"].items():
+        if result is None:
+            continue
+        cost, budget = result["cost_seconds"], result["budget_seconds"]
+        if budget is not None and cost is not None and cost > budget:
+            messages.append(f"{name}: {cost * 1000:.1f}ms over {result['baseline']}, "
+                            f"budget {budget * 1000:.0f}ms")
+        if result["forbidden"]:
+            messages.append(f"{name}: imported {', '.join(result['forbidden'])}")
+    return messages
+
+
+def environment():
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image", default=DEFAULT_IMAGE, help="image converted by the 'cli run' case")
+    parser.add_argument("--repeat", type=int, default=10, help="best of this many runs per case")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    messages = failures(current)
+    for message in messages:
+        print(f"OVER BUDGET {message}")
+    if messages:
+        return 1
+    print("All startup cases within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
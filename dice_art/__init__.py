@@ -0,0 +1,39 @@
+"""GUI-free dice art engine shared by the Tk app and scripts
+
+The names below are imported on first access, so importing the package (or
+dice_art.options, or the CLI's argument parser) does not load NumPy and
+Pillow.
+"""
+
+import importlib
+
+from dice_art.options import DICE_COLORS, DICE_FACES, MAPPINGS
+
+# Engine names re-exported here, by the module that defines them
+_LAZY_EXPORTS = {
+    "TILE_ATLAS": "dice_art.render",
+    "TileAtlas": "dice_art.render",
+    "grid_dimensions": "dice_art.quantize",
+    "quantize_grid": "dice_art.quantize",
+    "render_mosaic": "dice_art.render",
+}
+
+__all__ = [
+    "DICE_COLORS",
+    "DICE_FACES",
+    "MAPPINGS",
+    "TILE_ATLAS",
+    "TileAtlas",
+    "grid_dimensions",
+    "quantize_grid",
+    "render_mosaic",
+]
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'dice_art' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,5 @@
+import sys
+
+from dice_art.cli import main
+
+sys.exit(main())
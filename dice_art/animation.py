@@ -0,0 +1,277 @@
+"""Animated dice art: GIF/APNG/WebP input to a dice animation
+
+Frames are read lazily with ImageSequence (or from a directory of frame
+images, e.g. extracted from a video with ffmpeg), quantized by the same
+resample and quantize stages as still images, and rendered through the
+shared tile atlas. Output is streamed frame by frame to an animated GIF,
+an animated PNG or a directory of numbered PNGs, so memory does not grow
+with the number of frames.
+
+Quantizing frames independently makes cells flicker between neighbouring
+faces wherever the tone sits near a bucket edge. Each frame is therefore
+compared with the previous output: a cell keeps its previous die unless
+the new one is better by a margin (HYSTERESIS_TONE gray levels for the
+grayscale mappings, HYSTERESIS_DELTA_E for palettes). For the grayscale
+mappings only steps to an adjacent face are held, so real changes in the
+picture go through at once.
+
+With jobs > 1, frames are quantized in worker processes in chunks of
+FRAME_CHUNK; hysteresis, rendering and encoding stay in order in the
+calling process, with at most two chunks per worker in flight.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+from dice_art.cells import FACE_MASK, cell_faces
+from dice_art.gifstream import GIFStreamWriter
+from dice_art.grid import DiceGrid
+from dice_art.options import ANIMATION_DIE_SIZE
+from dice_art.palette import Palette
+from dice_art.pipeline import adjust_image, quantize_resampled, resample_image, resample_mode
+from dice_art.pngstream import APNGStreamWriter
+from dice_art.quantize import FACE_TONES
+from dice_art.render import render_array
+from dice_art.resample import ImagePyramid
+
+# Frames quantized per worker task
+FRAME_CHUNK = 8
+
+# Delay used when a source frame does not specify one
+DEFAULT_FRAME_MS = 100
+
+# How much better a new die must be before a cell changes
+HYSTERESIS_TONE = 12.0
+HYSTERESIS_DELTA_E = 4.0
+
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp")
+
+
+def iter_source_frames(path):
+    """Yield (RGB frame, duration in ms) from an animated image or a directory of frames"""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(FRAME_EXTENSIONS))
+        for name in names:
+            with Image.open(os.path.join(path, name)) as img:
+                yield img.convert("RGB"), DEFAULT_FRAME_MS
+        return
+
+    with Image.open(path) as img:
+        for frame in ImageSequence.Iterator(img):
+            # convert() copies, so the sequence can move on to the next frame
+            yield frame.convert("RGB"), frame.info.get("duration") or DEFAULT_FRAME_MS
+
+
+def source_frame_count(path):
+    """Number of frames in an animated image or frame directory, without decoding them"""
+    if os.path.isdir(path):
+        return sum(1 for name in os.listdir(path) if name.lower().endswith(FRAME_EXTENSIONS))
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+
+class FrameQuantizer:
+    """Grid settings for quantizing frames, with the per-cell costs hysteresis needs
+
+    Picklable, so it can be shipped to worker processes.
+    """
+
+    def __init__(self, width, brightness=1.0, contrast=1.0, mapping="linear", color="white", palette=None):
+        if mapping == "palette" and not isinstance(palette, Palette):
+            palette = Palette.from_schemes(palette or (color,))
+        self.width = width
+        self.brightness = brightness
+        self.contrast = contrast
+        self.mapping = mapping
+        self.color = color
+        self.palette = palette
+
+    def quantize(self, frame):
+        """Return (cell code array, (h, w, candidates) costs) for one RGB frame"""
+        adjusted = adjust_image(frame, self.brightness, self.contrast)
+        pyramid = ImagePyramid(adjusted)
+        resampled = resample_image(adjusted, self.width, self.mapping, pyramid)
+        codes = quantize_resampled(resampled, self.mapping, self.color, self.palette).cells
+
+        if self.mapping == "palette":
+            lab = self.palette.source_lab(np.asarray(resampled))
+            costs = self.palette.distances(lab).reshape(codes.shape + (len(self.palette),))
+        else:
+            tones = np.asarray(resampled, dtype=np.float32)
+            _, samples = resample_mode(self.mapping)
+            if samples > 1:
+                # Perceptual matching samples below die resolution; the cell tone is the mean
+                height, width = codes.shape
+                tones = tones.reshape(height, samples, width, samples).mean(axis=(1, 3))
+            costs = np.abs(tones[..., None] - FACE_TONES[1:].astype(np.float32))
+        return codes, costs.astype(np.float32)
+
+    def candidate_lut(self):
+        """Map every cell code to its index along the cost axis, or -1"""
+        if self.mapping == "palette":
+            lut = np.full(256, -1, dtype=np.intp)
+            lut[self.palette.codes] = np.arange(len(self.palette))
+            return lut
+        # Grayscale costs are per face, whatever the rotation and scheme bits
+        faces = np.arange(256) & FACE_MASK
+        return np.where((faces >= 1) & (faces <= 6), faces - 1, -1)
+
+
+def apply_hysteresis(previous, codes, costs, lut, margin, adjacent_only):
+    """Keep previous codes where the new code is not better by at least margin"""
+    if previous is None or previous.shape != codes.shape:
+        return codes
+    previous_index = lut[previous]
+    new_index = lut[codes]
+    held = (previous != codes) & (previous_index >= 0) & (new_index >= 0)
+    previous_cost = np.take_along_axis(costs, np.maximum(previous_index, 0)[..., None], axis=-1)[..., 0]
+    new_cost = np.take_along_axis(costs, np.maximum(new_index, 0)[..., None], axis=-1)[..., 0]
+    held &= previous_cost - new_cost < margin
+    if adjacent_only:
+        held &= np.abs(cell_faces(previous).astype(np.int8) - cell_faces(codes).astype(np.int8)) == 1
+    return np.where(held, previous, codes)
+
+
+def quantize_chunk(quantizer, frames):
+    """Worker task: quantize a list of (h, w, 3) frame arrays"""
+    return [quantizer.quantize(Image.fromarray(frame, "RGB")) for frame in frames]
+
+
+def iter_chunks(frames, size):
+    chunk = []
+    for frame in frames:
+        chunk.append(frame)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_quantized(frames, quantizer, jobs=1):
+    """Yield (codes, costs, duration) in frame order, quantizing in worker processes when jobs > 1"""
+    if jobs <= 1:
+        for frame, duration in frames:
+            yield quantizer.quantize(frame) + (duration,)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for chunk in iter_chunks(frames, FRAME_CHUNK):
+            arrays = [np.asarray(frame) for frame, _ in chunk]
+            pending.append((pool.submit(quantize_chunk, quantizer, arrays), [d for _, d in chunk]))
+            # Bound the chunks in flight so memory stays flat however long the input is
+            if len(pending) >= 2 * jobs:
+                yield from _finish_chunk(pending.popleft())
+        while pending:
+            yield from _finish_chunk(pending.popleft())
+
+
+def _finish_chunk(entry):
+    future, durations = entry
+    for (codes, costs), duration in zip(future.result(), durations):
+        yield codes, costs, duration
+
+
+def iter_dice_frames(path, width, brightness=1.0, contrast=1.0, mapping="linear", color="white", palette=None,
+                     hysteresis=True, jobs=1):
+    """Yield (grid, duration in ms) for every frame of an animation"""
+    quantizer = FrameQuantizer(width, brightness, contrast, mapping, color, palette)
+    lut = quantizer.candidate_lut()
+    if mapping == "palette":
+        margin, adjacent_only = HYSTERESIS_DELTA_E, False
+    else:
+        margin, adjacent_only = HYSTERESIS_TONE, True
+
+    previous = None
+    for codes, costs, duration in iter_quantized(iter_source_frames(path), quantizer, jobs):
+        if hysteresis:
+            codes = apply_hysteresis(previous, codes, costs, lut, margin, adjacent_only)
+        previous = codes
+        yield DiceGrid(codes), duration
+
+
+class FrameDirectoryWriter:
+    """Write frames as numbered PNGs into a directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self.frames_written = 0
+        self._created = not os.path.isdir(path)
+        os.makedirs(path, exist_ok=True)
+
+    def frame_path(self, index):
+        return os.path.join(self.path, f"frame_{index:05d}.png")
+
+    def write_frame(self, frame, delay_ms=DEFAULT_FRAME_MS):
+        self.frames_written += 1
+        Image.fromarray(frame, "RGB").save(self.frame_path(self.frames_written))
+
+    def close(self):
+        pass
+
+    def discard(self):
+        """Remove the frames written so far, and the directory if this writer created it"""
+        for index in range(1, self.frames_written + 1):
+            if os.path.isfile(self.frame_path(index)):
+                os.remove(self.frame_path(index))
+        if self._created:
+            try:
+                os.rmdir(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+def animation_writer(output, width, height):
+    """GIF for .gif, APNG for .png/.apng, numbered PNGs for anything else (a directory)"""
+    extension = os.path.splitext(output)[1].lower()
+    if extension == ".gif":
+        return GIFStreamWriter(output, width, height)
+    if extension in (".png", ".apng"):
+        return APNGStreamWriter(output, width, height)
+    return FrameDirectoryWriter(output)
+
+
+def export_animation(path, output, width, brightness=1.0, contrast=1.0, mapping="linear", color="white",
+                     palette=None, die_size=ANIMATION_DIE_SIZE, hysteresis=True, jobs=1, progress=None):
+    """Convert an animation to dice art, streaming frames to output; returns the frame count
+
+    progress, if given, is called with the completed fraction and may raise
+    to abort the export.
+    """
+    total = max(source_frame_count(path), 1)
+    frames = iter_dice_frames(path, width, brightness, contrast, mapping, color, palette, hysteresis, jobs)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError(f"No frames found in {path}")
+    grid, duration = first
+    frame = render_array(grid, die_size, color)
+    writer = None
+    try:
+        writer = animation_writer(output, frame.shape[1], frame.shape[0])
+        with writer:
+            writer.write_frame(frame, duration)
+            for grid, duration in frames:
+                if progress:
+                    progress(min(1.0, writer.frames_written / total))
+                writer.write_frame(render_array(grid, die_size, color), duration)
+    except BaseException:
+        # Don't leave a truncated animation file or a partial frame directory behind
+        if isinstance(writer, FrameDirectoryWriter):
+            writer.discard()
+        elif os.path.isfile(output):
+            os.remove(output)
+        raise
+    if progress:
+        progress(1.0)
+    return writer.frames_written
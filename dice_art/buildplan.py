@@ -0,0 +1,409 @@
+"""Paginated build plans: the grid split into board-sized panels, one page each
+
+A build plan is what you lay dice from. Page 1 is an overview map of the
+mosaic with every panel labelled row.column and the total dice needed;
+every following page shows one panel (10x10 dice by default) with global
+row and column numbers, the dice drawn as face glyphs in their scheme
+colors, guide lines every GUIDE_EVERY dice and that panel's dice counts.
+
+Pages are produced lazily as lists of drawing operations (PlanPage) and
+serialized one at a time, either into a single PDF (dice are form
+XObjects painted by reference, see pdfstream) or into one SVG file per
+page, so a 300x400 grid makes a 1201-page document in flat memory.
+"""
+
+import os
+
+from dice_art.grid import as_dice_grid
+from dice_art.options import DEFAULT_PAGE, DEFAULT_PANEL, PAGE_SIZES, parse_panel  # noqa: F401 (re-exported)
+from dice_art.pdfstream import PDFStreamWriter, pdf_number, pdf_string
+from dice_art.render import BORDER_COLOR, DEFAULT_COLORS, DICE_COLORS, face_dots, hex_to_rgb, scheme_name
+
+MARGIN_PT = 36
+TITLE_PT = 14
+TEXT_PT = 9
+LINE_PT = 13
+LEGEND_DIE_PT = 12
+LEGEND_ROW_PT = 18
+MAX_DIE_PT = 48
+
+# Room left of and above a panel for the row and column numbers
+LABEL_GUTTER_PT = 22
+
+# Heavier lines every this many dice, counted on the whole mosaic so they line up across panels
+GUIDE_EVERY = 5
+
+TEXT_COLOR = "#2c3e50"
+GUIDE_COLOR = "#34495e"
+MAP_FILL = "#ecf0f1"
+
+# Relative dot radius, as in render.draw_face
+DOT_RADIUS = 0.15
+
+# Helvetica advance widths (per point of font size) used to align text
+NARROW_CHARS = " .,:;il|!'"
+MEDIUM_CHARS = "()-rtf"
+
+
+def page_dimensions(page_size):
+    """Resolve a page size name or (width, height) in points"""
+    if isinstance(page_size, str):
+        try:
+            return PAGE_SIZES[page_size.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown page size '{page_size}'; choose from {', '.join(PAGE_SIZES)}") from None
+    return tuple(float(v) for v in page_size)
+
+
+def panel_counts(grid_shape, panel):
+    """Return (panel rows, panel columns) needed to cover a grid"""
+    rows, cols = grid_shape
+    panel_cols, panel_rows = panel
+    return -(-rows // panel_rows), -(-cols // panel_cols)
+
+
+def plan_page_count(grid_shape, panel=DEFAULT_PANEL):
+    panel_rows, panel_cols = panel_counts(grid_shape, panel)
+    return 1 + panel_rows * panel_cols
+
+
+def iter_panels(grid_shape, panel=DEFAULT_PANEL):
+    """Yield ((panel row, panel column), (row0, row1, col0, col1)) in reading order"""
+    rows, cols = grid_shape
+    panel_cols, panel_rows = panel
+    for row0 in range(0, rows, panel_rows):
+        for col0 in range(0, cols, panel_cols):
+            yield ((row0 // panel_rows, col0 // panel_cols),
+                   (row0, min(row0 + panel_rows, rows), col0, min(col0 + panel_cols, cols)))
+
+
+def panel_label(index):
+    return f"{index[0] + 1}.{index[1] + 1}"
+
+
+def text_width(text, size):
+    """Approximate width of Helvetica text in points"""
+    width = 0.0
+    for char in text:
+        if char in NARROW_CHARS:
+            width += 0.278
+        elif char in MEDIUM_CHARS:
+            width += 0.333
+        elif char.isupper():
+            width += 0.667
+        else:
+            width += 0.556
+    return width * size
+
+
+class PlanPage:
+    """Drawing operations of one page, in points from the top-left corner"""
+
+    def __init__(self, size):
+        self.width, self.height = size
+        self.ops = []
+
+    def text(self, x, y, text, size=TEXT_PT, anchor="start", bold=False):
+        """Draw text with its baseline at y; anchor is start, middle or end"""
+        self.ops.append(("text", x, y, text, size, anchor, bold))
+
+    def rect(self, x, y, width, height, fill=None, stroke=None, line_width=0.5):
+        self.ops.append(("rect", x, y, width, height, fill, stroke, line_width))
+
+    def line(self, x0, y0, x1, y1, stroke=GUIDE_COLOR, line_width=0.5):
+        self.ops.append(("line", x0, y0, x1, y1, stroke, line_width))
+
+    def die(self, x, y, size, face, rotated=False, scheme="white"):
+        self.ops.append(("die", x, y, size, face, rotated, scheme))
+
+
+def draw_legend(page, x, y, by_scheme):
+    """Draw one row of face glyphs and counts per scheme from y down; returns the height used"""
+    for row, (name, faces) in enumerate(by_scheme.items()):
+        top = y + row * LEGEND_ROW_PT
+        baseline = top + LEGEND_DIE_PT - 3
+        page.text(x, baseline, f"{name.capitalize()}: {sum(faces.values())}", bold=True)
+        for value, count in faces.items():
+            left = x + 90 + (value - 1) * 62
+            page.die(left, top, LEGEND_DIE_PT, value, scheme=name)
+            page.text(left + LEGEND_DIE_PT + 4, baseline, f"x {count}")
+    return len(by_scheme) * LEGEND_ROW_PT
+
+
+def draw_overview(grid, color, panel, page_size):
+    """Page 1: totals and a map of the panels"""
+    page = PlanPage(page_size)
+    rows, cols = grid.shape
+    panel_rows, panel_cols = panel_counts(grid.shape, panel)
+    panels = panel_rows * panel_cols
+    content_width = page.width - 2 * MARGIN_PT
+
+    y = MARGIN_PT + TITLE_PT
+    page.text(MARGIN_PT, y, "Dice Build Plan", TITLE_PT + 2, bold=True)
+    page.text(page.width - MARGIN_PT, y, f"Page 1 of {1 + panels}", anchor="end")
+    y += LINE_PT + 4
+    page.text(MARGIN_PT, y, f"Mosaic: {cols} x {rows} dice ({rows * cols} in total), {color} dice by default")
+    y += LINE_PT
+    page.text(MARGIN_PT, y, f"Panels: {panel[0]} x {panel[1]} dice, {panel_rows} rows of {panel_cols} "
+                            f"({panels} panels, pages 2-{1 + panels})")
+    y += LINE_PT
+    page.text(MARGIN_PT, y, "Row 1 is the top of the mosaic; panel r.c is panel row r, panel column c.")
+    y += LINE_PT
+    by_scheme = grid.scheme_counts(color)
+    if len(by_scheme) == 1:
+        page.text(MARGIN_PT, y, "Dice needed: " + ", ".join(
+            f"{value}: {count}" for value, count in grid.face_counts().items()))
+        y += LINE_PT
+    y += 4
+    y += draw_legend(page, MARGIN_PT, y, by_scheme) + LINE_PT
+
+    # Map of the whole mosaic, one rectangle per panel
+    scale = min(content_width / cols, (page.height - MARGIN_PT - y) / rows)
+    left = MARGIN_PT + (content_width - cols * scale) / 2
+    page.rect(left, y, cols * scale, rows * scale, fill=MAP_FILL, stroke=GUIDE_COLOR, line_width=1)
+    for index, (row0, row1, col0, col1) in iter_panels(grid.shape, panel):
+        x0, y0 = left + col0 * scale, y + row0 * scale
+        width, height = (col1 - col0) * scale, (row1 - row0) * scale
+        page.rect(x0, y0, width, height, stroke=GUIDE_COLOR, line_width=0.3)
+        label = panel_label(index)
+        size = min(8.0, height * 0.5, width * 0.9 / max(text_width(label, 1), 0.1))
+        if size >= 3:
+            page.text(x0 + width / 2, y0 + height / 2 + size * 0.35, label, size, anchor="middle")
+    return page
+
+
+def draw_panel(grid, color, index, bounds, page_number, page_count, page_size):
+    """One panel: numbered rows and columns, the dice and their counts"""
+    page = PlanPage(page_size)
+    row0, row1, col0, col1 = bounds
+    cells = grid.region(row0, row1, col0, col1)
+    rows, cols = cells.shape
+
+    y = MARGIN_PT + TITLE_PT
+    page.text(MARGIN_PT, y, f"Panel {panel_label(index)}", TITLE_PT, bold=True)
+    page.text(page.width - MARGIN_PT, y, f"Page {page_number} of {page_count}", anchor="end")
+    y += LINE_PT
+    page.text(MARGIN_PT, y, f"Rows {row0 + 1}-{row1}, columns {col0 + 1}-{col1} "
+                            f"of a {grid.shape[1]} x {grid.shape[0]} mosaic")
+    top = y + LINE_PT
+
+    # Counts go at the bottom; the dice get whatever room is left
+    by_scheme = cells.scheme_counts(color)
+    footer = LINE_PT + 4 + len(by_scheme) * LEGEND_ROW_PT
+    available_width = page.width - 2 * MARGIN_PT - LABEL_GUTTER_PT
+    available_height = page.height - MARGIN_PT - footer - LINE_PT - top - LABEL_GUTTER_PT
+    die = min(available_width / cols, available_height / rows, MAX_DIE_PT)
+    left = MARGIN_PT + LABEL_GUTTER_PT + (available_width - die * cols) / 2
+    top += LABEL_GUTTER_PT
+
+    # Global row and column numbers; only every GUIDE_EVERY-th when dice are tiny
+    label_size = min(TEXT_PT, die * 0.45)
+    step = 1 if label_size >= 4 else GUIDE_EVERY
+    label_size = max(label_size, 4)
+    for j in range(cols):
+        if (col0 + j + 1) % step == 0 or j == 0:
+            page.text(left + (j + 0.5) * die, top - 4, str(col0 + j + 1), label_size, anchor="middle")
+    for i in range(rows):
+        if (row0 + i + 1) % step == 0 or i == 0:
+            page.text(left - 4, top + (i + 0.5) * die + label_size * 0.35, str(row0 + i + 1), label_size,
+                      anchor="end")
+
+    faces = cells.faces
+    rotated = cells.rotations
+    slots = cells.schemes
+    for i in range(rows):
+        for j in range(cols):
+            page.die(left + j * die, top + i * die, die, int(faces[i, j]), bool(rotated[i, j]),
+                     scheme_name(int(slots[i, j]), color))
+
+    for i in range(1, rows):
+        if (row0 + i) % GUIDE_EVERY == 0:
+            page.line(left, top + i * die, left + cols * die, top + i * die, line_width=1.2)
+    for j in range(1, cols):
+        if (col0 + j) % GUIDE_EVERY == 0:
+            page.line(left + j * die, top, left + j * die, top + rows * die, line_width=1.2)
+    page.rect(left, top, cols * die, rows * die, stroke=GUIDE_COLOR, line_width=1.2)
+
+    y = top + rows * die + LINE_PT + TEXT_PT
+    page.text(MARGIN_PT, y, f"Dice in this panel: {cells.size}", bold=True)
+    draw_legend(page, MARGIN_PT, y + 6, by_scheme)
+    return page
+
+
+def iter_plan_pages(grid, color="white", panel=DEFAULT_PANEL, page_size=DEFAULT_PAGE):
+    """Yield the PlanPages of a build plan one at a time"""
+    grid = as_dice_grid(grid)
+    size = page_dimensions(page_size)
+    page_count = plan_page_count(grid.shape, panel)
+    yield draw_overview(grid, color, panel, size)
+    for number, (index, bounds) in enumerate(iter_panels(grid.shape, panel), start=2):
+        yield draw_panel(grid, color, index, bounds, number, page_count, size)
+
+
+def die_glyph(face, rotated, scheme):
+    """Return (background, dot color, dot centers) of a die in unit coordinates, y down"""
+    bg_color, dot_color = DICE_COLORS.get(scheme, DEFAULT_COLORS)
+    return bg_color, dot_color, face_dots(face, rotated)
+
+
+def die_id(face, rotated, scheme):
+    return f"D{face}{'r' if rotated else ''}{scheme}"
+
+
+def pdf_color(color, operator):
+    r, g, b = hex_to_rgb(color)
+    return f"{pdf_number(r / 255)} {pdf_number(g / 255)} {pdf_number(b / 255)} {operator}"
+
+
+def pdf_circle(cx, cy, r):
+    """Circle path from four Bezier arcs"""
+    k = 0.5523 * r
+    n = pdf_number
+    return (f"{n(cx + r)} {n(cy)} m "
+            f"{n(cx + r)} {n(cy + k)} {n(cx + k)} {n(cy + r)} {n(cx)} {n(cy + r)} c "
+            f"{n(cx - k)} {n(cy + r)} {n(cx - r)} {n(cy + k)} {n(cx - r)} {n(cy)} c "
+            f"{n(cx - r)} {n(cy - k)} {n(cx - k)} {n(cy - r)} {n(cx)} {n(cy - r)} c "
+            f"{n(cx + k)} {n(cy - r)} {n(cx + r)} {n(cy - k)} {n(cx + r)} {n(cy)} c")
+
+
+def pdf_die_form(face, rotated, scheme):
+    """Content of a unit-square form XObject drawing one die"""
+    bg_color, dot_color, dots = die_glyph(face, rotated, scheme)
+    ops = [pdf_color(bg_color, "rg"), "0 0 1 1 re f",
+           pdf_color(BORDER_COLOR, "RG"), "0.02 w 0.01 0.01 0.98 0.98 re S",
+           pdf_color(dot_color, "rg")]
+    # Forms have y up; dot positions have y down
+    ops += [pdf_circle(x, 1 - y, DOT_RADIUS) + " f" for x, y in dots]
+    return "\n".join(ops).encode()
+
+
+def pdf_content(page, writer):
+    """Serialize a PlanPage to a PDF content stream, adding die forms to writer as needed"""
+    n = pdf_number
+    height = page.height
+    ops = []
+    for op in page.ops:
+        kind = op[0]
+        if kind == "text":
+            _, x, y, text, size, anchor, bold = op
+            if anchor == "middle":
+                x -= text_width(text, size) / 2
+            elif anchor == "end":
+                x -= text_width(text, size)
+            ops.append(f"BT {pdf_color(TEXT_COLOR, 'rg')} /{'F2' if bold else 'F1'} {n(size)} Tf "
+                       f"{n(x)} {n(height - y)} Td " + pdf_string(text).decode("latin-1") + " Tj ET")
+        elif kind == "rect":
+            _, x, y, width, h, fill, stroke, line_width = op
+            path = f"{n(x)} {n(height - y - h)} {n(width)} {n(h)} re"
+            if fill:
+                ops.append(pdf_color(fill, "rg"))
+            if stroke:
+                ops.append(f"{pdf_color(stroke, 'RG')} {n(line_width)} w")
+            ops.append(path + (" B" if fill and stroke else " f" if fill else " S"))
+        elif kind == "line":
+            _, x0, y0, x1, y1, stroke, line_width = op
+            ops.append(f"{pdf_color(stroke, 'RG')} {n(line_width)} w "
+                       f"{n(x0)} {n(height - y0)} m {n(x1)} {n(height - y1)} l S")
+        elif kind == "die":
+            _, x, y, size, face, rotated, scheme = op
+            name = die_id(face, rotated, scheme)
+            if not writer.has_form(name):
+                writer.add_form(name, pdf_die_form(face, rotated, scheme))
+            ops.append(f"q {n(size)} 0 0 {n(size)} {n(x)} {n(height - y - size)} cm /{name} Do Q")
+    return "\n".join(ops).encode("latin-1")
+
+
+def svg_die_symbol(face, rotated, scheme):
+    bg_color, dot_color, dots = die_glyph(face, rotated, scheme)
+    parts = [f'<symbol id="{die_id(face, rotated, scheme)}" viewBox="0 0 1 1">',
+             f'<rect x="0.01" y="0.01" width="0.98" height="0.98" fill="{bg_color}" '
+             f'stroke="{BORDER_COLOR}" stroke-width="0.02"/>']
+    parts += [f'<circle cx="{pdf_number(x)}" cy="{pdf_number(y)}" r="{DOT_RADIUS}" fill="{dot_color}"/>'
+              for x, y in dots]
+    parts.append("</symbol>")
+    return "".join(parts)
+
+
+def svg_document(page):
+    """Serialize a PlanPage to a standalone SVG document"""
+    # Imported here: xml.sax.saxutils pulls in urllib.request, which PDF plans never need
+    from xml.sax.saxutils import escape
+
+    n = pdf_number
+    symbols = {}
+    body = []
+    for op in page.ops:
+        kind = op[0]
+        if kind == "text":
+            _, x, y, text, size, anchor, bold = op
+            weight = ' font-weight="bold"' if bold else ""
+            body.append(f'<text x="{n(x)}" y="{n(y)}" font-size="{n(size)}" text-anchor="{anchor}"{weight}>'
+                        f'{escape(text)}</text>')
+        elif kind == "rect":
+            _, x, y, width, height, fill, stroke, line_width = op
+            body.append(f'<rect x="{n(x)}" y="{n(y)}" width="{n(width)}" height="{n(height)}" '
+                        f'fill="{fill or "none"}" stroke="{stroke or "none"}" stroke-width="{n(line_width)}"/>')
+        elif kind == "line":
+            _, x0, y0, x1, y1, stroke, line_width = op
+            body.append(f'<line x1="{n(x0)}" y1="{n(y0)}" x2="{n(x1)}" y2="{n(y1)}" stroke="{stroke}" '
+                        f'stroke-width="{n(line_width)}"/>')
+        elif kind == "die":
+            _, x, y, size, face, rotated, scheme = op
+            name = die_id(face, rotated, scheme)
+            if name not in symbols:
+                symbols[name] = svg_die_symbol(face, rotated, scheme)
+            body.append(f'<use xlink:href="#{name}" x="{n(x)}" y="{n(y)}" width="{n(size)}" height="{n(size)}"/>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'width="{n(page.width)}pt" height="{n(page.height)}pt" viewBox="0 0 {n(page.width)} {n(page.height)}">\n'
+        f'<defs>{"".join(symbols.values())}</defs>\n'
+        f'<g font-family="Helvetica, Arial, sans-serif" fill="{TEXT_COLOR}">\n'
+        + "\n".join(body) + "\n</g>\n</svg>\n"
+    )
+
+
+def svg_page_paths(path, page_count):
+    """plan.svg -> plan_001.svg, plan_002.svg, ..."""
+    root = os.path.splitext(path)[0]
+    digits = max(3, len(str(page_count)))
+    return [f"{root}_{number:0{digits}d}.svg" for number in range(1, page_count + 1)]
+
+
+def export_build_plan(grid, path, color="white", panel=DEFAULT_PANEL, page_size=DEFAULT_PAGE, progress=None):
+    """Write a build plan as one PDF, or as one SVG file per page; returns the files written
+
+    Pages are generated and written one at a time. progress, if given, is
+    called with the completed fraction and may raise to abort the export;
+    files of an aborted export are removed.
+    """
+    grid = as_dice_grid(grid)
+    size = page_dimensions(page_size)
+    page_count = plan_page_count(grid.shape, panel)
+    pages = iter_plan_pages(grid, color, panel, size)
+    extension = os.path.splitext(str(path))[1].lower()
+    written = []
+    try:
+        if extension == ".pdf":
+            written.append(path)
+            with PDFStreamWriter(path, size) as writer:
+                for page in pages:
+                    writer.add_page(pdf_content(page, writer))
+                    if progress:
+                        progress(writer.pages_written / page_count)
+        elif extension == ".svg":
+            for page, page_path in zip(pages, svg_page_paths(path, page_count)):
+                written.append(page_path)
+                with open(page_path, "w", encoding="utf-8") as f:
+                    f.write(svg_document(page))
+                if progress:
+                    progress(len(written) / page_count)
+        else:
+            raise ValueError("Build plans are written as .pdf or .svg files")
+    except BaseException:
+        # Don't leave a partial plan behind
+        for written_path in written:
+            if os.path.exists(written_path):
+                os.remove(written_path)
+        raise
+    return written
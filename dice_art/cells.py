@@ -0,0 +1,43 @@
+"""Bit layout of one grid cell
+
+Grids store one uint8 per die. The low three bits hold the face value
+(1-6) and bit 3 marks a face turned by 90 degrees, which only changes the
+look of 2, 3 and 6. The high four bits select the color scheme of that
+die as an index into SCHEME_NAMES plus one; 0 means the mosaic's default
+scheme, so plain face grids (values 1-6) are valid cell grids.
+"""
+
+import numpy as np
+
+FACE_MASK = 0x07
+ROTATED = 0x08
+TILE_MASK = 0x0F
+SCHEME_SHIFT = 4
+
+# Faces whose pip pattern changes when turned by 90 degrees
+ORIENTED_FACES = (2, 3, 6)
+
+
+def cell_faces(grid):
+    """Return the face value (1-6) of every cell"""
+    return np.asarray(grid) & FACE_MASK
+
+
+def cell_rotations(grid):
+    """Return 1 where the die is turned by 90 degrees, else 0"""
+    return (np.asarray(grid) & ROTATED) >> 3
+
+
+def cell_schemes(grid):
+    """Return the scheme slot of every cell (0 = mosaic default, n = SCHEME_NAMES[n - 1])"""
+    return np.asarray(grid) >> SCHEME_SHIFT
+
+
+def encode_cells(faces, rotations=None, schemes=None):
+    """Pack face values, optional rotation flags and scheme slots into cell codes"""
+    cells = np.asarray(faces, dtype=np.uint8) & FACE_MASK
+    if rotations is not None:
+        cells = cells | (np.asarray(rotations, dtype=np.uint8).astype(bool) * np.uint8(ROTATED))
+    if schemes is not None:
+        cells = cells | (np.asarray(schemes, dtype=np.uint8) << SCHEME_SHIFT)
+    return cells.astype(np.uint8)
@@ -0,0 +1,365 @@
+"""Headless dice-art command line and batch runner
+
+Usage: python -m dice_art [options] IMAGE|DIR|GLOB ...
+
+Only the standard library and dice_art.options are imported up front, so
+--help and argument errors return at interpreter speed. Engine modules
+(NumPy, Pillow) are imported by the functions that use them, and the
+optional ones (build plans, animation, sweeps, inventory, metrics, worker
+processes) only when a run asks for them; see benchmarks/bench_startup.py.
+"""
+
+import argparse
+import glob
+import itertools
+import os
+import sys
+import time
+
+from dice_art.options import (ANIMATION_DIE_SIZE, DEFAULT_PAGE, DEFAULT_PANEL, DICE_COLORS, EXPORT_DIE_SIZE,
+                              MAPPINGS, PAGE_SIZES, parse_panel)
+from dice_art.profiling import configure as configure_profiling, parse_modes, profiled
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif")
+FORMATS = ("grid", "image", "list", "plan")
+DEFAULT_FORMATS = ("grid", "image", "list")
+PLAN_FORMATS = ("pdf", "svg")
+GRID_FORMATS = ("txt", "csv", "json", "dgrid")
+
+# Output suffix per animation format
+ANIMATION_OUTPUTS = {"gif": ".gif", "apng": ".apng", "frames": "_frames"}
+
+
+def expand_inputs(patterns):
+    """Expand files, directories and glob patterns into a sorted list of image paths"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        elif os.path.exists(pattern):
+            matches = [pattern]
+        else:
+            matches = glob.glob(pattern)
+        paths.extend(p for p in matches if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+    return sorted(dict.fromkeys(paths))
+
+
+def expand_animation_inputs(patterns):
+    """Like expand_inputs, but a directory is one animation made of its frame images"""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.append(pattern.rstrip(os.sep) or pattern)
+        else:
+            paths.extend(expand_inputs([pattern]))
+    return list(dict.fromkeys(paths))
+
+
+def build_variants(args):
+    """Return every (width, brightness, contrast, color, mapping) combination requested"""
+    return list(itertools.product(args.width, args.brightness, args.contrast, args.color, args.mapping))
+
+
+def variant_stem(path, variant, single):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if single:
+        return stem
+    width, brightness, contrast, color, mapping = variant
+    return f"{stem}_w{width}_b{brightness:g}_c{contrast:g}_{color}_{mapping}"
+
+
+def process_image(path, variants, output_dir, formats, die_px, palette=None, inventory=None, plan=None,
+                  grid_format="txt", metrics=False):
+    """Convert one image for every variant, decoding it only once
+
+    With an inventory ({scheme: count}) the grid width is fitted to the stock
+    and schemes are assigned under it; width and mapping are ignored.
+    plan is (format, panel, page size) for the build plan format and
+    grid_format the file type of the grid output (see GRID_FORMATS). With
+    metrics, the result maps each variant's output stem to its fidelity
+    metrics (see dice_art.metrics).
+    """
+    with profiled(f"process {os.path.basename(path)}"):
+        return _process_image(path, variants, output_dir, formats, die_px, palette, inventory, plan, grid_format,
+                              metrics)
+
+
+def _process_image(path, variants, output_dir, formats, die_px, palette, inventory, plan, grid_format, metrics):
+    from dice_art import pipeline
+    from dice_art.loader import IMAGE_LOADER
+    from dice_art.stages import StageCache
+
+    timings = {}
+    variant_metrics = {}
+    start = time.perf_counter()
+    # Decode once, at the scale the largest variant needs; every variant is served from the loader
+    min_size = None
+    if inventory is None:
+        size = IMAGE_LOADER.size(path)
+        needed = [pipeline.required_source_size(size, variant[0], variant[4]) for variant in variants]
+        min_size = (max(w for w, _ in needed), max(h for _, h in needed))
+    pipeline.load_image(path, min_size)
+    timings["load"] = time.perf_counter() - start
+
+    # Variants sharing brightness/contrast (or width) reuse those stages
+    stages = StageCache(path=path)
+    outputs = []
+    single = len(variants) == 1
+    for variant in variants:
+        width, brightness, contrast, color, mapping = variant
+        t = time.perf_counter()
+        base = os.path.join(output_dir, variant_stem(path, variant, single))
+        if inventory is not None:
+            from dice_art.inventory import fit_inventory
+            fitted = fit_inventory(stages.adjusted(brightness, contrast), inventory, palette=palette,
+                                   pyramid=stages.pyramid(brightness, contrast))
+            grid = fitted.grid
+            with open(base + "_inventory.txt", "w") as f:
+                f.write(fitted.report())
+            outputs.append(base + "_inventory.txt")
+        else:
+            grid = stages.grid(width, brightness, contrast, mapping, color, palette)
+        timings["generate"] = timings.get("generate", 0.0) + time.perf_counter() - t
+
+        if metrics:
+            from dice_art.metrics import grid_metrics
+            t = time.perf_counter()
+            variant_metrics[os.path.basename(base)] = grid_metrics(stages, grid, grid.width, brightness, contrast,
+                                                                   color)
+            timings["metrics"] = timings.get("metrics", 0.0) + time.perf_counter() - t
+
+        t = time.perf_counter()
+        if "grid" in formats:
+            grid_path = f"{base}_grid.{grid_format}"
+            pipeline.export_dice_grid(grid, grid_path, color)
+            outputs.append(grid_path)
+        if "image" in formats:
+            pipeline.export_image(grid, base + ".png", color, die_px)
+            outputs.append(base + ".png")
+        if "list" in formats:
+            pipeline.export_dice_list(grid, base + "_dice_list.txt", color)
+            outputs.append(base + "_dice_list.txt")
+        if "plan" in formats:
+            from dice_art.buildplan import export_build_plan
+            plan_format, panel, page_size = plan or ("pdf", DEFAULT_PANEL, DEFAULT_PAGE)
+            if plan_format == "svg":
+                # One file per page, so keep them together
+                os.makedirs(base + "_plan", exist_ok=True)
+                plan_path = os.path.join(base + "_plan", "page.svg")
+            else:
+                plan_path = base + "_plan.pdf"
+            outputs.extend(export_build_plan(grid, plan_path, color, panel, page_size))
+        timings["export"] = timings.get("export", 0.0) + time.perf_counter() - t
+
+    timings["total"] = time.perf_counter() - start
+    result = {"path": path, "outputs": outputs, "timings": timings}
+    if metrics:
+        result["metrics"] = variant_metrics
+    return result
+
+
+def animate_image(path, variants, output_dir, animation, die_px, palette=None, jobs=1):
+    """Convert every frame of an animated image for every variant, quantizing frames on jobs workers"""
+    from dice_art.animation import export_animation
+
+    with profiled(f"animate {os.path.basename(path)}"):
+        start = time.perf_counter()
+        outputs = []
+        frames = 0
+        single = len(variants) == 1
+        for variant in variants:
+            width, brightness, contrast, color, mapping = variant
+            output = os.path.join(output_dir, variant_stem(path, variant, single)) + ANIMATION_OUTPUTS[animation]
+            frames += export_animation(path, output, width, brightness, contrast, mapping, color, palette, die_px,
+                                       jobs=jobs)
+            outputs.append(output)
+        elapsed = time.perf_counter() - start
+        return {"path": path, "outputs": outputs,
+                "timings": {"total": elapsed, "per_frame": elapsed / max(frames, 1)}}
+
+
+def sweep_image(path, args, output_dir, palette=None, jobs=1):
+    """Write a contact sheet of every width/brightness/contrast/mapping/color combination"""
+    from dice_art.sweep import contact_sheet, run_sweep
+
+    with profiled(f"sweep {os.path.basename(path)}"):
+        start = time.perf_counter()
+        entries = run_sweep(path, args.width, args.brightness, args.contrast, args.mapping, args.color, palette,
+                            jobs=jobs)
+        t = time.perf_counter()
+        output = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + "_sheet.png")
+        contact_sheet(entries).save(output)
+        return {"path": path, "outputs": [output],
+                "timings": {"sweep": t - start, "sheet": time.perf_counter() - t,
+                            "total": time.perf_counter() - start}}
+
+
+def run_sweeps(paths, args, output_dir, palette, jobs):
+    """Run sweep_image for each path in turn, yielding (path, result, error)"""
+    for path in paths:
+        try:
+            yield path, sweep_image(path, args, output_dir, palette, jobs), None
+        except Exception as e:
+            yield path, None, e
+
+
+def format_timings(timings):
+    return " ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in timings.items())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dice-art", description="Convert images into dice art mosaics")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default=".", help="directory for generated files")
+    parser.add_argument("-w", "--width", type=int, nargs="+", default=[30], help="dice grid width(s)")
+    parser.add_argument("-b", "--brightness", type=float, nargs="+", default=[1.0], help="brightness factor(s)")
+    parser.add_argument("-c", "--contrast", type=float, nargs="+", default=[1.0], help="contrast factor(s)")
+    parser.add_argument("--color", nargs="+", default=["white"], choices=tuple(DICE_COLORS),
+                        help="dice color scheme(s)")
+    parser.add_argument("-m", "--mapping", nargs="+", choices=MAPPINGS,
+                        help="brightness to face mapping(s) (default: linear, or palette with --palette)")
+    parser.add_argument("--palette", nargs="+", choices=tuple(DICE_COLORS),
+                        help="mix dice of these schemes, matching each cell to the nearest die color")
+    parser.add_argument("--palette-file", help="JSON file of measured die colors {scheme: {face: '#rrggbb'}}")
+    parser.add_argument("--inventory",
+                        help="dice in stock, e.g. white=4000,black=2500, or a JSON file; fits width and schemes to it")
+    parser.add_argument("--die-px", "--die-size", dest="die_px", type=int, default=None,
+                        help=f"pixel size of each die in exported images (default: {EXPORT_DIE_SIZE}, "
+                             f"{ANIMATION_DIE_SIZE} for animations; PNG is streamed, so large values are fine)")
+    parser.add_argument("--animate", choices=tuple(ANIMATION_OUTPUTS),
+                        help="convert every frame of animated inputs (GIF, APNG, WebP) into a dice animation "
+                             "instead of writing --formats")
+    parser.add_argument("--contact-sheet", action="store_true",
+                        help="write one labeled contact sheet per image of every --width/--brightness/--contrast/"
+                             "--mapping/--color combination instead of writing --formats")
+    parser.add_argument("--metrics", action="store_true",
+                        help="score each grid against its source (SSIM, tone error, histogram distance)")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help="comma-separated outputs to write: grid, image, list, plan (default: grid,image,list)")
+    parser.add_argument("--grid-format", default="txt", choices=GRID_FORMATS,
+                        help="grid output as text, CSV, JSON or compact binary (default: txt)")
+    parser.add_argument("--plan-format", default="pdf", choices=PLAN_FORMATS,
+                        help="build plan as one PDF, or one SVG file per page in a _plan directory")
+    parser.add_argument("--plan-panel", default="10", help="dice per build plan page, N or COLUMNSxROWS (default: 10)")
+    parser.add_argument("--plan-page", default=DEFAULT_PAGE, choices=tuple(PAGE_SIZES), help="build plan page size")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of worker processes (per image, per animation's frames with --animate, "
+                             "or per brightness/contrast pair with --contact-sheet)")
+    parser.add_argument("--profile", metavar="MODES",
+                        help="profile each image with cprofile and/or tracemalloc (comma-separated)")
+    parser.add_argument("--profile-dir", default=None, help="directory for profiling reports (default: output dir)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    formats = {f.strip() for f in args.formats.split(",") if f.strip()}
+    unknown = formats - set(FORMATS)
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(sorted(unknown))}")
+
+    if args.animate and args.contact_sheet:
+        parser.error("--contact-sheet cannot be combined with --animate")
+    if args.metrics and (args.animate or args.contact_sheet):
+        parser.error("--metrics cannot be combined with --animate or --contact-sheet")
+    if args.metrics:
+        from dice_art.metrics import format_metrics
+
+    try:
+        plan = (args.plan_format, parse_panel(args.plan_panel), args.plan_page)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.profile:
+        try:
+            configure_profiling(parse_modes(args.profile), args.profile_dir or args.output_dir)
+        except ValueError as e:
+            parser.error(str(e))
+
+    inventory = None
+    if args.inventory:
+        from dice_art.inventory import parse_inventory
+        try:
+            inventory = parse_inventory(args.inventory)
+        except (OSError, ValueError) as e:
+            parser.error(f"invalid inventory: {e}")
+        unknown = set(inventory) - set(DICE_COLORS)
+        if unknown:
+            parser.error(f"unknown scheme(s) in inventory: {', '.join(sorted(unknown))}")
+        if args.animate or args.contact_sheet:
+            parser.error("--inventory cannot be combined with --animate or --contact-sheet")
+        # Width and mapping come from the fit; name variants accordingly
+        args.width = ["fit"]
+        args.mapping = ["fit"]
+
+    palette = None
+    if args.palette_file or args.palette:
+        from dice_art.palette import Palette
+        palette = Palette.from_json(args.palette_file) if args.palette_file else Palette.from_schemes(args.palette)
+        missing = set(inventory or ()) - set(palette.schemes)
+        if missing:
+            parser.error(f"inventory scheme(s) missing from the palette: {', '.join(sorted(missing))}")
+    if args.mapping is None:
+        args.mapping = ["palette"] if palette is not None else ["linear"]
+
+    paths = expand_animation_inputs(args.inputs) if args.animate else expand_inputs(args.inputs)
+    if not paths:
+        parser.error("no input images found")
+    os.makedirs(args.output_dir, exist_ok=True)
+    variants = build_variants(args)
+
+    start = time.perf_counter()
+    failures = 0
+    if args.contact_sheet:
+        results = run_sweeps(paths, args, args.output_dir, palette, args.jobs)
+    elif args.animate:
+        die_px = args.die_px or ANIMATION_DIE_SIZE
+        results = run_animations(paths, variants, args.output_dir, args.animate, die_px, palette, args.jobs)
+    else:
+        die_px = args.die_px or EXPORT_DIE_SIZE
+        tasks = [(path, variants, args.output_dir, formats, die_px, palette, inventory, plan, args.grid_format,
+                  args.metrics) for path in paths]
+        results = run_tasks(tasks, args.jobs)
+    for path, result, error in results:
+        if error is not None:
+            print(f"{path}: failed: {error}", file=sys.stderr)
+            failures += 1
+        else:
+            print(f"{path}: {len(result['outputs'])} file(s) {format_timings(result['timings'])}")
+            for stem, metrics in result.get("metrics", {}).items():
+                print(f"  {stem}: {format_metrics(metrics)}")
+
+    print(f"Processed {len(paths) - failures}/{len(paths)} image(s) in {time.perf_counter() - start:.2f}s")
+    return 1 if failures else 0
+
+
+def run_animations(paths, variants, output_dir, animation, die_px, palette, jobs):
+    """Run animate_image for each path in turn, yielding (path, result, error)"""
+    for path in paths:
+        try:
+            yield path, animate_image(path, variants, output_dir, animation, die_px, palette, jobs), None
+        except Exception as e:
+            yield path, None, e
+
+
+def run_tasks(tasks, jobs):
+    """Run process_image for each task, yielding (path, result, error) as they finish"""
+    if jobs <= 1:
+        for task in tasks:
+            try:
+                yield task[0], process_image(*task), None
+            except Exception as e:
+                yield task[0], None, e
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(process_image, *task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
@@ -0,0 +1,241 @@
+"""Local edits of a dice grid: brush and rectangle regions
+
+An edit either pins a face value on the cells of a region or re-quantizes
+them with a local brightness/contrast adjustment. Local adjustments are
+applied to the resampled image the grid was quantized from (the resample
+stage of StageCache), and only a window around the region is quantized
+again:
+
+    linear, perceptual, palette   the region itself (cells are independent)
+    bayer                         widened to the 4x4 threshold tiling
+    equalized                     the region, through the whole image's LUT
+    floyd-steinberg, atkinson     widened by DIFFUSION_CONTEXT cells, so the
+                                  diffused error entering the region settles
+
+Adjustments always start from the unedited tones, so brushing twice over
+the same cells gives the same result instead of compounding.
+
+Grids are immutable, so every edit produces a new DiceGrid, and the undo
+history stores only the cells that changed: flat indices with their codes
+before and after (6 bytes per cell). A brush stroke is one undo step.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from dice_art.cells import FACE_MASK, ROTATED
+from dice_art.grid import as_dice_grid
+from dice_art.palette import Palette
+from dice_art.pipeline import quantize_resampled, resample_mode
+from dice_art.quantize import FACE_LUT, equalize_lut
+
+# Edits kept for undo
+UNDO_LIMIT = 200
+
+# Cells re-quantized around a region for the error-diffusion mappings
+DIFFUSION_CONTEXT = 8
+
+# Luma weights used for the mean of a color region (as PIL's "L" conversion)
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def brush_region(shape, row, col, radius):
+    """Return (box, mask) of the cells within radius of a cell, clipped to the grid"""
+    height, width = shape
+    row0, row1 = max(0, row - radius), min(height, row + radius + 1)
+    col0, col1 = max(0, col - radius), min(width, col + radius + 1)
+    rows = np.arange(row0, row1)[:, None] - row
+    cols = np.arange(col0, col1)[None, :] - col
+    return (row0, row1, col0, col1), rows * rows + cols * cols <= radius * radius + radius
+
+
+def rect_region(shape, row0, col0, row1, col1):
+    """Return (box, mask) of the cells between two corner cells (inclusive, any order)"""
+    height, width = shape
+    row0, row1 = sorted((row0, row1))
+    col0, col1 = sorted((col0, col1))
+    box = (max(0, row0), min(height, row1 + 1), max(0, col0), min(width, col1 + 1))
+    return box, np.ones((max(0, box[1] - box[0]), max(0, box[3] - box[2])), dtype=bool)
+
+
+def adjust_tones(tones, mask, brightness=1.0, contrast=1.0):
+    """Brightness and contrast of the masked pixels, as adjust_image does for a whole image
+
+    Contrast stretches around the mean brightness of the masked pixels.
+    """
+    values = tones[mask] * brightness
+    luma = values @ LUMA if values.ndim == 2 else values
+    if len(luma):
+        mean = luma.mean()
+        values = mean + (values - mean) * contrast
+    adjusted = tones.copy()
+    adjusted[mask] = values
+    return adjusted
+
+
+class CellDelta:
+    """Cells changed by one edit: flat indices with their codes before and after"""
+
+    __slots__ = ("index", "old", "new", "box")
+
+    def __init__(self, before, after, box):
+        row0, row1, col0, col1 = box
+        old = before.cells[row0:row1, col0:col1]
+        new = after.cells[row0:row1, col0:col1]
+        rows, cols = np.nonzero(old != new)
+        self.index = ((rows + row0) * before.width + cols + col0).astype(np.uint32)
+        self.old = old[rows, cols]
+        self.new = new[rows, cols]
+        self.box = box
+
+    def __len__(self):
+        return len(self.index)
+
+
+class GridEditor:
+    """Edit history over a DiceGrid
+
+    resampled is the resample stage output the grid was quantized from;
+    without it only pinning is available.
+    """
+
+    def __init__(self, grid, resampled=None, mapping="linear", color="white", palette=None,
+                 history=UNDO_LIMIT):
+        self.grid = as_dice_grid(grid)
+        self.mapping = mapping
+        self.color = color
+        if mapping == "palette" and not isinstance(palette, Palette):
+            palette = Palette.from_schemes(palette or (color,))
+        self.palette = palette
+        self.undo_stack = deque(maxlen=history)
+        self.redo_stack = []
+        self._stroke = None
+        self._samples = resample_mode(mapping)[1]
+
+        self.tones = None
+        self._equalize = None
+        if resampled is not None:
+            tones = np.asarray(resampled)
+            if tones.shape[:2] != (self.grid.height * self._samples, self.grid.width * self._samples):
+                raise ValueError(f"Resampled image of shape {tones.shape} does not match a "
+                                 f"{self.grid.width}x{self.grid.height} grid")
+            if mapping == "equalized":
+                self._equalize = equalize_lut(tones)
+            self.tones = tones.astype(np.float32)
+
+    @property
+    def can_adjust(self):
+        return self.tones is not None
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def pin(self, region, face):
+        """Set the face of every cell in a (box, mask) region, keeping its scheme
+
+        Returns the box of changed cells, or None.
+        """
+        box, mask = region
+        row0, row1, col0, col1 = box
+        cells = self.grid.cells[row0:row1, col0:col1]
+        codes = (cells & ~np.uint8(FACE_MASK | ROTATED)) | np.uint8(face)
+        return self._apply(box, mask, codes)
+
+    def adjust(self, region, brightness=1.0, contrast=1.0):
+        """Re-quantize a (box, mask) region with a local brightness/contrast adjustment
+
+        Returns the box of changed cells, or None.
+        """
+        if not self.can_adjust:
+            raise ValueError("Local adjustments need the image the grid was generated from")
+        box, mask = region
+        row0, row1, col0, col1 = box
+        if row0 >= row1 or col0 >= col1:
+            return None
+
+        # Window quantized around the region, in cells
+        win_row0, win_col0, win_col1 = row0, col0, col1
+        if self.mapping == "bayer":
+            win_row0, win_col0 = row0 - row0 % 4, col0 - col0 % 4
+        elif self.mapping in ("floyd-steinberg", "atkinson"):
+            win_row0 = max(0, row0 - DIFFUSION_CONTEXT)
+            win_col0 = max(0, col0 - DIFFUSION_CONTEXT)
+            win_col1 = min(self.grid.width, col1 + DIFFUSION_CONTEXT)
+        window_mask = np.zeros((row1 - win_row0, win_col1 - win_col0), dtype=bool)
+        window_mask[row0 - win_row0:, col0 - win_col0:col1 - win_col0] = mask
+
+        s = self._samples
+        tones = self.tones[win_row0 * s:row1 * s, win_col0 * s:win_col1 * s]
+        pixel_mask = np.repeat(np.repeat(window_mask, s, axis=0), s, axis=1)
+        tones = np.clip(adjust_tones(tones, pixel_mask, brightness, contrast), 0, 255).round().astype(np.uint8)
+
+        if self._equalize is not None:
+            codes = FACE_LUT[self._equalize[tones]]
+        else:
+            codes = quantize_resampled(tones, self.mapping, self.color, self.palette).cells
+        return self._apply(box, mask, codes[row0 - win_row0:, col0 - win_col0:col1 - win_col0])
+
+    def begin_stroke(self):
+        """Group the edits until end_stroke into one undo step"""
+        self.end_stroke()
+        self._stroke = [self.grid, None]
+
+    def end_stroke(self):
+        if self._stroke is None:
+            return
+        before, box = self._stroke
+        self._stroke = None
+        if box is not None:
+            self._record(before, box)
+
+    def undo(self):
+        """Revert the last edit; returns the box of changed cells, or None"""
+        self.end_stroke()
+        if not self.undo_stack:
+            return None
+        delta = self.undo_stack.pop()
+        self._restore(delta, delta.old)
+        self.redo_stack.append(delta)
+        return delta.box
+
+    def redo(self):
+        """Re-apply the last undone edit; returns the box of changed cells, or None"""
+        self.end_stroke()
+        if not self.redo_stack:
+            return None
+        delta = self.redo_stack.pop()
+        self._restore(delta, delta.new)
+        self.undo_stack.append(delta)
+        return delta.box
+
+    def _apply(self, box, mask, codes):
+        row0, row1, col0, col1 = box
+        index = (slice(row0, row1), slice(col0, col1))
+        current = self.grid.cells[index]
+        codes = np.where(mask, codes, current)
+        if np.array_equal(codes, current):
+            return None
+        before = self.grid
+        self.grid = before.with_cells(index, codes)
+        if self._stroke is not None:
+            stroke_box = self._stroke[1]
+            if stroke_box is not None:
+                box = (min(box[0], stroke_box[0]), max(box[1], stroke_box[1]),
+                       min(box[2], stroke_box[2]), max(box[3], stroke_box[3]))
+            self._stroke[1] = box
+        else:
+            self._record(before, box)
+        return (row0, row1, col0, col1)
+
+    def _record(self, before, box):
+        delta = CellDelta(before, self.grid, box)
+        if len(delta):
+            self.undo_stack.append(delta)
+            self.redo_stack.clear()
+
+    def _restore(self, delta, codes):
+        self.grid = self.grid.with_cells(np.unravel_index(delta.index, self.grid.shape), codes)
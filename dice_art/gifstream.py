@@ -0,0 +1,115 @@
+"""Frame-wise animated GIF writer
+
+Pillow's multi-frame GIF and APNG writers collect every frame before
+writing, so memory grows with the animation. Here each frame is encoded
+as a standalone GIF by Pillow (palette quantization and LZW), and its
+color table and image data blocks are copied into one animated stream
+with a per-frame delay, so only the current frame is ever held.
+"""
+
+import io
+import struct
+
+from PIL import Image
+
+GIF_HEADER = b"GIF89a"
+GIF_TRAILER = b"\x3b"
+
+# Disposal method 1: leave the frame in place; every frame is full size
+DISPOSE_NONE = 1 << 2
+
+
+def skip_sub_blocks(data, pos):
+    """Return the position after a chain of data sub-blocks"""
+    while data[pos]:
+        pos += data[pos] + 1
+    return pos + 1
+
+
+def split_gif(data):
+    """Return (color table, color table size bits, image descriptor, image data) of a single-frame GIF"""
+    if data[:3] != b"GIF":
+        raise ValueError("Not a GIF stream")
+    flags = data[10]
+    pos = 13
+    table = b""
+    size_bits = 0
+    if flags & 0x80:
+        size_bits = flags & 0x07
+        table_end = pos + 3 * (2 << size_bits)
+        table = data[pos:table_end]
+        pos = table_end
+
+    while pos < len(data):
+        block = data[pos]
+        if block == 0x21:  # extension
+            pos = skip_sub_blocks(data, pos + 2)
+        elif block == 0x2C:  # image descriptor
+            descriptor = data[pos:pos + 10]
+            pos += 10
+            packed = descriptor[9]
+            if packed & 0x80:
+                size_bits = packed & 0x07
+                table_end = pos + 3 * (2 << size_bits)
+                table = data[pos:table_end]
+                pos = table_end
+            start = pos
+            pos = skip_sub_blocks(data, pos + 1)  # LZW minimum code size, then data
+            return table, size_bits, descriptor, data[start:pos]
+        else:
+            break
+    raise ValueError("GIF stream has no image")
+
+
+class GIFStreamWriter:
+    """Incrementally write a looping animated GIF of known size"""
+
+    def __init__(self, path, width, height, loops=0):
+        self.width = int(width)
+        self.height = int(height)
+        self.frames_written = 0
+        self._file = open(path, "wb")
+        # No global color table; every frame carries its own
+        self._file.write(GIF_HEADER + struct.pack("<HHBBB", self.width, self.height, 0, 0, 0))
+        self._file.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", loops) + b"\x00")
+
+    def write_frame(self, frame, delay_ms=100):
+        """Append a full-size frame (Image or (h, w, 3) uint8 array) shown for delay_ms"""
+        if not isinstance(frame, Image.Image):
+            frame = Image.fromarray(frame, "RGB")
+        if frame.size != (self.width, self.height):
+            raise ValueError(f"Expected a {self.width}x{self.height} frame, got {frame.size[0]}x{frame.size[1]}")
+
+        if frame.mode != "P":
+            # Dice frames have few distinct colors, so this is usually exact
+            frame = frame.convert("RGB").quantize(256, method=Image.Quantize.FASTOCTREE)
+        buffer = io.BytesIO()
+        frame.save(buffer, "GIF")
+        table, size_bits, descriptor, image_data = split_gif(buffer.getvalue())
+
+        # GIF delays are in hundredths of a second; most viewers treat below 2 as 10
+        delay = max(2, int(round(delay_ms / 10)))
+        self._file.write(b"\x21\xf9\x04" + struct.pack("<BHB", DISPOSE_NONE, delay, 0) + b"\x00")
+        # Keep position, size and interlacing; move the frame's table into a local one
+        packed = 0x80 | (descriptor[9] & 0x40) | size_bits
+        self._file.write(descriptor[:9] + bytes([packed]) + table + image_data)
+        self.frames_written += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            if not self.frames_written:
+                raise ValueError("An animated GIF needs at least one frame")
+            self._file.write(GIF_TRAILER)
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
@@ -0,0 +1,277 @@
+"""DiceGrid: a dice grid as one uint8 array plus its dice counts
+
+Cells hold the codes described in dice_art.cells. The dice counts are
+taken once, with a single bincount over the cell codes, when the grid is
+built, so dice lists and per-scheme totals never walk the cells again.
+Grids are read-only: editing produces a new grid (see with_cells), whose
+counts are updated from the changed cells alone.
+
+DiceGrid implements __array__, so every function that takes an array
+(rendering, the viewport, np.asarray) takes a DiceGrid as well.
+
+Serializers:
+
+    text    space-separated tokens per row, e.g. "3 black:2r 6"
+    csv     the same tokens, comma-separated
+    json    {"width", "height", "dice", "schemes", "grid": [[code, ...], ...]}
+    binary  "DGRD", version, height, width, then the raw cells (C order)
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from dice_art.cells import FACE_MASK, ROTATED, SCHEME_SHIFT, cell_faces, cell_rotations, cell_schemes
+from dice_art.render import SCHEME_NAMES, scheme_name, scheme_slot
+
+BINARY_MAGIC = b"DGRD"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHII")
+
+# Face (0-7) and scheme slot of every cell code
+CODE_FACES = np.arange(256) & FACE_MASK
+CODE_SLOTS = np.arange(256) >> SCHEME_SHIFT
+
+
+def grid_diff(old, new):
+    """Return (mask, box) of the cells that differ between two grids of the same shape
+
+    box is (row0, row1, col0, col1) bounding the changes, or None when the
+    grids are equal.
+    """
+    mask = np.asarray(old) != np.asarray(new)
+    rows = np.flatnonzero(mask.any(axis=1))
+    if not len(rows):
+        return mask, None
+    cols = np.flatnonzero(mask.any(axis=0))
+    return mask, (int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1)
+
+
+def parse_token(token):
+    """Cell code of a text token such as 4, 2r or black:3r"""
+    name, _, die = token.rpartition(":")
+    rotated = die.endswith("r")
+    face = int(die[:-1] if rotated else die)
+    if not 1 <= face <= 6:
+        raise ValueError(f"Invalid die '{token}'")
+    return face | (ROTATED if rotated else 0) | ((scheme_slot(name) if name else 0) << SCHEME_SHIFT)
+
+
+def parse_tokens(rows):
+    """Cell codes from rows of tokens; every distinct token is parsed once"""
+    if not rows or len({len(row) for row in rows}) != 1 or not rows[0]:
+        raise ValueError("Grid rows must be non-empty and of equal length")
+    tokens, inverse = np.unique(np.array(rows), return_inverse=True)
+    try:
+        codes = np.array([parse_token(str(token)) for token in tokens], dtype=np.uint8)
+    except ValueError as e:
+        raise ValueError(f"Invalid grid: {e}") from None
+    return codes[inverse.reshape(len(rows), -1)]
+
+
+class DiceGrid:
+    """Read-only grid of cell codes with dice counts taken at construction"""
+
+    def __init__(self, cells, _view=False):
+        if _view:
+            cells = np.asarray(cells)
+        else:
+            cells = np.ascontiguousarray(cells, dtype=np.uint8)
+        if cells.ndim != 2:
+            raise ValueError(f"A dice grid is two-dimensional, got shape {cells.shape}")
+        # A view of our own, so marking it read-only never affects the caller's array
+        self.cells = cells.view()
+        self.cells.flags.writeable = False
+        self.code_counts = np.bincount(self.cells.ravel(), minlength=256)
+
+    @classmethod
+    def _with_counts(cls, cells, code_counts):
+        grid = cls.__new__(cls)
+        grid.cells = cells
+        grid.cells.flags.writeable = False
+        grid.code_counts = code_counts
+        return grid
+
+    def __reduce__(self):
+        # Unpickled grids are rebuilt read-only, with their counts
+        return DiceGrid, (self.cells,)
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.cells.dtype:
+            return self.cells.copy() if copy else self.cells
+        if copy is False:
+            raise ValueError(f"A dice grid cannot be converted to {np.dtype(dtype)} without copying")
+        return self.cells.astype(dtype)
+
+    def __getitem__(self, key):
+        return self.cells[key]
+
+    def __repr__(self):
+        return f"DiceGrid({self.width}x{self.height}, {self.size} dice)"
+
+    @property
+    def shape(self):
+        return self.cells.shape
+
+    @property
+    def height(self):
+        return self.cells.shape[0]
+
+    @property
+    def width(self):
+        return self.cells.shape[1]
+
+    @property
+    def size(self):
+        return self.cells.size
+
+    def face(self, row, col):
+        """Face value (1-6) of one cell"""
+        return int(self.cells[row, col]) & FACE_MASK
+
+    @property
+    def faces(self):
+        return cell_faces(self.cells)
+
+    @property
+    def rotations(self):
+        return cell_rotations(self.cells)
+
+    @property
+    def schemes(self):
+        return cell_schemes(self.cells)
+
+    def face_counts(self):
+        """{face: count} over all schemes"""
+        counts = np.bincount(CODE_FACES, weights=self.code_counts, minlength=8)
+        return {value: int(counts[value]) for value in range(1, 7)}
+
+    def scheme_counts(self, color="white"):
+        """{scheme: {face: count}} for every scheme used, with slot 0 counted as color"""
+        counts = np.bincount(CODE_SLOTS * 8 + CODE_FACES, weights=self.code_counts,
+                             minlength=8 * (len(SCHEME_NAMES) + 1)).reshape(-1, 8)
+        result = {}
+        for slot in np.flatnonzero(counts.sum(axis=1)):
+            faces = result.setdefault(scheme_name(int(slot), color), {value: 0 for value in range(1, 7)})
+            for value in range(1, 7):
+                faces[value] += int(counts[slot, value])
+        return result
+
+    def region(self, row0, row1, col0, col1):
+        """Grid of a rectangle of cells, sharing this grid's memory"""
+        return DiceGrid(self.cells[row0:row1, col0:col1], _view=True)
+
+    def diff(self, other):
+        """(mask, box) of the cells that differ from another grid of the same shape"""
+        return grid_diff(self.cells, other)
+
+    def with_cells(self, index, values):
+        """New grid with the cells at index (mask, slices or fancy index) set to values
+
+        Counts are updated from the changed cells instead of recounted.
+        """
+        cells = self.cells.copy()
+        # Slices index a view, so take the old codes before overwriting them
+        old = np.array(cells[index])
+        cells[index] = values
+        new = cells[index]
+        counts = (self.code_counts - np.bincount(np.ravel(old), minlength=256)
+                  + np.bincount(np.ravel(new), minlength=256))
+        return DiceGrid._with_counts(cells, counts)
+
+    # Serializers
+
+    def tokens(self):
+        """Text tokens of every cell as an array of strings"""
+        tokens = cell_faces(self.cells).astype(str)
+        rotated = cell_rotations(self.cells).astype(bool)
+        if rotated.any():
+            tokens = np.char.add(tokens, np.where(rotated, "r", ""))
+        slots = cell_schemes(self.cells)
+        if slots.any():
+            prefixes = np.array([""] + [f"{name}:" for name in SCHEME_NAMES])
+            tokens = np.char.add(prefixes[slots], tokens)
+        return tokens
+
+    def to_text(self):
+        return "".join(" ".join(row) + "\n" for row in self.tokens().tolist())
+
+    def to_csv(self):
+        return "".join(",".join(row) + "\n" for row in self.tokens().tolist())
+
+    def to_dict(self, color="white"):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "dice": self.face_counts(),
+            "schemes": self.scheme_counts(color),
+            "grid": self.cells.tolist(),
+        }
+
+    def to_json(self, color="white"):
+        return json.dumps(self.to_dict(color))
+
+    def to_bytes(self):
+        return BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, self.height, self.width) + self.cells.tobytes()
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(parse_tokens([line.split() for line in text.splitlines() if line.strip()]))
+
+    @classmethod
+    def from_csv(cls, text):
+        return cls(parse_tokens([[token.strip() for token in line.split(",")]
+                                 for line in text.splitlines() if line.strip()]))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(np.array(json.loads(text)["grid"], dtype=np.uint8))
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, height, width = BINARY_HEADER.unpack_from(data)
+        if magic != BINARY_MAGIC:
+            raise ValueError("Not a binary dice grid")
+        if version > BINARY_VERSION:
+            raise ValueError(f"Unsupported dice grid version {version}")
+        cells = np.frombuffer(data, dtype=np.uint8, count=height * width, offset=BINARY_HEADER.size)
+        return cls(cells.reshape(height, width))
+
+
+def as_dice_grid(grid):
+    """Return grid as a DiceGrid, without copying one that already is"""
+    return grid if isinstance(grid, DiceGrid) else DiceGrid(grid)
+
+
+# Grid file formats by extension; anything else is text
+GRID_FORMATS = {".csv": "csv", ".json": "json", ".dgrid": "binary"}
+
+
+def grid_format(path):
+    name = str(path).lower()
+    return next((fmt for ext, fmt in GRID_FORMATS.items() if name.endswith(ext)), "text")
+
+
+def save_grid(grid, path, color="white"):
+    """Write a grid in the format given by the file extension"""
+    grid = as_dice_grid(grid)
+    fmt = grid_format(path)
+    if fmt == "binary":
+        with open(path, "wb") as f:
+            f.write(grid.to_bytes())
+        return
+    text = {"csv": grid.to_csv, "json": lambda: grid.to_json(color), "text": grid.to_text}[fmt]()
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def load_grid(path):
+    """Read a grid written by save_grid"""
+    fmt = grid_format(path)
+    if fmt == "binary":
+        with open(path, "rb") as f:
+            return DiceGrid.from_bytes(f.read())
+    with open(path, "r") as f:
+        text = f.read()
+    return {"csv": DiceGrid.from_csv, "json": DiceGrid.from_json, "text": DiceGrid.from_text}[fmt](text)
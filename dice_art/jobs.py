@@ -0,0 +1,159 @@
+"""Background job runner for the Tk app
+
+Jobs run one at a time on a worker thread. Progress, results and errors
+are queued by the worker and delivered on the Tk main loop through
+root.after polling, so callbacks may touch widgets freely.
+"""
+
+import queue
+import threading
+
+from dice_art.profiling import profiled
+
+# Interval at which finished work is collected on the main loop
+JOB_POLL_MS = 30
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once it has been cancelled"""
+
+
+class Job:
+    def __init__(self, name, fn, on_done=None, on_progress=None, on_error=None, on_cancel=None):
+        self.name = name
+        self.fn = fn
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self._cancel_event = threading.Event()
+        self._events = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check(self):
+        """Abort the job if it has been cancelled"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, fraction, message=""):
+        """Report progress from the worker; also serves as a cancellation point"""
+        self.check()
+        self._events.put(("progress", self, (fraction, message)))
+
+
+class JobRunner:
+    """Run jobs on a worker thread and post their outcome back through root.after
+
+    Submitting a job cancels any earlier job with the same name, and results
+    of cancelled jobs are dropped, so a stale render never overwrites a
+    newer one.
+    """
+
+    def __init__(self, root, poll_ms=JOB_POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._jobs = queue.Queue()
+        self._events = queue.Queue()
+        self._active = {}
+        self._pending = 0
+        self._poll_id = None
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="dice-art-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, name, fn, on_done=None, on_progress=None, on_error=None, on_cancel=None):
+        """Queue fn(job) for the worker thread and return the Job"""
+        if self._closed:
+            raise RuntimeError("Job runner has been shut down")
+        self.cancel(name)
+        job = Job(name, fn, on_done, on_progress, on_error, on_cancel)
+        job._events = self._events
+        self._active[name] = job
+        self._pending += 1
+        self._jobs.put(job)
+        self._schedule_poll()
+        return job
+
+    def cancel(self, name=None):
+        """Cancel the job with the given name, or every job"""
+        if name is None:
+            jobs = list(self._active.values())
+        else:
+            jobs = [self._active[name]] if name in self._active else []
+        for job in jobs:
+            job.cancel()
+
+    def busy(self, name=None):
+        if name is None:
+            return bool(self._active)
+        return name in self._active
+
+    def shutdown(self, timeout=2.0):
+        """Cancel outstanding work and stop the worker thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self.cancel()
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._jobs.put(None)
+        self._worker.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            if job.cancelled:
+                self._events.put(("cancelled", job, None))
+                continue
+            try:
+                with profiled(job.name):
+                    result = job.fn(job)
+            except JobCancelled:
+                self._events.put(("cancelled", job, None))
+            except Exception as e:
+                self._events.put(("error", job, e))
+            else:
+                self._events.put(("done", job, result))
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                kind, job, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "progress":
+                if not job.cancelled and job.on_progress:
+                    job.on_progress(*payload)
+                continue
+
+            self._pending -= 1
+            if self._active.get(job.name) is job:
+                del self._active[job.name]
+            if job.cancelled or kind == "cancelled":
+                # Stale result: drop it, and only report the cancellation
+                # when no newer job of the same name superseded it
+                if job.on_cancel and job.name not in self._active:
+                    job.on_cancel()
+            elif kind == "done":
+                if job.on_done:
+                    job.on_done(payload)
+            elif job.on_error:
+                job.on_error(payload)
+
+        if self._pending:
+            self._schedule_poll()
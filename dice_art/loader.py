@@ -0,0 +1,150 @@
+"""Shared image loader: lazy header info, reduced JPEG decoding, EXIF orientation
+
+Callers ask for an image at the smallest size they need instead of opening
+and fully decoding the file themselves:
+
+- info() reads only the header: the size (already turned for the EXIF
+  orientation), format and mode;
+- load(path, min_size) decodes JPEGs through draft(), which lets libjpeg
+  scale by 1/2, 1/4 or 1/8 during decoding, so a 100-dice grid of a 50MP
+  photo decodes a few megapixels, not fifty;
+- every decode is EXIF-transposed once, so phone photos come out upright;
+- decoded variants are kept in an LRU cache bounded by a byte budget and a
+  request is served by the smallest cached variant that is large enough.
+
+Cached images are shared; callers must not modify them in place.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageOps
+
+# Bytes of decoded pixels kept across all cached variants
+DEFAULT_BUDGET_BYTES = 512 << 20
+
+# EXIF orientations that swap width and height
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+EXIF_ORIENTATION = 0x0112
+
+
+class ImageInfo:
+    """Header-only facts about an image file"""
+
+    def __init__(self, size, format, mode, orientation=1):
+        self.size = size
+        self.format = format
+        self.mode = mode
+        self.orientation = orientation
+
+
+def image_bytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+class ImageLoader:
+    """Decode images once, at the smallest sufficient scale, behind an LRU byte budget"""
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._info = {}
+        self._variants = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _file_key(path):
+        # A rewritten file gets a new key, so stale decodes are never served
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def info(self, path):
+        """Return the ImageInfo of a file, reading only its header"""
+        key = self._file_key(path)
+        with self._lock:
+            info = self._info.get(key)
+        if info is None:
+            with Image.open(path) as img:
+                orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+                size = img.size[::-1] if orientation in TRANSPOSED_ORIENTATIONS else img.size
+                info = ImageInfo(size, img.format, img.mode, orientation)
+            with self._lock:
+                self._info[key] = info
+        return info
+
+    def size(self, path):
+        return self.info(path).size
+
+    def load(self, path, min_size=None):
+        """Return the image upright, decoded at no less than min_size (default: full size)"""
+        key = self._file_key(path)
+        with self._lock:
+            cached = self._find(key, min_size)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        img = self._decode(path, min_size)
+        with self._lock:
+            self._store(key, img, full=min_size is None or img.size == self.info(path).size)
+        return img
+
+    def _find(self, key, min_size):
+        best = None
+        for (file_key, full, size), img in self._variants.items():
+            if file_key != key:
+                continue
+            if min_size is None and not full:
+                continue
+            if min_size is not None and not full and (size[0] < min_size[0] or size[1] < min_size[1]):
+                continue
+            if best is None or image_bytes(img) < image_bytes(best[1]):
+                best = ((file_key, full, size), img)
+        if best is None:
+            return None
+        self._variants.move_to_end(best[0])
+        return best[1]
+
+    def _store(self, key, img, full):
+        variant = (key, full, img.size)
+        if variant in self._variants:
+            return
+        self._variants[variant] = img
+        self._bytes += image_bytes(img)
+        # Evict least recently used variants, but always keep the newest one
+        while self._bytes > self.budget_bytes and len(self._variants) > 1:
+            _, evicted = self._variants.popitem(last=False)
+            self._bytes -= image_bytes(evicted)
+
+    def _decode(self, path, min_size):
+        info = self.info(path)
+        with Image.open(path) as img:
+            if min_size is not None and img.format == "JPEG":
+                # draft() works in stored orientation and picks the smallest scale >= the request
+                width, height = min_size
+                if info.orientation in TRANSPOSED_ORIENTATIONS:
+                    width, height = height, width
+                img.draft(img.mode, (max(1, int(width)), max(1, int(height))))
+            img.load()
+            upright = ImageOps.exif_transpose(img)
+            # exif_transpose returns a copy when it rotates; detach from the file otherwise
+            return upright if upright is not img else img.copy()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "variants": len(self._variants),
+                    "bytes": self._bytes}
+
+    def clear(self):
+        with self._lock:
+            self._info.clear()
+            self._variants.clear()
+            self._bytes = 0
+
+
+# Loader shared by the GUI, the pipeline and the CLI
+IMAGE_LOADER = ImageLoader()
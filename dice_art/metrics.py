@@ -0,0 +1,184 @@
+"""Fidelity metrics: how closely a rendered mosaic reproduces its source
+
+The mosaic is compared in luminance at SAMPLES x SAMPLES pixels per die,
+the resolution perceptual matching works at. Its side is built from the
+face tiles the renderer draws, area-averaged per sample, and looked up per
+cell code, so nothing is rendered at full size. The reference is the
+adjusted source resampled to the same size (the "perceptual" resample
+stage). Dice cannot show black or white, so as in perceptual matching the
+mosaic's tones are stretched so its lightest and darkest faces span 0-255.
+
+Metrics are taken over the mean tone of each die, the mosaic as seen from
+a viewing distance; at sample resolution the pips dominate any structural
+comparison against a smooth source.
+
+    ssim                mean structural similarity over SSIM_WINDOW-die
+                        windows (box-filtered, via summed-area tables)
+    tone_error          mean absolute difference of the per-die mean tone,
+                        in gray levels
+    histogram_distance  earth mover's distance between the per-die tone
+                        histograms, in gray levels
+    score               ssim minus the weighted errors; higher is better
+
+score is cheap enough to be the objective of a parameter search:
+auto_tune() tries brightness, contrast and mapping combinations through a
+StageCache and keeps the one whose mosaic best matches the unadjusted
+source.
+"""
+
+import itertools
+from functools import lru_cache
+
+import numpy as np
+
+from dice_art.cells import FACE_MASK, SCHEME_SHIFT, TILE_MASK
+from dice_art.perceptual import PROFILE_SUPERSAMPLE, SAMPLES
+from dice_art.render import draw_face, scheme_name
+
+# Side of the square SSIM window in dice, and the usual stabilizing constants
+SSIM_WINDOW = 7
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+HISTOGRAM_BINS = 64
+
+# Weights of tone error and histogram distance, as fractions of 255, against SSIM in the score
+TONE_WEIGHT = 1.0
+HISTOGRAM_WEIGHT = 0.5
+
+# Default search space of auto_tune
+TUNE_BRIGHTNESS = (0.8, 0.9, 1.0, 1.1, 1.2)
+TUNE_CONTRAST = (0.8, 0.9, 1.0, 1.15, 1.3)
+TUNE_MAPPINGS = ("linear", "equalized", "floyd-steinberg", "atkinson", "bayer", "perceptual")
+
+
+@lru_cache(maxsize=512)
+def face_samples(scheme, tile_code, samples=SAMPLES):
+    """(samples, samples) mean luminance of a rendered face, for a face code with rotation bit"""
+    size = samples * PROFILE_SUPERSAMPLE
+    img = draw_face(size, scheme, tile_code & FACE_MASK, bool(tile_code & ~FACE_MASK))
+    lum = np.asarray(img.convert("L"), dtype=np.float32)
+    result = lum.reshape(samples, PROFILE_SUPERSAMPLE, samples, PROFILE_SUPERSAMPLE).mean(axis=(1, 3))
+    result.flags.writeable = False
+    return result
+
+
+def mosaic_tones(grid, color="white", samples=SAMPLES):
+    """Luminance of the rendered mosaic at samples per die, stretched to 0-255"""
+    grid = np.asarray(grid)
+    table = np.zeros((256, samples, samples), dtype=np.float32)
+    schemes = set()
+    for code in np.flatnonzero(np.bincount(grid.ravel(), minlength=256)):
+        if 1 <= code & FACE_MASK <= 6:
+            scheme = scheme_name(int(code) >> SCHEME_SHIFT, color)
+            schemes.add(scheme)
+            table[code] = face_samples(scheme, int(code) & TILE_MASK, samples)
+
+    # Stretch over every face of the schemes in use, not just the faces that occur
+    means = [face_samples(scheme, face, samples).mean() for scheme in schemes for face in range(1, 7)]
+    lo, hi = (min(means), max(means)) if means else (0.0, 255.0)
+    table = (table - lo) * np.float32(255.0 / max(hi - lo, 1e-6))
+
+    height, width = grid.shape
+    return table[grid].transpose(0, 2, 1, 3).reshape(height * samples, width * samples)
+
+
+def box_mean(arr, size):
+    """Mean over every size x size window (valid windows only), from a summed-area table"""
+    table = np.zeros((arr.shape[0] + 1, arr.shape[1] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(arr, axis=0, dtype=np.float64), axis=1, out=table[1:, 1:])
+    sums = table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]
+    return sums / (size * size)
+
+
+def ssim(a, b, window=SSIM_WINDOW):
+    """Mean structural similarity of two equally sized grayscale arrays"""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    window = min(window, *a.shape)
+    mean_a, mean_b = box_mean(a, window), box_mean(b, window)
+    var_a = box_mean(a * a, window) - mean_a * mean_a
+    var_b = box_mean(b * b, window) - mean_b * mean_b
+    cov = box_mean(a * b, window) - mean_a * mean_b
+    numerator = (2 * mean_a * mean_b + SSIM_C1) * (2 * cov + SSIM_C2)
+    denominator = (mean_a * mean_a + mean_b * mean_b + SSIM_C1) * (var_a + var_b + SSIM_C2)
+    return float((numerator / denominator).mean())
+
+
+def histogram_distance(a, b, bins=HISTOGRAM_BINS):
+    """Earth mover's distance between the tone histograms of two arrays, in gray levels"""
+    edges = np.linspace(0, 255, bins + 1)
+    hist_a = np.histogram(np.clip(a, 0, 255), edges)[0] / max(np.size(a), 1)
+    hist_b = np.histogram(np.clip(b, 0, 255), edges)[0] / max(np.size(b), 1)
+    return float(np.abs(np.cumsum(hist_a - hist_b)).sum() * (255.0 / bins))
+
+
+def die_means(tones, samples=SAMPLES):
+    """Mean tone of every die from (height * samples, width * samples) tones"""
+    height, width = tones.shape[0] // samples, tones.shape[1] // samples
+    return tones.reshape(height, samples, width, samples).mean(axis=(1, 3))
+
+
+def compare(grid, reference, color="white", samples=SAMPLES):
+    """Metrics of a grid against a reference of (height * samples, width * samples) gray levels
+
+    The reference is usually StageCache.resampled(width, brightness,
+    contrast, "perceptual") or pipeline.resample_image(adjusted, width,
+    "perceptual").
+    """
+    mosaic = mosaic_tones(grid, color, samples)
+    reference = np.asarray(reference, dtype=np.float32)
+    if reference.shape != mosaic.shape:
+        raise ValueError(f"Reference of shape {reference.shape} does not match the mosaic's {mosaic.shape}")
+    mosaic_dice, reference_dice = die_means(mosaic, samples), die_means(reference, samples)
+    metrics = {
+        "ssim": ssim(mosaic_dice, reference_dice),
+        "tone_error": float(np.abs(mosaic_dice - reference_dice).mean()),
+        "histogram_distance": histogram_distance(mosaic_dice, reference_dice),
+    }
+    metrics["score"] = fidelity_score(metrics)
+    return metrics
+
+
+def fidelity_score(metrics):
+    """Single objective from compare() metrics; higher is better"""
+    return (metrics["ssim"] - TONE_WEIGHT * metrics["tone_error"] / 255.0
+            - HISTOGRAM_WEIGHT * metrics["histogram_distance"] / 255.0)
+
+
+def grid_metrics(stages, grid, width, brightness=1.0, contrast=1.0, color="white"):
+    """Metrics of a grid against the source as adjusted for it"""
+    return compare(grid, stages.resampled(width, brightness, contrast, "perceptual"), color)
+
+
+def format_metrics(metrics):
+    return (f"SSIM {metrics['ssim']:.3f}, tone error {metrics['tone_error']:.1f}, "
+            f"histogram distance {metrics['histogram_distance']:.1f}")
+
+
+def auto_tune(stages, width, color="white", palette=None, brightness=TUNE_BRIGHTNESS, contrast=TUNE_CONTRAST,
+              mappings=None, progress=None):
+    """Search brightness, contrast and mapping for the mosaic closest to the unadjusted source
+
+    Returns (best, results, grid): best is the (brightness, contrast,
+    mapping) with the highest score, results maps every tried combination
+    to its metrics and grid is the best combination's grid. Combinations sharing brightness and contrast reuse the
+    adjusted image and pyramid in stages. mappings defaults to
+    TUNE_MAPPINGS, plus "palette" when palette schemes are given. progress,
+    if given, is called with the completed fraction and may raise to abort
+    the search.
+    """
+    if mappings is None:
+        mappings = TUNE_MAPPINGS + ("palette",) if palette else TUNE_MAPPINGS
+    reference = np.asarray(stages.resampled(width, 1.0, 1.0, "perceptual"), dtype=np.float32)
+    combinations = list(itertools.product(brightness, contrast, mappings))
+    results = {}
+    best = best_grid = None
+    for index, (b, c, mapping) in enumerate(combinations):
+        grid = stages.grid(width, b, c, mapping, color, palette)
+        results[(b, c, mapping)] = compare(grid, reference, color)
+        if best is None or results[(b, c, mapping)]["score"] > results[best]["score"]:
+            best, best_grid = (b, c, mapping), grid
+        if progress:
+            progress((index + 1) / len(combinations))
+    return best, results, best_grid
@@ -0,0 +1,63 @@
+"""Names, choices and defaults the front ends need before any image work
+
+This module imports nothing heavy, so argument parsing, --help and the
+GUI's first window don't wait for NumPy and Pillow. The engine modules
+take these values from here and keep exporting them under their usual
+names (render.DICE_COLORS is this DICE_COLORS).
+"""
+
+# Dice color schemes as (background, dot) colors
+DICE_COLORS = {
+    "white": ("#e0e0e0", "#2c3e50"),
+    "black": ("#2c3e50", "#e0e0e0"),
+    "wood": ("#d2b48c", "#2c3e50"),
+    "red": ("#e74c3c", "#f9e9e8"),
+    "blue": ("#3498db", "#eaf4fc")
+}
+
+# Fixed scheme order referenced by the scheme bits of grid cells
+SCHEME_NAMES = tuple(DICE_COLORS)
+
+# Dice face representations as relative dot positions
+DICE_FACES = {
+    1: [(0.5, 0.5)],
+    2: [(0.3, 0.3), (0.7, 0.7)],
+    3: [(0.3, 0.3), (0.5, 0.5), (0.7, 0.7)],
+    4: [(0.3, 0.3), (0.3, 0.7), (0.7, 0.3), (0.7, 0.7)],
+    5: [(0.3, 0.3), (0.3, 0.7), (0.5, 0.5), (0.7, 0.3), (0.7, 0.7)],
+    6: [(0.3, 0.3), (0.3, 0.5), (0.3, 0.7), (0.7, 0.3), (0.7, 0.5), (0.7, 0.7)]
+}
+
+# Mappings computed on the grid itself (see quantize)
+GRID_MAPPINGS = ("linear", "equalized", "floyd-steinberg", "atkinson", "bayer")
+
+# Grid mappings plus perceptual matching, which samples below die resolution,
+# and palette matching, which picks the nearest die color from several schemes
+MAPPINGS = GRID_MAPPINGS + ("perceptual", "palette")
+
+# Die size used for full image exports
+EXPORT_DIE_SIZE = 20
+
+# Pixel size of each die in animation frames
+ANIMATION_DIE_SIZE = 10
+
+# Build plan page sizes in points
+PAGE_SIZES = {"a4": (595.28, 841.89), "letter": (612.0, 792.0)}
+DEFAULT_PAGE = "a4"
+
+# Dice per build plan panel as (columns, rows)
+DEFAULT_PANEL = (10, 10)
+
+
+def parse_panel(text):
+    """Parse a panel size given as N or COLUMNSxROWS"""
+    parts = str(text).lower().replace(" ", "").split("x")
+    try:
+        sizes = [int(part) for part in parts]
+    except ValueError:
+        raise ValueError(f"Invalid panel size '{text}', expected e.g. 10 or 12x8") from None
+    if len(sizes) == 1:
+        sizes *= 2
+    if len(sizes) != 2 or min(sizes) < 1:
+        raise ValueError(f"Invalid panel size '{text}', expected e.g. 10 or 12x8")
+    return tuple(sizes)
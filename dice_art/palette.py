@@ -0,0 +1,141 @@
+"""Mixed-scheme dice palettes and nearest-color assignment
+
+A palette is a set of physical dice, one entry per (scheme, face) with the
+color that face shows from a distance. By default the colors are measured
+from the rendered tiles; real measurements can be loaded from JSON of the
+form {"white": {"1": "#dcdcdc", ...}, ...}. Every cell is assigned the
+entry nearest in CIELAB, so mixing white and black dice gives twelve tone
+levels and colored dice give color mosaics.
+"""
+
+import json
+from functools import lru_cache
+
+import numpy as np
+
+from dice_art.cells import encode_cells
+from dice_art.render import DICE_COLORS, DICE_FACES, SCHEME_NAMES, hex_to_rgb, scheme_slot, TILE_ATLAS
+
+# Tile size used to measure the mean color of a rendered face
+MEASURE_SIZE = 32
+
+# Cells matched per chunk, bounding the (cells x entries) distance matrix
+MATCH_CHUNK = 1 << 16
+
+# D65 white point and sRGB to XYZ matrix
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041]
+])
+
+
+def rgb_to_lab(rgb):
+    """Convert an (..., 3) array of 8-bit sRGB colors to CIELAB"""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    lab = np.empty_like(f)
+    lab[..., 0] = 116 * f[..., 1] - 16
+    lab[..., 1] = 500 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+class Palette:
+    """Physical dice available to a mosaic, as cell codes with measured colors"""
+
+    def __init__(self, entries):
+        """entries: iterable of (scheme, face, (r, g, b))"""
+        entries = list(entries)
+        if not entries:
+            raise ValueError("A palette needs at least one die face")
+        self.schemes = tuple(dict.fromkeys(scheme for scheme, _, _ in entries))
+        self.faces = np.array([face for _, face, _ in entries], dtype=np.uint8)
+        self.scheme_slots = np.array([scheme_slot(scheme) for scheme, _, _ in entries], dtype=np.uint8)
+        self.codes = encode_cells(self.faces, schemes=self.scheme_slots)
+        self.rgb = np.array([rgb for _, _, rgb in entries], dtype=np.float64)
+        self.lab = rgb_to_lab(self.rgb)
+
+    @classmethod
+    def from_schemes(cls, schemes):
+        """Palette of every face of the given schemes, colors measured from the rendered tiles"""
+        return _scheme_palette(tuple(schemes))
+
+    @classmethod
+    def from_measurements(cls, measurements):
+        """Palette from {scheme: {face: "#rrggbb" or (r, g, b)}}"""
+        entries = []
+        for scheme, faces in measurements.items():
+            if scheme not in DICE_COLORS:
+                raise ValueError(f"Unknown dice scheme '{scheme}'")
+            for face, color in faces.items():
+                rgb = hex_to_rgb(color) if isinstance(color, str) else tuple(color)
+                entries.append((scheme, int(face), rgb))
+        return cls(entries)
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r") as f:
+            return cls.from_measurements(json.load(f))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def nearest(self, rgb, normalize=True):
+        """Return the index of the nearest palette entry for every color in an (..., 3) array
+
+        With normalize, source lightness is stretched onto the lightness range
+        the palette can reproduce, so the full tonal range of the image is used.
+        """
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        shape = rgb.shape[:-1]
+
+        # Match each distinct color once; photos repeat colors a lot at grid size
+        packed = (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+        unique, inverse = np.unique(packed.ravel(), return_inverse=True)
+        colors = np.stack([(unique >> 16) & 255, (unique >> 8) & 255, unique & 255], axis=-1)
+        lab = self.source_lab(colors, normalize)
+
+        # |x - p|^2 = |x|^2 - 2 x.p + |p|^2; the |x|^2 term does not change the argmin
+        palette_sq = (self.lab ** 2).sum(axis=1)
+        best = np.empty(len(lab), dtype=np.intp)
+        for start in range(0, len(lab), MATCH_CHUNK):
+            chunk = lab[start:start + MATCH_CHUNK]
+            scores = palette_sq - 2.0 * chunk @ self.lab.T
+            best[start:start + MATCH_CHUNK] = scores.argmin(axis=1)
+        return best[inverse].reshape(shape)
+
+    def source_lab(self, rgb, normalize=True):
+        """Convert source colors to CIELAB, optionally stretched onto the palette's lightness range"""
+        lab = rgb_to_lab(rgb)
+        if normalize:
+            lo, hi = self.lab[:, 0].min(), self.lab[:, 0].max()
+            lab[..., 0] = lo + lab[..., 0] * (hi - lo) / 100.0
+        return lab
+
+    def distances(self, lab):
+        """Return the (N, len(palette)) CIELAB distances (delta E 1976) for N source colors"""
+        lab = np.asarray(lab, dtype=np.float64).reshape(-1, 3)
+        sq = (lab ** 2).sum(axis=1)[:, None] - 2.0 * lab @ self.lab.T + (self.lab ** 2).sum(axis=1)
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    def match(self, rgb, normalize=True):
+        """Assign every pixel of an (h, w, 3) image the cell code of its nearest die"""
+        return self.codes[self.nearest(rgb, normalize)]
+
+
+def measure_face(scheme, face):
+    """Mean color of a rendered face"""
+    tile = TILE_ATLAS.tile(MEASURE_SIZE, scheme, face)
+    return tuple(tile.reshape(-1, 3).mean(axis=0))
+
+
+@lru_cache(maxsize=16)
+def _scheme_palette(schemes):
+    for scheme in schemes:
+        if scheme not in SCHEME_NAMES:
+            raise ValueError(f"Unknown dice scheme '{scheme}'")
+    return Palette((scheme, face, measure_face(scheme, face)) for scheme in schemes for face in DICE_FACES)
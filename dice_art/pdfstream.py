@@ -0,0 +1,128 @@
+"""Page-wise PDF writer
+
+Writes a PDF one page at a time: every page's content stream is
+compressed and written as soon as it is added, and only the byte offsets
+of the objects written so far are kept for the cross-reference table, so
+a document of any length is written in flat memory.
+
+All pages share one resource dictionary, written at the end: the
+Helvetica base fonts and the form XObjects added along the way. Page
+objects point at the page tree, which is also written last.
+"""
+
+import zlib
+
+PDF_HEADER = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+
+# Object numbers reserved up front; everything else is numbered as it is written
+CATALOG, PAGES, RESOURCES, FONT, BOLD_FONT = 1, 2, 3, 4, 5
+FIRST_FREE_OBJECT = 6
+
+
+def pdf_string(text):
+    """Encode text as a PDF literal string in WinAnsi (Latin-1) encoding"""
+    data = text.encode("latin-1", "replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def pdf_number(value):
+    """Format a number compactly, with at most three decimals"""
+    text = f"{value:.3f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+
+class PDFStreamWriter:
+    """Incrementally write a PDF whose pages all have the same size
+
+    Pages draw text with the fonts /F1 (Helvetica) and /F2 (Helvetica-Bold)
+    and may paint any form registered with add_form by its name.
+    """
+
+    def __init__(self, path, page_size, compress_level=6):
+        self.page_width, self.page_height = page_size
+        self.compress_level = compress_level
+        self.pages_written = 0
+        self._file = open(path, "wb")
+        self._offsets = {}
+        self._next_object = FIRST_FREE_OBJECT
+        self._kids = []
+        self._forms = {}
+
+        self._file.write(PDF_HEADER)
+        self._write_object(CATALOG, f"<< /Type /Catalog /Pages {PAGES} 0 R >>".encode())
+        self._write_object(FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                 b"/Encoding /WinAnsiEncoding >>")
+        self._write_object(BOLD_FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold "
+                                      b"/Encoding /WinAnsiEncoding >>")
+
+    def _allocate(self):
+        number = self._next_object
+        self._next_object += 1
+        return number
+
+    def _write_object(self, number, body):
+        self._offsets[number] = self._file.tell()
+        self._file.write(f"{number} 0 obj\n".encode())
+        self._file.write(body)
+        self._file.write(b"\nendobj\n")
+
+    def _write_stream(self, number, content, extra=b""):
+        data = zlib.compress(content, self.compress_level)
+        header = f"<< /Length {len(data)} /Filter /FlateDecode ".encode() + extra + b">>\nstream\n"
+        self._write_object(number, header + data + b"\nendstream")
+
+    def has_form(self, name):
+        return name in self._forms
+
+    def add_form(self, name, content, bbox=(0, 0, 1, 1)):
+        """Write a reusable form XObject that pages can paint with /name Do"""
+        if name in self._forms:
+            raise ValueError(f"Form '{name}' already exists")
+        number = self._allocate()
+        box = " ".join(pdf_number(v) for v in bbox)
+        self._write_stream(number, content, f"/Type /XObject /Subtype /Form /BBox [{box}] ".encode())
+        self._forms[name] = number
+
+    def add_page(self, content):
+        """Write one page from its content stream (bytes)"""
+        content_number = self._allocate()
+        self._write_stream(content_number, content)
+        page_number = self._allocate()
+        self._write_object(page_number, (
+            f"<< /Type /Page /Parent {PAGES} 0 R "
+            f"/MediaBox [0 0 {pdf_number(self.page_width)} {pdf_number(self.page_height)}] "
+            f"/Resources {RESOURCES} 0 R /Contents {content_number} 0 R >>").encode())
+        self._kids.append(page_number)
+        self.pages_written += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            forms = " ".join(f"/{name} {number} 0 R" for name, number in self._forms.items())
+            self._write_object(RESOURCES, (
+                f"<< /ProcSet [/PDF /Text] /Font << /F1 {FONT} 0 R /F2 {BOLD_FONT} 0 R >> "
+                f"/XObject << {forms} >> >>").encode())
+            kids = " ".join(f"{number} 0 R" for number in self._kids)
+            self._write_object(PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._kids)} >>".encode())
+
+            xref = self._file.tell()
+            size = self._next_object
+            self._file.write(f"xref\n0 {size}\n".encode())
+            # Every entry is exactly 20 bytes
+            self._file.write(b"0000000000 65535 f \n")
+            for number in range(1, size):
+                self._file.write(f"{self._offsets[number]:010d} 00000 n \n".encode())
+            self._file.write(f"trailer\n<< /Size {size} /Root {CATALOG} 0 R >>\n"
+                             f"startxref\n{xref}\n%%EOF\n".encode())
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
@@ -0,0 +1,196 @@
+"""Importable load -> adjust -> quantize -> render/export pipeline
+
+Every step is a plain function so scripts and the CLI can drive the same
+code the GUI uses without touching tkinter.
+"""
+
+import os
+
+import numpy as np
+from PIL import ImageEnhance
+
+from dice_art.grid import DiceGrid, as_dice_grid, save_grid
+from dice_art.loader import IMAGE_LOADER
+from dice_art.options import EXPORT_DIE_SIZE, MAPPINGS  # noqa: F401 (re-exported)
+from dice_art.palette import Palette
+from dice_art.perceptual import SAMPLES, match_faces
+from dice_art.pngstream import PNGStreamWriter
+from dice_art.quantize import grid_dimensions, quantize_grid
+from dice_art.resample import OVERSAMPLE, ImagePyramid
+from dice_art.render import band_rows, iter_mosaic_bands, render_mosaic
+
+# Memory budget for one band of a streamed PNG export
+EXPORT_BAND_BYTES = 32 << 20
+
+
+def load_image(path, min_size=None):
+    """Decode an image file upright, at no less than min_size (default: full size)
+
+    Decodes go through the shared loader, so JPEGs may be decoded at a
+    reduced scale and repeated loads are served from its cache.
+    """
+    return IMAGE_LOADER.load(path, min_size)
+
+
+def required_source_size(image_size, width, mapping="linear"):
+    """Smallest decoded size that still resamples to the grid at full quality"""
+    width, height = grid_dimensions(image_size, width)
+    _, samples = resample_mode(mapping)
+    return width * samples * OVERSAMPLE, height * samples * OVERSAMPLE
+
+
+def adjust_image(img, brightness=1.0, contrast=1.0):
+    """Apply brightness and contrast adjustments to image"""
+    # Convert to RGB for adjustments
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    # Apply brightness
+    img = ImageEnhance.Brightness(img).enhance(brightness)
+
+    # Apply contrast
+    img = ImageEnhance.Contrast(img).enhance(contrast)
+
+    return img
+
+
+def resample_mode(mapping):
+    """Return the (mode, samples per die) an image is resampled to for a mapping"""
+    if mapping == "palette":
+        return "RGB", 1
+    if mapping == "perceptual":
+        return "L", SAMPLES
+    return "L", 1
+
+
+def resample_image(img, width, mapping="linear", pyramid=None, source_size=None):
+    """Resize an adjusted image to the grid size, at the sampling the mapping needs
+
+    Every sample is the gamma-correct mean of the area it covers; pass the
+    image's ImagePyramid to reuse its levels across widths. source_size is
+    the full image size when img is a reduced decode, so the grid keeps the
+    height the full image would give it.
+    """
+    width, height = grid_dimensions(source_size or img.size, width)
+    mode, samples = resample_mode(mapping)
+    pyramid = pyramid or ImagePyramid(img)
+    return pyramid.resample((width * samples, height * samples), mode)
+
+
+def quantize_resampled(resampled, mapping="linear", color="white", palette=None):
+    """Map an image from resample_image to a DiceGrid"""
+    if mapping == "palette":
+        if not isinstance(palette, Palette):
+            palette = Palette.from_schemes(palette or (color,))
+        return DiceGrid(palette.match(np.asarray(resampled)))
+    if mapping == "perceptual":
+        return DiceGrid(match_faces(resampled, color))
+    return DiceGrid(quantize_grid(resampled, mapping))
+
+
+def quantize_image(img, width, mapping="linear", color="white", palette=None):
+    """Resize an adjusted image to the grid size and map it to dice values
+
+    The perceptual mapping matches against the rendered faces of the given
+    color scheme and may turn 2, 3 and 6 by 90 degrees. The palette mapping
+    assigns each cell the nearest die of a Palette or list of scheme names,
+    recording the scheme in the cell.
+    """
+    return quantize_resampled(resample_image(img, width, mapping), mapping, color, palette)
+
+
+def generate_grid(img, width, brightness=1.0, contrast=1.0, mapping="linear", color="white", palette=None):
+    """Run adjust and quantize on a decoded image"""
+    return quantize_image(adjust_image(img, brightness, contrast), width, mapping, color, palette)
+
+
+def render_image(grid, color="white", die_size=EXPORT_DIE_SIZE):
+    """Render a dice grid to an RGB image"""
+    return render_mosaic(grid, die_size, color)
+
+
+def dice_counts(grid):
+    """Return how many dice of each face the grid needs"""
+    return as_dice_grid(grid).face_counts()
+
+
+def scheme_counts(grid, color="white"):
+    """Return {scheme: {face: count}} for every scheme used in the grid"""
+    return as_dice_grid(grid).scheme_counts(color)
+
+
+def format_dice_grid(grid):
+    """Format a dice grid as space-separated rows
+
+    Rotated dice are suffixed with r and dice with an explicit scheme are
+    prefixed with the scheme name, e.g. black:3r.
+    """
+    return as_dice_grid(grid).to_text()
+
+
+def format_dice_list(grid, color="white"):
+    """Format the dice requirement list for a grid, per scheme when dice are mixed
+
+    Counts come from the DiceGrid, so this does not depend on the grid size.
+    """
+    grid = as_dice_grid(grid)
+    dice_list = "Dice Requirements:\n"
+    dice_list += "------------------\n"
+    for value, count in grid.face_counts().items():
+        dice_list += f"Dice {value}: {count}\n"
+
+    by_scheme = grid.scheme_counts(color)
+    if len(by_scheme) > 1:
+        dice_list += "------------------\n"
+        for name, faces in by_scheme.items():
+            dice_list += f"{name.capitalize()} dice: {sum(faces.values())} "
+            dice_list += "(" + ", ".join(f"{value}: {count}" for value, count in faces.items()) + ")\n"
+
+    dice_list += "------------------\n"
+    dice_list += f"Total Dice: {grid.size}\n"
+    return dice_list
+
+
+def export_dice_grid(grid, path, color="white"):
+    """Write the grid as text, or as CSV, JSON or binary for .csv, .json and .dgrid paths"""
+    save_grid(grid, path, color)
+
+
+def export_dice_list(grid, path, color="white"):
+    with open(path, "w") as f:
+        f.write(format_dice_list(grid, color))
+
+
+def export_image(grid, path, color="white", die_size=EXPORT_DIE_SIZE, progress=None):
+    """Export the rendered mosaic; PNG files are streamed band by band
+
+    progress, if given, is called with the completed fraction and may raise
+    to abort the export.
+    """
+    if str(path).lower().endswith(".png"):
+        export_png_streamed(grid, path, color, die_size, progress=progress)
+    else:
+        render_image(grid, color, die_size).save(path)
+        if progress:
+            progress(1.0)
+
+
+def export_png_streamed(grid, path, color="white", die_size=EXPORT_DIE_SIZE, band_bytes=EXPORT_BAND_BYTES,
+                        progress=None):
+    """Render and encode the mosaic in row bands so peak memory is bounded by band_bytes"""
+    grid = np.asarray(grid)
+    height, width = grid.shape
+    die_size = int(die_size)
+    rows = band_rows(width, die_size, band_bytes)
+    total_rows = height * die_size
+    try:
+        with PNGStreamWriter(path, width * die_size, total_rows) as writer:
+            for band in iter_mosaic_bands(grid, die_size, color, rows):
+                writer.write_rows(band)
+                if progress:
+                    progress(writer.rows_written / total_rows)
+    except BaseException:
+        # Don't leave a truncated PNG behind
+        if os.path.exists(path):
+            os.remove(path)
+        raise
@@ -0,0 +1,152 @@
+"""Band-wise PNG encoder and frame-wise APNG encoder
+
+Writes an RGB PNG row band by row band through a streaming zlib
+compressor so the full image never has to exist in memory, and animated
+PNGs frame by frame so only the current frame does.
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Maximum payload of a single IDAT chunk
+IDAT_CHUNK_SIZE = 1 << 20
+
+
+def write_chunk(f, chunk_type, data):
+    f.write(struct.pack(">I", len(data)))
+    f.write(chunk_type)
+    f.write(data)
+    f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+
+class PNGStreamWriter:
+    """Incrementally encode an 8-bit RGB PNG of known size"""
+
+    def __init__(self, path, width, height, compress_level=6):
+        self.width = int(width)
+        self.height = int(height)
+        self.rows_written = 0
+        self._file = open(path, "wb")
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+
+        self._file.write(PNG_SIGNATURE)
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        write_chunk(self._file, b"IHDR", ihdr)
+
+    def write_rows(self, band):
+        """Append a (rows, width, 3) uint8 band of pixel rows"""
+        band = np.asarray(band, dtype=np.uint8)
+        rows = band.shape[0]
+        if band.shape[1:] != (self.width, 3):
+            raise ValueError(f"Expected rows of shape ({self.width}, 3), got {band.shape[1:]}")
+        if self.rows_written + rows > self.height:
+            raise ValueError("More rows written than the declared image height")
+
+        # Prefix every scanline with filter type 0 (None)
+        scanlines = np.zeros((rows, self.width * 3 + 1), dtype=np.uint8)
+        scanlines[:, 1:] = band.reshape(rows, -1)
+        self._emit(self._compressor.compress(scanlines.tobytes()))
+        self.rows_written += rows
+
+    def _emit(self, data):
+        self._pending += data
+        while len(self._pending) >= IDAT_CHUNK_SIZE:
+            write_chunk(self._file, b"IDAT", bytes(self._pending[:IDAT_CHUNK_SIZE]))
+            del self._pending[:IDAT_CHUNK_SIZE]
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"Only {self.rows_written} of {self.height} rows were written")
+            self._pending += self._compressor.flush()
+            if self._pending:
+                write_chunk(self._file, b"IDAT", bytes(self._pending))
+            write_chunk(self._file, b"IEND", b"")
+        finally:
+            self._pending.clear()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+
+
+class APNGStreamWriter:
+    """Encode an animated 8-bit RGB PNG one frame at a time
+
+    The frame count in acTL is patched in place on close, so frames can be
+    written as they are produced without knowing how many there will be.
+    """
+
+    def __init__(self, path, width, height, loops=0, compress_level=6):
+        self.width = int(width)
+        self.height = int(height)
+        self.compress_level = compress_level
+        self.frames_written = 0
+        self._sequence = 0
+        self._loops = loops
+        self._file = open(path, "wb")
+
+        self._file.write(PNG_SIGNATURE)
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        write_chunk(self._file, b"IHDR", ihdr)
+        self._actl_offset = self._file.tell()
+        write_chunk(self._file, b"acTL", struct.pack(">II", 0, loops))
+
+    def write_frame(self, frame, delay_ms=100):
+        """Append a full (height, width, 3) uint8 frame shown for delay_ms"""
+        frame = np.asarray(frame, dtype=np.uint8)
+        if frame.shape != (self.height, self.width, 3):
+            raise ValueError(f"Expected a frame of shape ({self.height}, {self.width}, 3), got {frame.shape}")
+
+        # Full-size frame at the origin, no disposal, replacing the previous pixels
+        fctl = struct.pack(">IIIIIHHBB", self._sequence, self.width, self.height, 0, 0,
+                           int(round(delay_ms)), 1000, 0, 0)
+        self._sequence += 1
+        write_chunk(self._file, b"fcTL", fctl)
+
+        scanlines = np.zeros((self.height, self.width * 3 + 1), dtype=np.uint8)
+        scanlines[:, 1:] = frame.reshape(self.height, -1)
+        data = zlib.compress(scanlines.tobytes(), self.compress_level)
+        for start in range(0, len(data), IDAT_CHUNK_SIZE):
+            block = data[start:start + IDAT_CHUNK_SIZE]
+            if self.frames_written == 0:
+                # The first frame doubles as the still image shown by non-APNG decoders
+                write_chunk(self._file, b"IDAT", block)
+            else:
+                write_chunk(self._file, b"fdAT", struct.pack(">I", self._sequence) + block)
+                self._sequence += 1
+        self.frames_written += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        try:
+            if not self.frames_written:
+                raise ValueError("An animated PNG needs at least one frame")
+            write_chunk(self._file, b"IEND", b"")
+            self._file.seek(self._actl_offset)
+            write_chunk(self._file, b"acTL", struct.pack(">II", self.frames_written, self._loops))
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
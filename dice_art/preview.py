@@ -0,0 +1,95 @@
+"""Live preview source for the adjustment sliders
+
+The working copy is decoded at preview resolution (JPEGs are never
+decoded in full for it) and slider changes are applied to it as a single
+lookup table instead of re-running ImageEnhance on the full-resolution
+image, which is only decoded when something needs it.
+"""
+
+import numpy as np
+
+from dice_art.loader import IMAGE_LOADER
+
+# Delay used to coalesce slider events before refreshing the preview
+PREVIEW_DEBOUNCE_MS = 40
+
+
+def adjustment_lut(brightness, contrast, gray_histogram):
+    """Build a 256-entry LUT equivalent to ImageEnhance brightness then contrast
+
+    ImageEnhance.Contrast blends towards the mean gray level of the
+    brightened image; that mean is derived from the histogram of the
+    unadjusted grayscale image.
+    """
+    levels = np.arange(256, dtype=np.float64)
+    brightened = np.clip(levels * brightness, 0, 255).astype(np.uint8)
+
+    hist = np.asarray(gray_histogram, dtype=np.float64)
+    mean = int((hist * brightened).sum() / max(hist.sum(), 1) + 0.5)
+
+    adjusted = mean + contrast * (brightened.astype(np.float64) - mean)
+    return np.clip(adjusted, 0, 255).astype(np.uint8)
+
+
+class PreviewSource:
+    """A source image with a cached preview-resolution working copy
+
+    Built from a decoded image, or from a file whose full-resolution image
+    is decoded lazily through the shared loader.
+    """
+
+    def __init__(self, image, preview_size, path="", loader=None):
+        self.path = path
+        self.loader = loader or IMAGE_LOADER
+        self._image = image
+        if image is not None:
+            self.size = image.size
+            working = image
+        else:
+            self.size = self.loader.size(path)
+            working = self.loader.load(path, (preview_size, preview_size))
+
+        self.working = working.convert("RGB")
+        self.working.thumbnail((preview_size, preview_size))
+        self._gray_histogram = self.working.convert("L").histogram()
+        self._cached_key = None
+        self._cached_image = None
+
+    @classmethod
+    def open(cls, path, preview_size, loader=None):
+        return cls(None, preview_size, path, loader)
+
+    @property
+    def image(self):
+        """Full-resolution source"""
+        if self._image is not None:
+            return self._image
+        return self.loader.load(self.path)
+
+    @property
+    def decoded_image(self):
+        """Image the source was built from, or None when it is decoded from path on demand"""
+        return self._image
+
+    def image_at(self, min_size):
+        """Source decoded at no less than min_size"""
+        if self._image is not None:
+            return self._image
+        return self.loader.load(self.path, min_size)
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    def adjusted(self, brightness, contrast):
+        """Return the working copy with brightness and contrast applied"""
+        key = (round(brightness, 3), round(contrast, 3))
+        if key != self._cached_key:
+            lut = adjustment_lut(brightness, contrast, self._gray_histogram)
+            self._cached_image = self.working.point(lut.tolist() * 3)
+            self._cached_key = key
+        return self._cached_image
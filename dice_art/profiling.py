@@ -0,0 +1,115 @@
+"""Opt-in profiling of CLI and GUI actions
+
+Profiling is off unless DICE_ART_PROFILE names one or both modes, e.g.
+DICE_ART_PROFILE=cprofile,tracemalloc (the CLI also takes --profile). Each
+action wrapped in profiled() then writes its report to DICE_ART_PROFILE_DIR
+(default: the current directory):
+
+    <action>-<pid>-<n>.prof        cProfile stats; inspect with python -m pstats
+    <action>-<pid>-<n>.alloc.txt   peak traced memory and the top allocation sites
+
+tracemalloc sees Python and NumPy allocations but not Pillow's image
+buffers; benchmarks/bench_pipeline.py reports peak RSS for the full picture.
+Only one action is profiled at a time; actions that start while another is
+being profiled (nested calls, a second GUI worker) run unprofiled. When
+profiling is off, profiled() does nothing but check a flag, and cProfile
+and tracemalloc are not even imported.
+"""
+
+import itertools
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+MODES = ("cprofile", "tracemalloc")
+PROFILE_ENV = "DICE_ART_PROFILE"
+PROFILE_DIR_ENV = "DICE_ART_PROFILE_DIR"
+
+# Allocation sites listed in a tracemalloc report
+TOP_ALLOCATIONS = 25
+
+_lock = threading.Lock()
+_counter = itertools.count(1)
+
+
+def parse_modes(text):
+    """Parse "cprofile,tracemalloc" into a frozenset of modes"""
+    modes = frozenset(m.strip().lower() for m in (text or "").split(",") if m.strip())
+    unknown = modes - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown profiling mode(s): {', '.join(sorted(unknown))}")
+    return modes
+
+
+def configure(modes, output_dir=None):
+    """Switch profiling on for this process and any worker processes it starts"""
+    modes = parse_modes(modes) if isinstance(modes, str) else frozenset(modes)
+    os.environ[PROFILE_ENV] = ",".join(sorted(modes))
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        os.environ[PROFILE_DIR_ENV] = os.path.abspath(output_dir)
+
+
+def active_modes():
+    try:
+        return parse_modes(os.environ.get(PROFILE_ENV))
+    except ValueError:
+        return frozenset()
+
+
+def report_base(action):
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", action).strip("-").lower() or "action"
+    directory = os.environ.get(PROFILE_DIR_ENV, ".")
+    return os.path.join(directory, f"{slug}-{os.getpid()}-{next(_counter)}")
+
+
+def write_allocations(path, snapshot, peak):
+    with open(path, "w") as f:
+        f.write(f"Peak traced memory: {peak / (1 << 20):.1f} MiB\n\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            f.write(f"{stat}\n")
+
+
+@contextmanager
+def profiled(action):
+    """Profile the enclosed block under the configured modes"""
+    modes = active_modes()
+    if not modes or not _lock.acquire(blocking=False):
+        yield
+        return
+
+    import cProfile
+    import tracemalloc
+
+    profiler = None
+    tracing = False
+    try:
+        if "tracemalloc" in modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracing = True
+        if "cprofile" in modes:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler (a debugger, an outer cProfile run) owns the hook
+                profiler = None
+        yield
+    finally:
+        try:
+            if profiler is not None:
+                profiler.disable()
+            # Snapshot before writing anything so the report's own allocations stay out
+            if tracing:
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            base = report_base(action)
+            if profiler is not None:
+                profiler.dump_stats(base + ".prof")
+            if tracing:
+                write_allocations(base + ".alloc.txt", snapshot, peak)
+        finally:
+            _lock.release()
+
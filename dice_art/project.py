@@ -0,0 +1,221 @@
+"""Versioned binary .diceproj format
+
+Layout (little endian):
+
+    magic    8 bytes   b"DICEPROJ"
+    version  uint16
+    hlen     uint32    length of the JSON header
+    header   hlen bytes of UTF-8 JSON (parameters and section table)
+    padding  up to the next 64-byte boundary
+    sections grid (raw uint8, C order) then the embedded source image
+
+Section offsets in the header are relative to the aligned data start, so
+the grid can be memory-mapped straight from the file. Legacy JSON projects
+are still read and can be converted with ``python -m dice_art.project``.
+"""
+
+import argparse
+import io
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+from dice_art.grid import as_dice_grid
+from dice_art.loader import IMAGE_LOADER
+
+MAGIC = b"DICEPROJ"
+VERSION = 1
+PREAMBLE = struct.Struct("<8sHI")
+ALIGNMENT = 64
+
+# Longest side of the source image embedded in a project
+EMBED_MAX_SIZE = 1024
+EMBED_FORMAT = "JPEG"
+
+PARAM_KEYS = ("dice_width", "dice_color", "brightness", "contrast", "mapping")
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class DiceProject:
+    """Grid, adjustment parameters and downscaled source of a saved project"""
+
+    def __init__(self, grid, dice_width, dice_color="white", brightness=1.0, contrast=1.0,
+                 mapping="linear", source=None, image_path="", created=None):
+        # A memory-mapped grid is wrapped without copying
+        self.grid = as_dice_grid(grid)
+        self.dice_width = int(dice_width)
+        self.dice_color = dice_color
+        self.brightness = float(brightness)
+        self.contrast = float(contrast)
+        self.mapping = mapping
+        self.image_path = image_path
+        self.created = created
+        self._source = source
+        self._source_loader = None
+
+    @property
+    def total_dice(self):
+        return self.grid.size
+
+    @property
+    def source(self):
+        """Embedded source image, decoded on first access"""
+        if self._source is None and self._source_loader is not None:
+            self._source = self._source_loader()
+            self._source_loader = None
+        return self._source
+
+
+def embed_source(img, max_size=EMBED_MAX_SIZE):
+    """Encode a downscaled copy of the source image for embedding"""
+    img = img.convert("RGB")
+    img.thumbnail((max_size, max_size))
+    buf = io.BytesIO()
+    img.save(buf, EMBED_FORMAT, quality=90)
+    return buf.getvalue()
+
+
+def save_project(path, project):
+    """Write a project in the binary format, replacing the file atomically"""
+    grid = np.ascontiguousarray(project.grid, dtype=np.uint8)
+    if grid.ndim != 2 or grid.size == 0:
+        raise ValueError(f"Cannot save an empty dice grid of shape {grid.shape}")
+    source_bytes = embed_source(project.source) if project.source is not None else b""
+    grid_length = grid.nbytes
+    source_offset = _align(grid_length)
+
+    header = {
+        "params": {key: getattr(project, key) for key in PARAM_KEYS},
+        "image_path": project.image_path,
+        "created": project.created or datetime.now().isoformat(timespec="seconds"),
+        "grid": {"offset": 0, "length": grid_length, "shape": list(grid.shape), "dtype": "uint8"},
+        "source": {"offset": source_offset, "length": len(source_bytes), "format": EMBED_FORMAT},
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(PREAMBLE.size + len(header_bytes))
+
+    # Write next to the target and swap in, so a memory-mapped grid of the
+    # previous version stays valid while saving over it. Windows refuses to
+    # replace a file that is still mapped, so callers that may save over a
+    # project they loaded should load it with mmap=False.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        f.write(grid.tobytes())
+        f.write(b"\0" * (source_offset - grid_length))
+        f.write(source_bytes)
+    os.replace(tmp_path, path)
+
+
+def is_legacy_project(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) != MAGIC
+
+
+def load_project(path, mmap=True):
+    """Load a binary or legacy JSON project
+
+    Binary grids are memory-mapped read-only unless mmap is False, and the
+    embedded source is only decoded when first accessed.
+    """
+    if is_legacy_project(path):
+        return load_legacy_project(path)
+
+    with open(path, "rb") as f:
+        magic, version, header_length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if version > VERSION:
+            raise ValueError(f"Unsupported project version {version}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    data_start = _align(PREAMBLE.size + header_length)
+
+    grid_info = header["grid"]
+    shape = tuple(grid_info["shape"])
+    grid_offset = data_start + grid_info["offset"]
+    if mmap:
+        grid = np.memmap(path, dtype=np.uint8, mode="r", offset=grid_offset, shape=shape)
+    else:
+        with open(path, "rb") as f:
+            f.seek(grid_offset)
+            grid = np.frombuffer(f.read(grid_info["length"]), dtype=np.uint8).reshape(shape).copy()
+
+    project = DiceProject(grid, image_path=header.get("image_path", ""), created=header.get("created"),
+                          **header["params"])
+
+    source_info = header["source"]
+    if source_info["length"]:
+        def read_source():
+            with open(path, "rb") as f:
+                f.seek(data_start + source_info["offset"])
+                data = f.read(source_info["length"])
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            return img
+        project._source_loader = read_source
+    return project
+
+
+def load_legacy_project(path):
+    """Load a JSON project written by earlier versions"""
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    project = DiceProject(
+        np.asarray(data["dice_grid"], dtype=np.uint8),
+        image_path=data.get("image_path", ""),
+        **{key: data[key] for key in PARAM_KEYS if key in data}
+    )
+
+    # The original image is only available while it still exists on disk
+    image_path = project.image_path
+    if image_path and os.path.exists(image_path):
+        def read_source():
+            # Only a downscaled copy is ever embedded
+            return IMAGE_LOADER.load(image_path, (EMBED_MAX_SIZE, EMBED_MAX_SIZE))
+        project._source_loader = read_source
+    return project
+
+
+def convert_project(src, dst):
+    """Convert a legacy JSON project to the binary format"""
+    project = load_project(src, mmap=False)
+    save_project(dst, project)
+    return project
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="dice-art-project",
+                                     description="Convert legacy JSON .diceproj files to the binary format")
+    parser.add_argument("projects", nargs="+", help="project files to convert")
+    parser.add_argument("-o", "--output-dir", help="write converted files here instead of in place")
+    args = parser.parse_args(argv)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    failures = 0
+    for src in args.projects:
+        dst = os.path.join(args.output_dir, os.path.basename(src)) if args.output_dir else src
+        try:
+            if not is_legacy_project(src):
+                print(f"{src}: already binary")
+                continue
+            project = convert_project(src, dst)
+            note = "" if project.source is not None else " (original image missing, no source embedded)"
+            print(f"{src} -> {dst}{note}")
+        except Exception as e:
+            print(f"{src}: failed: {e}", file=sys.stderr)
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
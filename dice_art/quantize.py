@@ -0,0 +1,146 @@
+"""Brightness to dice-face quantization
+
+Faces run from 1 (lightest) to 6 (darkest). The whole grid is computed in
+one vectorized pass and returned as a compact uint8 array of shape
+(height, width).
+
+Besides the plain linear threshold, histogram-equalized, Bayer ordered
+and two error-diffusion mappings (Floyd-Steinberg and Atkinson) are
+available. Error diffusion is inherently serial along a row, so it is
+evaluated over anti-diagonal wavefronts: with every kernel offset pointing
+forward in x + 2y, all cells on one wavefront are independent and are
+processed together as strided NumPy views (w + 2h steps instead of w * h).
+"""
+
+import numpy as np
+
+from dice_art.options import GRID_MAPPINGS as MAPPINGS
+
+# Width of each brightness bucket (255/6 ≈ 42.5)
+BUCKET_WIDTH = 42.5
+
+# Lookup table mapping every 8-bit brightness to its dice value
+FACE_LUT = np.clip(6 - (np.arange(256) / BUCKET_WIDTH).astype(np.int16), 1, 6).astype(np.uint8)
+
+# Representative brightness of each face (centre of its bucket), indexed by face value
+FACE_TONES = np.array([0.0] + [(6.5 - face) * BUCKET_WIDTH for face in range(1, 7)])
+
+# Error diffusion kernels as (dy, dx, weight)
+FLOYD_STEINBERG = ((0, 1, 7 / 16), (1, -1, 3 / 16), (1, 0, 5 / 16), (1, 1, 1 / 16))
+ATKINSON = ((0, 1, 1 / 8), (0, 2, 1 / 8), (1, -1, 1 / 8), (1, 0, 1 / 8), (1, 1, 1 / 8), (2, 0, 1 / 8))
+
+BAYER_4X4 = np.array([
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5]
+])
+
+
+def grid_dimensions(image_size, width):
+    """Return (width, height) of the dice grid for an image of the given size"""
+    img_width, img_height = image_size
+    width = int(width)
+    height = max(1, round(width * img_height / img_width))
+    return width, height
+
+
+def _as_gray_array(gray):
+    arr = np.asarray(gray)
+    if arr.ndim != 2:
+        raise ValueError("Expected a single-channel grayscale image")
+    return arr
+
+
+def _to_uint8(arr):
+    if arr.dtype == np.uint8:
+        return arr
+    return np.clip(arr, 0, 255).astype(np.uint8)
+
+
+def quantize_linear(gray):
+    """Hard 6-level threshold: 6 - int(brightness / 42.5), clamped to 1-6"""
+    return FACE_LUT[_to_uint8(_as_gray_array(gray))]
+
+
+def equalize_lut(gray):
+    """Brightness LUT that equalizes the histogram of a grayscale image"""
+    arr = _to_uint8(_as_gray_array(gray))
+    cdf = np.bincount(arr.ravel(), minlength=256).cumsum()
+    cdf_min = cdf[cdf > 0][0]
+    span = max(arr.size - cdf_min, 1)
+    return np.clip((cdf - cdf_min) * 255.0 / span, 0, 255).astype(np.uint8)
+
+
+def quantize_equalized(gray):
+    """Linear mapping after histogram equalization, so every face is used about equally"""
+    arr = _to_uint8(_as_gray_array(gray))
+    return FACE_LUT[equalize_lut(arr)[arr]]
+
+
+def quantize_bayer(gray):
+    """Ordered dithering with a 4x4 Bayer threshold matrix"""
+    arr = _as_gray_array(gray).astype(np.float64)
+    height, width = arr.shape
+    offsets = ((BAYER_4X4 + 0.5) / 16 - 0.5) * BUCKET_WIDTH
+    tiled = np.tile(offsets, (-(-height // 4), -(-width // 4)))[:height, :width]
+    return FACE_LUT[_to_uint8(arr + tiled)]
+
+
+def error_diffuse(gray, kernel):
+    """Error-diffusion quantization evaluated over anti-diagonal wavefronts"""
+    arr = _as_gray_array(gray).astype(np.float64)
+    height, width = arr.shape
+    pad = max(max(abs(dx), dy) for dy, dx, _ in kernel)
+
+    # Errors pushed past the borders land in the padding and are dropped
+    stride = width + 2 * pad
+    buf = np.zeros((height + pad, stride))
+    buf[:height, pad:pad + width] = arr
+    faces_buf = np.zeros_like(buf, dtype=np.uint8)
+    flat = buf.ravel()
+    faces_flat = faces_buf.ravel()
+
+    # In the flattened buffer a wavefront x + 2y == t is an arithmetic
+    # progression with step stride - 2, so every access is a strided view
+    step = stride - 2
+    offsets = [(dy * stride + dx, weight) for dy, dx, weight in kernel]
+    for t in range(width + 2 * (height - 1)):
+        y0 = max(0, -(-(t - width + 1) // 2))
+        y1 = min(height - 1, t // 2)
+        start = t + pad + y0 * step
+        stop = start + (y1 - y0) * step + 1
+
+        values = flat[start:stop:step]
+        faces = FACE_LUT[np.clip(values, 0, 255).astype(np.uint8)]
+        faces_flat[start:stop:step] = faces
+        error = values - FACE_TONES[faces]
+        for offset, weight in offsets:
+            flat[start + offset:stop + offset:step] += error * weight
+    return faces_buf[:height, pad:pad + width].copy()
+
+
+def quantize_floyd_steinberg(gray):
+    return error_diffuse(gray, FLOYD_STEINBERG)
+
+
+def quantize_atkinson(gray):
+    return error_diffuse(gray, ATKINSON)
+
+
+QUANTIZERS = {
+    "linear": quantize_linear,
+    "equalized": quantize_equalized,
+    "floyd-steinberg": quantize_floyd_steinberg,
+    "atkinson": quantize_atkinson,
+    "bayer": quantize_bayer,
+}
+
+
+def quantize_grid(gray, mapping="linear"):
+    """Map a grayscale image or array to a uint8 grid of dice values (1-6)"""
+    try:
+        quantizer = QUANTIZERS[mapping]
+    except KeyError:
+        raise ValueError(f"Unknown mapping '{mapping}', expected one of: {', '.join(MAPPINGS)}") from None
+    return quantizer(gray)
@@ -0,0 +1,192 @@
+"""Die-face tile atlas and mosaic compositor
+
+Each face is rasterized once per (die size, color scheme, cell code) and
+the mosaic is assembled by gathering those tiles with NumPy fancy indexing
+instead of drawing every die separately. Cell codes carry the face value,
+rotation and scheme (see dice_art.cells); single-scheme grids index the
+tile stack directly, mixed grids go through a small code lookup table.
+"""
+
+import threading
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from dice_art.cells import FACE_MASK, ROTATED, SCHEME_SHIFT, TILE_MASK
+from dice_art.options import DICE_COLORS, DICE_FACES, SCHEME_NAMES
+
+DEFAULT_COLORS = DICE_COLORS["white"]
+BORDER_COLOR = "#95a5a6"
+
+
+def hex_to_rgb(color):
+    """Convert a #rrggbb string to an (r, g, b) tuple"""
+    color = color.lstrip('#')
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def scheme_name(slot, default):
+    """Resolve a cell scheme slot to a scheme name"""
+    return default if slot == 0 else SCHEME_NAMES[slot - 1]
+
+
+def scheme_slot(name):
+    """Scheme slot stored in cell codes for a scheme name"""
+    return SCHEME_NAMES.index(name) + 1
+
+
+def face_dots(value, rotated=False):
+    """Relative dot positions of a face, optionally turned by 90 degrees"""
+    dots = DICE_FACES[value]
+    if rotated:
+        dots = [(1 - y, x) for x, y in dots]
+    return dots
+
+
+def draw_face(size, scheme, value, rotated=False):
+    """Rasterize a single die face as a (size, size) RGB image"""
+    bg_color, dot_color = DICE_COLORS.get(scheme, DEFAULT_COLORS)
+    img = Image.new("RGB", (size, size), hex_to_rgb(bg_color))
+    draw = ImageDraw.Draw(img)
+
+    # Draw dice background
+    draw.rectangle([0, 0, size - 1, size - 1], fill=hex_to_rgb(bg_color), outline=BORDER_COLOR)
+
+    # Draw dots
+    dot_rgb = hex_to_rgb(dot_color)
+    dot_radius = size * 0.15
+    for pos in face_dots(value, rotated):
+        px = pos[0] * size
+        py = pos[1] * size
+        draw.ellipse(
+            [px - dot_radius, py - dot_radius,
+             px + dot_radius, py + dot_radius],
+            fill=dot_rgb
+        )
+    return img
+
+
+class TileAtlas:
+    """Cache of pre-rendered die faces keyed by (die size, color scheme, cell code)"""
+
+    def __init__(self):
+        self._tiles = {}
+        self._stacks = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def tile(self, size, scheme, code):
+        """Return the tile of a cell code as a (size, size, 3) uint8 array"""
+        key = (int(size), scheme, int(code))
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self.misses += 1
+                tile = np.asarray(draw_face(key[0], scheme, key[2] & FACE_MASK, bool(key[2] & ROTATED)))
+                tile.flags.writeable = False
+                self._tiles[key] = tile
+            else:
+                self.hits += 1
+            return tile
+
+    def tiles(self, size, scheme):
+        """Return all cell tiles stacked as a (16, size, size, 3) array indexed by cell code"""
+        key = (int(size), scheme)
+        with self._lock:
+            stack = self._stacks.get(key)
+            if stack is None:
+                stack = np.zeros((ROTATED * 2, key[0], key[0], 3), dtype=np.uint8)
+                for value in DICE_FACES:
+                    stack[value] = self.tile(size, scheme, value)
+                    stack[value | ROTATED] = self.tile(size, scheme, value | ROTATED)
+                stack.flags.writeable = False
+                self._stacks[key] = stack
+            else:
+                self.hits += 1
+            return stack
+
+    def lookup(self, size, scheme, grid):
+        """Return (stack, index) such that stack[index] gathers one tile per cell
+
+        scheme is used for cells without an explicit scheme. Grids that only
+        use the default scheme index the cached 16-tile stack directly.
+        """
+        grid = np.asarray(grid)
+        if grid.size == 0 or int(grid.max()) <= TILE_MASK:
+            return self.tiles(size, scheme), grid
+
+        # Stack only the codes present and map every code to its slot
+        present = np.flatnonzero(np.bincount(grid.ravel(), minlength=256))
+        stack = np.stack([
+            self.tile(size, scheme_name(code >> SCHEME_SHIFT, scheme), code & TILE_MASK)
+            for code in present
+        ])
+        table = np.zeros(256, dtype=np.intp)
+        table[present] = np.arange(len(present))
+        return stack, table[grid]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "tiles": len(self._tiles)}
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self._stacks.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared atlas used by the GUI and the pipeline
+TILE_ATLAS = TileAtlas()
+
+
+def render_array(grid, die_size, scheme, atlas=None):
+    """Composite a dice grid into an (h * size, w * size, 3) uint8 array"""
+    atlas = atlas or TILE_ATLAS
+    grid = np.asarray(grid)
+    size = int(die_size)
+    height, width = grid.shape
+    tiles, index = atlas.lookup(size, scheme, grid)
+
+    # Gather one tile per cell, then interleave tile rows with grid rows
+    mosaic = tiles[index]
+    return mosaic.transpose(0, 2, 1, 3, 4).reshape(height * size, width * size, 3)
+
+
+def render_mosaic(grid, die_size, scheme, atlas=None):
+    """Composite a dice grid into an RGB image"""
+    return Image.fromarray(render_array(grid, die_size, scheme, atlas), "RGB")
+
+
+def band_rows(width, die_size, budget_bytes):
+    """Return how many pixel rows of the mosaic fit in the given byte budget"""
+    row_bytes = width * int(die_size) * 3
+    return max(1, int(budget_bytes) // row_bytes)
+
+
+def iter_mosaic_bands(grid, die_size, scheme, rows_per_band, atlas=None):
+    """Yield the mosaic as successive (rows, w * size, 3) pixel bands
+
+    Only one band is materialized at a time, so memory stays bounded by the
+    band size regardless of the grid size or die size.
+    """
+    atlas = atlas or TILE_ATLAS
+    grid = np.asarray(grid)
+    size = int(die_size)
+    height, width = grid.shape
+    tiles, index = atlas.lookup(size, scheme, grid)
+    total_rows = height * size
+
+    for top in range(0, total_rows, rows_per_band):
+        bottom = min(total_rows, top + rows_per_band)
+        parts = []
+        y = top
+        while y < bottom:
+            die_row, r0 = divmod(y, size)
+            r1 = min(size, r0 + bottom - y)
+            # Gather only the band's pixel rows of each tile: (w, r, size, 3) -> (r, w * size, 3)
+            part = tiles[index[die_row], r0:r1]
+            parts.append(part.transpose(1, 0, 2, 3).reshape(r1 - r0, width * size, 3))
+            y += r1 - r0
+        yield parts[0] if len(parts) == 1 else np.concatenate(parts)
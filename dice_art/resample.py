@@ -0,0 +1,148 @@
+"""Gamma-correct area-average resampling from a cached mip pyramid
+
+Every grid cell should show the mean light of the image area it covers.
+Averaging sRGB values directly darkens fine detail, and Pillow's default
+resize filter looks at a bounded neighbourhood, so it also drifts for large
+downsample ratios. Instead:
+
+- pixel values are decoded to linear light through a 256-entry table
+  (grayscale uses Pillow's L conversion first, so flat tones map exactly as
+  before);
+- an ImagePyramid keeps 2x box-reduced levels in linear light, built lazily
+  and in row strips so the full-resolution float image is only materialized
+  when a target actually needs level 0;
+- a target size reads the coarsest level that still has OVERSAMPLE level
+  pixels per output pixel, and every output pixel is the exact area mean of
+  its (fractional) footprint on that level, computed from running sums;
+- results are encoded back to sRGB.
+
+Sweeping the grid width only repeats the last step on a cached level.
+"""
+
+import threading
+
+import numpy as np
+from PIL import Image
+
+# Level pixels per output pixel required before a coarser level is used
+OVERSAMPLE = 4
+
+# Rows of the source decoded to linear light at a time while building level 1
+STRIP_ROWS = 512
+
+SRGB_TO_LINEAR = np.where(
+    np.arange(256) / 255.0 <= 0.04045,
+    np.arange(256) / 255.0 / 12.92,
+    ((np.arange(256) / 255.0 + 0.055) / 1.055) ** 2.4
+).astype(np.float32)
+
+
+def linear_to_srgb(values):
+    """Encode linear light in 0-1 to sRGB uint8"""
+    values = np.clip(values, 0.0, 1.0)
+    encoded = np.where(values <= 0.0031308, values * 12.92, 1.055 * values ** (1 / 2.4) - 0.055)
+    return np.round(encoded * 255.0).astype(np.uint8)
+
+
+def halve(level):
+    """2x2 box reduction of an (h, w, c) array; odd edges average the pixels that exist"""
+    height, width = level.shape[:2]
+    if height % 2 or width % 2:
+        level = np.pad(level, ((0, height % 2), (0, width % 2), (0, 0)), mode="edge")
+    return (level[0::2, 0::2] + level[1::2, 0::2] + level[0::2, 1::2] + level[1::2, 1::2]) * np.float32(0.25)
+
+
+def interpolate_sums(sums, positions, axis):
+    """Sample running sums at fractional positions and difference them into per-interval sums"""
+    last = sums.shape[axis] - 2
+    index = np.minimum(np.floor(positions).astype(np.intp), last)
+    frac = (positions - index).astype(np.float64)
+    shape = [1] * sums.ndim
+    shape[axis] = len(positions)
+    frac = frac.reshape(shape)
+    sampled = np.take(sums, index, axis=axis) * (1 - frac) + np.take(sums, index + 1, axis=axis) * frac
+    return np.diff(sampled, axis=axis)
+
+
+def area_mean(level, xs, ys):
+    """Exact area means of a piecewise-constant (h, w, c) level over the cells between xs and ys"""
+    height, width, channels = level.shape
+    columns = np.empty((height, len(xs) - 1, channels), dtype=np.float64)
+    for start in range(0, height, STRIP_ROWS):
+        strip = level[start:start + STRIP_ROWS]
+        sums = np.zeros((len(strip), width + 1, channels), dtype=np.float64)
+        np.cumsum(strip, axis=1, dtype=np.float64, out=sums[:, 1:])
+        columns[start:start + STRIP_ROWS] = interpolate_sums(sums, xs, axis=1)
+
+    sums = np.zeros((height + 1,) + columns.shape[1:], dtype=np.float64)
+    np.cumsum(columns, axis=0, out=sums[1:])
+    totals = interpolate_sums(sums, ys, axis=0)
+    return totals / (np.diff(ys)[:, None, None] * np.diff(xs)[None, :, None])
+
+
+class ImagePyramid:
+    """Linear-light 2x mip levels of an image, per mode ("L" or "RGB"), built on demand"""
+
+    def __init__(self, img):
+        self.image = img
+        self.size = img.size
+        self._sources = {}
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    def _source(self, mode):
+        source = self._sources.get(mode)
+        if source is None:
+            source = np.asarray(self.image.convert(mode))
+            if source.ndim == 2:
+                source = source[:, :, None]
+            self._sources[mode] = source
+        return source
+
+    def _build(self, mode, k):
+        if k == 0:
+            return SRGB_TO_LINEAR[self._source(mode)]
+        if k == 1 and (mode, 0) not in self._levels:
+            # Decode to linear light a strip at a time instead of all of level 0
+            source = self._source(mode)
+            return np.concatenate([
+                halve(SRGB_TO_LINEAR[source[start:start + STRIP_ROWS]])
+                for start in range(0, source.shape[0], STRIP_ROWS)
+            ])
+        return halve(self.level(mode, k - 1))
+
+    def level(self, mode, k):
+        """Return level k (2**k source pixels per level pixel) as a float32 (h, w, c) array"""
+        key = (mode, k)
+        level = self._levels.get(key)
+        if level is None:
+            level = self._build(mode, k)
+            self._levels[key] = level
+        return level
+
+    def level_for(self, size):
+        """Coarsest level index that keeps OVERSAMPLE level pixels per output pixel"""
+        width, height = self.size
+        k = 0
+        while width >> (k + 1) >= OVERSAMPLE * size[0] and height >> (k + 1) >= OVERSAMPLE * size[1]:
+            k += 1
+        return k
+
+    def resample(self, size, mode="L"):
+        """Return the image at size as an area-averaged, gamma-correct Image of the given mode"""
+        out_width, out_height = size
+        with self._lock:
+            k = self.level_for(size)
+            level = self.level(mode, k)
+
+        # Cell edges in level coordinates; the image spans size / 2**k of them
+        scale = float(1 << k)
+        xs = np.arange(out_width + 1) * (self.size[0] / out_width / scale)
+        ys = np.arange(out_height + 1) * (self.size[1] / out_height / scale)
+        pixels = linear_to_srgb(area_mean(level, xs, ys))
+        if mode == "L":
+            return Image.fromarray(pixels[:, :, 0], "L")
+        return Image.fromarray(pixels, mode)
+
+    def nbytes(self):
+        return sum(level.nbytes for level in self._levels.values()) + sum(s.nbytes for s in self._sources.values())
@@ -0,0 +1,527 @@
+"""Local HTTP render service
+
+    python -m dice_art.server [--host 127.0.0.1] [--port 8765] [--workers N]
+
+POST /render with the image as the request body, or as the "image" field
+of a multipart/form-data upload, and parameters in the query string or
+form fields:
+
+    width, brightness, contrast, color, mapping
+    palette   comma-separated schemes to mix (implies mapping=palette)
+    format    json (grid, the default), png or list
+    die_px    pixel size of each die for png
+
+GET /metrics reports request counts, cache and queue state and latency
+histograms in the Prometheus text format; GET /health answers "ok".
+
+Conversions run in a bounded process pool; when MAX_QUEUE_PER_WORKER jobs
+per worker are already waiting, new work is refused with 503. Results are
+kept in an LRU cache keyed by the SHA-256 of the image plus the normalized
+parameters, and identical requests that arrive while one is computing wait
+for that computation instead of starting their own. Uploads are spooled to
+disk once per content hash, so workers read them through the shared loader
+and keep a StageCache per image, exactly as the CLI does.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qsl, urlsplit
+
+from PIL import UnidentifiedImageError
+
+from dice_art import pipeline
+from dice_art.loader import IMAGE_LOADER
+from dice_art.render import DICE_COLORS
+from dice_art.stages import StageCache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+MAX_HEADER_BYTES = 64 << 10
+MAX_UPLOAD_BYTES = 64 << 20
+
+# Limits on what a single request may ask for
+MAX_WIDTH = 1000
+MAX_DIE_PX = 100
+MAX_PNG_PIXELS = 40_000_000
+
+# Bytes of encoded results kept in the result cache
+CACHE_BYTES = 256 << 20
+
+# Jobs allowed to wait per worker before requests are refused
+MAX_QUEUE_PER_WORKER = 4
+
+# Uploads kept on disk, and images with a StageCache in each worker
+SPOOL_FILES = 64
+WORKER_SOURCES = 4
+
+# Decoded pixels cached by the loader in each worker process
+WORKER_LOADER_BYTES = 128 << 20
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+OUTPUTS = {"json": "application/json", "png": "image/png", "list": "text/plain; charset=utf-8"}
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+    413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """Abort a request with an HTTP status"""
+
+    def __init__(self, status, message=None):
+        super().__init__(message or REASONS[status])
+        self.status = status
+
+
+def parse_params(fields):
+    """Validate request fields into a normalized, hashable parameter tuple
+
+    (width, brightness, contrast, color, mapping, palette, output, die_px)
+    """
+    def number(name, default, kind, low, high):
+        text = fields.get(name)
+        if text in (None, ""):
+            return default
+        try:
+            value = kind(text)
+        except ValueError:
+            raise HTTPError(400, f"{name} must be a number") from None
+        if not low <= value <= high:
+            raise HTTPError(400, f"{name} must be between {low} and {high}")
+        return value
+
+    width = number("width", 30, int, 1, MAX_WIDTH)
+    brightness = number("brightness", 1.0, float, 0.0, 5.0)
+    contrast = number("contrast", 1.0, float, 0.0, 5.0)
+    color = fields.get("color") or "white"
+    if color not in DICE_COLORS:
+        raise HTTPError(400, f"color must be one of {', '.join(DICE_COLORS)}")
+
+    palette = None
+    if fields.get("palette"):
+        palette = tuple(name.strip() for name in fields["palette"].split(",") if name.strip())
+        unknown = set(palette) - set(DICE_COLORS)
+        if unknown:
+            raise HTTPError(400, f"unknown palette scheme(s): {', '.join(sorted(unknown))}")
+    mapping = fields.get("mapping") or ("palette" if palette else "linear")
+    if mapping not in pipeline.MAPPINGS:
+        raise HTTPError(400, f"mapping must be one of {', '.join(pipeline.MAPPINGS)}")
+    if mapping != "palette":
+        palette = None
+
+    output = fields.get("format") or "json"
+    if output not in OUTPUTS:
+        raise HTTPError(400, f"format must be one of {', '.join(OUTPUTS)}")
+    die_px = number("die_px", pipeline.EXPORT_DIE_SIZE, int, 1, MAX_DIE_PX) if output == "png" else None
+    return width, brightness, contrast, color, mapping, palette, output, die_px
+
+
+def parse_upload(headers, body, query):
+    """Return (image bytes, fields) from a raw or multipart/form-data request body"""
+    fields = dict(query)
+    content_type = headers.get("content-type", "")
+    if not content_type.lower().startswith("multipart/form-data"):
+        return body, fields
+
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body)
+    image = None
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True) or b""
+        if name == "image":
+            image = payload
+        elif name:
+            fields[name] = payload.decode("utf-8", "replace")
+    if image is None:
+        raise HTTPError(400, "multipart upload has no 'image' field")
+    return image, fields
+
+
+def write_atomic(path, data):
+    """Write a file under a temporary name and move it into place"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+# Worker process side
+
+_worker_stages = OrderedDict()
+
+
+def init_worker():
+    IMAGE_LOADER.budget_bytes = WORKER_LOADER_BYTES
+
+
+def worker_stages(path):
+    """StageCache of a spooled upload, kept for the last few images seen by this worker"""
+    stages = _worker_stages.get(path)
+    if stages is None:
+        stages = StageCache(path=path)
+        _worker_stages[path] = stages
+        while len(_worker_stages) > WORKER_SOURCES:
+            _worker_stages.popitem(last=False)
+    else:
+        _worker_stages.move_to_end(path)
+    return stages
+
+
+def render_request(path, params):
+    """Convert a spooled upload; runs in a worker and returns (body, seconds)"""
+    start = time.perf_counter()
+    width, brightness, contrast, color, mapping, palette, output, die_px = params
+    grid = worker_stages(path).grid(width, brightness, contrast, mapping, color, palette)
+    height = grid.shape[0]
+
+    if output == "png":
+        if width * height * die_px * die_px > MAX_PNG_PIXELS:
+            raise ValueError(f"a {width}x{height} grid at {die_px}px per die exceeds {MAX_PNG_PIXELS} pixels")
+        buffer = io.BytesIO()
+        pipeline.render_image(grid, color, die_px).save(buffer, "PNG")
+        body = buffer.getvalue()
+    elif output == "list":
+        body = pipeline.format_dice_list(grid, color).encode()
+    else:
+        # width, height, dice, schemes and the cell codes (see dice_art.cells; plain faces are 1-6)
+        response = grid.to_dict(color)
+        response.update(color=color, mapping=mapping)
+        body = json.dumps(response).encode()
+    return body, time.perf_counter() - start
+
+
+# Service side
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def lines(self, name, labels=""):
+        sep = "," if labels else ""
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield f'{name}_bucket{{{labels}{sep}le="{bound}"}} {total}'
+        suffix = f"{{{labels}}}" if labels else ""
+        yield f"{name}_sum{suffix} {self.sum:.6f}"
+        yield f"{name}_count{suffix} {self.count}"
+
+
+class ResultCache:
+    """LRU of encoded results bounded by their total size"""
+
+    def __init__(self, budget_bytes=CACHE_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        # Counted by the owner when a result is actually computed, so coalesced
+        # and failed requests don't skew the hit ratio
+        self.misses = 0
+
+    def get(self, key):
+        body = self._entries.get(key)
+        if body is None:
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return body
+
+    def put(self, key, body):
+        if len(body) > self.budget_bytes or key in self._entries:
+            return
+        self._entries[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.budget_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RenderService:
+    """Cache, coalesce and dispatch render requests to a process pool"""
+
+    def __init__(self, workers=None, cache_bytes=CACHE_BYTES, spool_dir=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * MAX_QUEUE_PER_WORKER
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+        self.cache = ResultCache(cache_bytes)
+        self._own_spool = spool_dir is None
+        self.spool_dir = spool_dir or tempfile.mkdtemp(prefix="dice-art-uploads-")
+        self._spooled = OrderedDict()
+        self._inflight = {}
+        self.pending = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.requests = {}
+        self.request_seconds = {}
+        self.render_seconds = Histogram()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self._own_spool:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    async def render(self, data, params):
+        """Return (body, source) where source is hit, miss or coalesced"""
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, lambda: hashlib.sha256(data).hexdigest())
+        key = (digest, params)
+        body = self.cache.get(key)
+        if body is not None:
+            return body, "hit"
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            # Shielded: a client hanging up must not cancel work others wait for
+            return await asyncio.shield(task), "coalesced"
+
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPError(503, "render queue is full, retry later")
+        # Counted here, not when the task starts, so a burst can't overshoot the bound
+        self.pending += 1
+        task = asyncio.ensure_future(self._compute(key, data))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), "miss"
+
+    async def _compute(self, key, data):
+        digest, params = key
+        loop = asyncio.get_running_loop()
+        try:
+            path = await self._spool(digest, data)
+            body, seconds = await loop.run_in_executor(self.pool, render_request, path, params)
+        finally:
+            self.pending -= 1
+        self.render_seconds.observe(seconds)
+        self.cache.misses += 1
+        self.cache.put(key, body)
+        return body
+
+    async def _spool(self, digest, data):
+        """Write an upload once per content hash; returns its path"""
+        path = os.path.join(self.spool_dir, digest)
+        if digest in self._spooled:
+            self._spooled.move_to_end(digest)
+            return path
+        await asyncio.get_running_loop().run_in_executor(None, write_atomic, path, data)
+        self._spooled[digest] = path
+        # Never remove a file that a queued or running job may still read
+        busy = {digest for digest, _ in self._inflight}
+        for old in list(self._spooled):
+            if len(self._spooled) <= SPOOL_FILES:
+                break
+            if old not in busy:
+                os.remove(self._spooled.pop(old))
+        return path
+
+    def observe_request(self, route, status, seconds):
+        self.requests[(route, status)] = self.requests.get((route, status), 0) + 1
+        self.request_seconds.setdefault(route, Histogram()).observe(seconds)
+
+    def metrics(self):
+        """Metrics in the Prometheus text format"""
+        lines = ["# TYPE dice_art_requests_total counter"]
+        lines += [f'dice_art_requests_total{{route="{route}",status="{status}"}} {count}'
+                  for (route, status), count in sorted(self.requests.items())]
+        lines += [
+            "# TYPE dice_art_queue_depth gauge",
+            f"dice_art_queue_depth {max(0, self.pending - self.workers)}",
+            "# TYPE dice_art_jobs_in_flight gauge",
+            f"dice_art_jobs_in_flight {self.pending}",
+            "# TYPE dice_art_workers gauge",
+            f"dice_art_workers {self.workers}",
+            "# TYPE dice_art_cache_hits_total counter",
+            f"dice_art_cache_hits_total {self.cache.hits}",
+            "# TYPE dice_art_cache_misses_total counter",
+            f"dice_art_cache_misses_total {self.cache.misses}",
+            "# TYPE dice_art_cache_entries gauge",
+            f"dice_art_cache_entries {len(self.cache)}",
+            "# TYPE dice_art_cache_bytes gauge",
+            f"dice_art_cache_bytes {self.cache.bytes}",
+            "# TYPE dice_art_coalesced_total counter",
+            f"dice_art_coalesced_total {self.coalesced}",
+            "# TYPE dice_art_rejected_total counter",
+            f"dice_art_rejected_total {self.rejected}",
+            "# TYPE dice_art_request_seconds histogram",
+        ]
+        for route, histogram in sorted(self.request_seconds.items()):
+            lines += histogram.lines("dice_art_request_seconds", f'route="{route}"')
+        lines.append("# TYPE dice_art_render_seconds histogram")
+        lines += self.render_seconds.lines("dice_art_render_seconds")
+        return "\n".join(lines) + "\n"
+
+    async def dispatch(self, method, target, headers, body):
+        """Return (status, content type, body, extra headers) for one request"""
+        url = urlsplit(target)
+        if url.path == "/render":
+            if method != "POST":
+                raise HTTPError(405)
+            data, fields = parse_upload(headers, body, parse_qsl(url.query))
+            if not data:
+                raise HTTPError(400, "no image uploaded")
+            params = parse_params(fields)
+            try:
+                result, source = await self.render(data, params)
+            except UnidentifiedImageError:
+                raise HTTPError(400, "upload is not a supported image") from None
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from None
+            return 200, OUTPUTS[params[6]], result, {"X-Cache": source}
+        if url.path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.metrics().encode(), {}
+        if url.path == "/health":
+            return 200, "text/plain", b"ok\n", {}
+        raise HTTPError(404)
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                start = time.perf_counter()
+                route = "-"
+                keep_alive = False
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers, body = request
+                    route = urlsplit(target).path
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                    status, content_type, payload, extra = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, content_type, payload, extra = e.status, "text/plain", f"{e}\n".encode(), {}
+                    if status == 503:
+                        extra = {"Retry-After": "1"}
+                except Exception as e:
+                    status, content_type, payload, extra = 500, "text/plain", f"{e}\n".encode(), {}
+                    print(f"{route}: {e!r}", file=sys.stderr)
+                # Unknown routes share one label so scans can't grow the metrics
+                if route not in ("/render", "/metrics", "/health"):
+                    route = "other"
+                # Errors raised before the body was read leave the stream unusable
+                keep_alive = keep_alive and status not in (411, 413, 431)
+                await write_response(writer, status, content_type, payload, extra, keep_alive)
+                self.observe_request(route, status, time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def read_request(reader):
+    """Read one request; returns (method, target, version, headers, body) or None at end of stream"""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if e.partial.strip():
+            raise HTTPError(400, "incomplete request") from None
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(431) from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(411, "chunked uploads are not supported; send Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length") from None
+    if length > MAX_UPLOAD_BYTES:
+        raise HTTPError(413, f"uploads are limited to {MAX_UPLOAD_BYTES >> 20} MiB")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version, headers, body
+
+
+async def write_response(writer, status, content_type, body, extra=None, keep_alive=True):
+    head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{name}: {value}" for name, value in (extra or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, cache_bytes=CACHE_BYTES):
+    service = RenderService(workers, cache_bytes)
+    try:
+        server = await asyncio.start_server(service.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        print(f"Serving dice art on http://{host}:{port} with {service.workers} worker(s)", flush=True)
+        serving = asyncio.ensure_future(server.serve_forever())
+        try:
+            # Stop cleanly on SIGTERM too, so the worker processes are shut down
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, serving.cancel)
+        except (NotImplementedError, AttributeError):  # Windows
+            pass
+        async with server:
+            try:
+                await serving
+            except asyncio.CancelledError:
+                pass
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m dice_art.server", description="Local dice art render service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--cache-mb", type=int, default=CACHE_BYTES >> 20, help="result cache size in MiB")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_mb << 20))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
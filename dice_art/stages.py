@@ -0,0 +1,126 @@
+"""Memoized generation stages for interactive tweaking
+
+Generation is a chain of stages, each cached under exactly the parameters
+it depends on:
+
+    decode    the source, at the scale the grid needs (loader)
+    adjust    brightness, contrast
+    pyramid   linear-light mip levels of the adjusted image
+    resample  + grid width, sampling mode     (L, L at 3x, or RGB)
+    quantize  + mapping, and color/palette for the mappings that use them
+
+Moving one slider recomputes only the stages downstream of it: a contrast
+change reuses the decoded image, a width change reuses the adjusted image,
+sweeping the width only resamples from a cached pyramid level, and
+switching between the grayscale mappings reuses the resampled image.
+Rendering is the last stage; MosaicViewport keys it by grid and scheme and
+repaints only the cells that changed (see dice_art.grid.grid_diff).
+
+Calls are serialized with a lock, so the GUI worker and main thread can
+share one StageCache.
+"""
+
+import threading
+from collections import OrderedDict
+
+from dice_art.loader import IMAGE_LOADER
+from dice_art.palette import Palette
+from dice_art.pipeline import (adjust_image, quantize_resampled, required_source_size, resample_image,
+                               resample_mode)
+from dice_art.resample import ImagePyramid
+
+# Results kept per stage; full-resolution adjusted images are large, so only one
+STAGE_ENTRIES = {"adjust": 1, "pyramid": 1, "resample": 4, "quantize": 8}
+
+
+def palette_key(palette):
+    """Hashable stand-in for a palette argument"""
+    if palette is None or isinstance(palette, Palette):
+        # Palettes hash by identity; keeping the object in the key keeps that identity valid
+        return palette
+    return tuple(palette)
+
+
+class StageCache:
+    """Decoded source plus memoized adjust, pyramid, resample and quantize results"""
+
+    def __init__(self, image=None, path=None, loader=None):
+        self._lock = threading.RLock()
+        self._entries = {stage: OrderedDict() for stage in STAGE_ENTRIES}
+        self.hits = dict.fromkeys(STAGE_ENTRIES, 0)
+        self.misses = dict.fromkeys(STAGE_ENTRIES, 0)
+        self.loader = loader or IMAGE_LOADER
+        self.image = None
+        self.path = None
+        self.size = None
+        if image is not None or path is not None:
+            self.set_source(image, path)
+
+    def set_source(self, image=None, path=None):
+        """Start over from a decoded image, or from a file decoded at the scale each grid needs"""
+        with self._lock:
+            self.image = image
+            self.path = path if image is None else None
+            if image is not None:
+                self.size = image.size
+            else:
+                self.size = self.loader.size(path) if path else None
+            for entries in self._entries.values():
+                entries.clear()
+
+    def decoded(self, min_size=None):
+        """Return the source decoded at no less than min_size (default: full size)"""
+        if self.path is not None:
+            return self.loader.load(self.path, min_size)
+        if self.image is None:
+            raise ValueError("No source image")
+        return self.image
+
+    def _memo(self, stage, key, compute):
+        with self._lock:
+            entries = self._entries[stage]
+            if key in entries:
+                self.hits[stage] += 1
+                entries.move_to_end(key)
+                return entries[key]
+            self.misses[stage] += 1
+            value = compute()
+            entries[key] = value
+            while len(entries) > STAGE_ENTRIES[stage]:
+                entries.popitem(last=False)
+            return value
+
+    def adjusted(self, brightness=1.0, contrast=1.0, min_size=None):
+        source = self.decoded(min_size)
+        # Different decode scales of the same file are different sources
+        key = (source.size, brightness, contrast)
+        return self._memo("adjust", key, lambda: adjust_image(source, brightness, contrast))
+
+    def pyramid(self, brightness=1.0, contrast=1.0, min_size=None):
+        adjusted = self.adjusted(brightness, contrast, min_size)
+        return self._memo("pyramid", (adjusted.size, brightness, contrast), lambda: ImagePyramid(adjusted))
+
+    def resampled(self, width, brightness=1.0, contrast=1.0, mapping="linear"):
+        key = (brightness, contrast, width, resample_mode(mapping))
+
+        def compute():
+            min_size = required_source_size(self.size, width, mapping)
+            return resample_image(self.adjusted(brightness, contrast, min_size), width, mapping,
+                                  self.pyramid(brightness, contrast, min_size), self.size)
+        return self._memo("resample", key, compute)
+
+    def grid(self, width, brightness=1.0, contrast=1.0, mapping="linear", color="white", palette=None):
+        """Same result as pipeline.generate_grid, recomputing only the stages whose inputs changed"""
+        key = (brightness, contrast, width, mapping)
+        if mapping == "perceptual":
+            key += (color,)
+        elif mapping == "palette":
+            key += (color, palette_key(palette))
+
+        def compute():
+            # DiceGrids are read-only, so cached grids can be shared between callers
+            return quantize_resampled(self.resampled(width, brightness, contrast, mapping), mapping, color, palette)
+        return self._memo("quantize", key, compute)
+
+    def stats(self):
+        return {stage: {"hits": self.hits[stage], "misses": self.misses[stage]} for stage in STAGE_ENTRIES}
@@ -0,0 +1,192 @@
+"""Parameter sweeps over one image, laid out as a labeled contact sheet
+
+A sweep generates every combination of grid widths, brightness, contrast,
+mappings and dice colors. Combinations are grouped by (brightness,
+contrast): each group runs in its own StageCache, so the image is adjusted
+and its pyramid built once per group, every width is resampled from that
+pyramid, and colors only re-run the quantize stage for the mappings that
+depend on them. The source is decoded once per process, at the scale the
+widest grid needs.
+
+Groups run in parallel: in worker processes by default, or in threads
+(processes=False) where forking is unwelcome, such as from the GUI; the
+heavy NumPy and Pillow stages release the GIL.
+
+Each entry gets a thumbnail drawn by a fitted MosaicViewport, so large
+grids are reduced to die colors instead of rendering every pip.
+"""
+
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from PIL import Image, ImageDraw, ImageFont
+
+from dice_art.pipeline import required_source_size
+from dice_art.stages import StageCache
+from dice_art.viewport import BACKGROUND, MosaicViewport
+
+# Longest edge of a contact sheet thumbnail in pixels
+THUMB_PX = 200
+
+# Spacing around thumbnails and the height of each label line
+SHEET_PADDING = 8
+LABEL_LINE_PX = 13
+LABEL_LINES = 2
+
+LABEL_COLOR = (0xec, 0xf0, 0xf1)
+
+# Widest sheet laid out as one row per brightness/contrast pair
+MAX_GROUP_COLUMNS = 12
+
+
+def parse_values(text, cast=float):
+    """Parse "20 30 40", "20,30,40" or an inclusive "start:stop:count" range"""
+    text = text.strip()
+    if text.count(":") == 2:
+        start, stop, count = text.split(":")
+        start, stop, count = float(start), float(stop), int(count)
+        if count < 1:
+            raise ValueError(f"Invalid range '{text}': count must be at least 1")
+        step = (stop - start) / (count - 1) if count > 1 else 0.0
+        values = [start + step * i for i in range(count)]
+        # Keep floats readable in labels and cache keys
+        return [cast(round(value)) if cast is int else cast(round(value, 6)) for value in values]
+    values = [cast(value) for value in text.replace(",", " ").split()]
+    if not values:
+        raise ValueError("No values given")
+    return values
+
+
+class SweepEntry:
+    """One combination of a sweep: its parameters, grid and thumbnail"""
+
+    def __init__(self, width, brightness, contrast, mapping, color, grid, thumbnail):
+        self.width = width
+        self.brightness = brightness
+        self.contrast = contrast
+        self.mapping = mapping
+        self.color = color
+        self.grid = grid
+        self.thumbnail = thumbnail
+
+    @property
+    def params(self):
+        return self.width, self.brightness, self.contrast, self.mapping, self.color
+
+    def labels(self):
+        return (f"w{self.width} b{self.brightness:g} c{self.contrast:g}",
+                f"{self.color} {self.mapping}, {self.grid.size} dice")
+
+
+def thumbnail(grid, color, thumb_px=THUMB_PX):
+    """Render a grid to fit in a thumb_px square"""
+    height, width = grid.shape
+    scale = thumb_px / max(width, height)
+    view = MosaicViewport(grid, color, (max(1, round(width * scale)), max(1, round(height * scale))))
+    return view.render()
+
+
+def sweep_group(source, brightness, contrast, widths, mappings, colors, palette=None, thumb_px=THUMB_PX):
+    """Worker task: every width, mapping and color for one brightness/contrast pair
+
+    source is an image path or a decoded PIL image.
+    """
+    if isinstance(source, Image.Image):
+        stages = StageCache(image=source)
+    else:
+        stages = StageCache(path=source)
+        # Decode once, at the scale the widest grid needs; narrower grids reuse it
+        needed = [required_source_size(stages.size, width, mapping) for width in widths for mapping in mappings]
+        stages.decoded((max(w for w, _ in needed), max(h for _, h in needed)))
+
+    entries = []
+    for width in widths:
+        for mapping in mappings:
+            for color in colors:
+                grid = stages.grid(width, brightness, contrast, mapping, color, palette)
+                entries.append(SweepEntry(width, brightness, contrast, mapping, color, grid,
+                                          thumbnail(grid, color, thumb_px)))
+    return entries
+
+
+def run_sweep(source, widths, brightness=(1.0,), contrast=(1.0,), mappings=("linear",), colors=("white",),
+              palette=None, jobs=None, processes=True, thumb_px=THUMB_PX, progress=None):
+    """Generate every combination; returns SweepEntry objects ordered by brightness, contrast, width, mapping, color
+
+    jobs defaults to the number of CPUs. progress, if given, is called with
+    the completed fraction and may raise to abort the sweep.
+    """
+    groups = list(itertools.product(brightness, contrast))
+    jobs = min(jobs or os.cpu_count() or 1, len(groups))
+    args = (list(widths), list(mappings), list(colors), palette, thumb_px)
+
+    results = {}
+    if jobs <= 1:
+        for group in groups:
+            results[group] = sweep_group(source, *group, *args)
+            if progress:
+                progress(len(results) / len(groups))
+    else:
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with executor(max_workers=jobs) as pool:
+            futures = {pool.submit(sweep_group, source, *group, *args): group for group in groups}
+            try:
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    if progress:
+                        progress(len(results) / len(groups))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    return [entry for group in groups for entry in results[group]]
+
+
+def sheet_columns(entries):
+    """One row per brightness/contrast pair when rows stay narrow, else a square layout"""
+    first = entries[0]
+    group = sum(1 for entry in entries if (entry.brightness, entry.contrast) == (first.brightness, first.contrast))
+    if 1 < group <= MAX_GROUP_COLUMNS:
+        return group
+    return math.ceil(math.sqrt(len(entries)))
+
+
+def contact_sheet(entries, columns=None, thumb_px=THUMB_PX):
+    """Lay entries out on one image, each thumbnail above its parameters and dice count"""
+    if not entries:
+        raise ValueError("No sweep entries")
+    columns = columns or sheet_columns(entries)
+    rows = -(-len(entries) // columns)
+    cell_width = thumb_px + SHEET_PADDING
+    cell_height = thumb_px + LABEL_LINES * LABEL_LINE_PX + SHEET_PADDING
+    sheet = Image.new("RGB", (columns * cell_width + SHEET_PADDING, rows * cell_height + SHEET_PADDING),
+                      BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+    for index, entry in enumerate(entries):
+        x, y = sheet_position(index, columns, thumb_px)
+        thumb = entry.thumbnail
+        sheet.paste(thumb, (x + (thumb_px - thumb.width) // 2, y + (thumb_px - thumb.height) // 2))
+        for line, label in enumerate(entry.labels()):
+            draw.text((x, y + thumb_px + 2 + line * LABEL_LINE_PX), label, fill=LABEL_COLOR, font=font)
+    return sheet
+
+
+def sheet_position(index, columns, thumb_px=THUMB_PX):
+    """Top-left pixel of an entry's thumbnail slot on the contact sheet"""
+    row, column = divmod(index, columns)
+    return (SHEET_PADDING + column * (thumb_px + SHEET_PADDING),
+            SHEET_PADDING + row * (thumb_px + LABEL_LINES * LABEL_LINE_PX + SHEET_PADDING))
+
+
+def sheet_entry(entries, columns, x, y, thumb_px=THUMB_PX):
+    """Entry whose slot contains the sheet pixel (x, y), or None"""
+    columns = columns or sheet_columns(entries)
+    column = int((x - SHEET_PADDING) // (thumb_px + SHEET_PADDING))
+    row = int((y - SHEET_PADDING) // (thumb_px + LABEL_LINES * LABEL_LINE_PX + SHEET_PADDING))
+    index = row * columns + column
+    if 0 <= column < columns and row >= 0 and index < len(entries):
+        return entries[index]
+    return None
@@ -0,0 +1,309 @@
+"""Pan/zoom rendering of a dice mosaic, culled to the visible viewport
+
+The mosaic is never rendered as a whole. A viewport renders only what is on
+screen from a pyramid of levels:
+
+- fine levels (at least FACE_MIN_PX per die) are drawn from face tiles in
+  square blocks of cells that are cached, so scrolling only renders the
+  blocks that come into view;
+- coarse levels reduce every die to its mean color, taken straight from the
+  grid through a per-code color table, with 2x box-filtered mip levels
+  below one pixel per die.
+
+Either way the work per redraw is proportional to the viewport, not to the
+grid.
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from dice_art.cells import FACE_MASK, SCHEME_SHIFT, TILE_MASK
+from dice_art.render import TILE_ATLAS, render_mosaic, scheme_name
+from dice_art.grid import grid_diff
+
+# Smallest die size drawn with pips; below it dice are flat mean colors
+FACE_MIN_PX = 4
+
+# Largest zoom in pixels per die
+MAX_ZOOM = 120
+
+# Target edge length in pixels of a cached block of rendered dice
+BLOCK_PX = 256
+
+# Cached blocks; at BLOCK_PX = 256 this is about 50 MB
+CACHE_BLOCKS = 256
+
+# Size at which face tiles are averaged for the coarse color table
+COLOR_SAMPLE_PX = 16
+
+BACKGROUND = (0x34, 0x49, 0x5e)
+
+
+def mean_colors(grid, scheme, atlas=None, table=None, known=None):
+    """Fill a (256, 3) uint8 table with the mean color of every cell code in the grid
+
+    Pass the table and known mask of an earlier call to only add new codes.
+    """
+    atlas = atlas or TILE_ATLAS
+    if table is None:
+        table = np.zeros((256, 3), dtype=np.uint8)
+        known = np.zeros(256, dtype=bool)
+    present = np.bincount(np.asarray(grid).ravel(), minlength=256) > 0
+    for code in np.flatnonzero(present & ~known):
+        known[code] = True
+        if not 1 <= code & FACE_MASK <= 6:
+            continue
+        tile = atlas.tile(COLOR_SAMPLE_PX, scheme_name(code >> SCHEME_SHIFT, scheme), code & TILE_MASK)
+        table[code] = tile.reshape(-1, 3).mean(axis=0).round()
+    return table, known
+
+
+def halve(level):
+    """2x2 box filter of an (h, w, 3) uint8 array, padding odd edges by repetition"""
+    height, width = level.shape[:2]
+    if height % 2 or width % 2:
+        level = np.pad(level, ((0, height % 2), (0, width % 2), (0, 0)), mode="edge")
+    summed = level.reshape(level.shape[0] // 2, 2, level.shape[1] // 2, 2, 3).sum(axis=(1, 3), dtype=np.uint16)
+    return ((summed + 2) // 4).astype(np.uint8)
+
+
+class MosaicViewport:
+    """Pan/zoom state over a dice grid; render() draws only the visible region
+
+    zoom is in screen pixels per die and (center_x, center_y) is the grid
+    point, in cells, shown at the middle of the view.
+    """
+
+    def __init__(self, grid, scheme="white", view_size=(300, 300), atlas=None, cache_blocks=CACHE_BLOCKS):
+        self.atlas = atlas or TILE_ATLAS
+        self.cache_blocks = cache_blocks
+        self.view_width, self.view_height = (max(1, int(v)) for v in view_size)
+        self._blocks = OrderedDict()
+        self.zoom = 1.0
+        self.center_x = self.center_y = 0.0
+        self.set_grid(grid, scheme)
+        self.fit()
+
+    def set_grid(self, grid, scheme=None):
+        """Show a new grid or scheme, keeping the current view where it still fits"""
+        grid = np.asarray(grid)
+        if grid is getattr(self, "grid", None) and scheme in (None, self.scheme):
+            return
+        self.grid = grid
+        if scheme is not None:
+            self.scheme = scheme
+        self._blocks.clear()
+        self._levels = None
+        self._colors = None
+        self.clamp()
+
+    def update_grid(self, grid, bounds=None):
+        """Show a regenerated or edited grid, re-rendering only the cells that changed
+
+        bounds, a (row0, row1, col0, col1) box known to contain every change
+        (e.g. from an edit), limits the comparison to it. Returns the box of
+        changed cells, or None if nothing changed. A grid of another shape is
+        shown afresh.
+        """
+        grid = np.asarray(grid)
+        if grid.shape != self.grid.shape:
+            self.set_grid(grid)
+            return (0, grid.shape[0], 0, grid.shape[1])
+        row0, row1, col0, col1 = bounds or (0, grid.shape[0], 0, grid.shape[1])
+        mask, box = grid_diff(self.grid[row0:row1, col0:col1], grid[row0:row1, col0:col1])
+        self.grid = grid
+        if box is None:
+            return None
+        box = (box[0] + row0, box[1] + row0, box[2] + col0, box[3] + col0)
+
+        for key in list(self._blocks):
+            die_px, block_row, block_col = key
+            cells = self.block_cells(die_px)
+            top, left = block_row * cells - row0, block_col * cells - col0
+            if (top + cells > 0 and left + cells > 0
+                    and mask[max(top, 0):top + cells, max(left, 0):left + cells].any()):
+                del self._blocks[key]
+        if self._levels is not None:
+            self._update_levels(box)
+        return box
+
+    @property
+    def grid_width(self):
+        return self.grid.shape[1]
+
+    @property
+    def grid_height(self):
+        return self.grid.shape[0]
+
+    def fit_zoom(self):
+        return min(self.view_width / self.grid_width, self.view_height / self.grid_height)
+
+    def min_zoom(self):
+        return min(self.fit_zoom(), 1.0) / 2
+
+    def fit(self):
+        """Zoom so the whole grid is visible and center it"""
+        self.zoom = self.fit_zoom()
+        self.center_x = self.grid_width / 2
+        self.center_y = self.grid_height / 2
+
+    def state(self):
+        """Return the view position, to carry over to a viewport of a regenerated grid"""
+        return {"shape": self.grid.shape, "scheme": self.scheme, "zoom": self.zoom,
+                "center": (self.center_x, self.center_y)}
+
+    def restore(self, state):
+        """Apply a state() from another viewport if it showed a grid of the same shape"""
+        if state and tuple(state["shape"]) == self.grid.shape:
+            self.zoom = state["zoom"]
+            self.center_x, self.center_y = state["center"]
+            self.clamp()
+
+    def resize(self, width, height):
+        self.view_width, self.view_height = max(1, int(width)), max(1, int(height))
+        self.clamp()
+
+    def set_zoom(self, zoom, screen_x=None, screen_y=None):
+        """Zoom keeping the grid point under (screen_x, screen_y) in place (default: view center)"""
+        if screen_x is None:
+            screen_x, screen_y = self.view_width / 2, self.view_height / 2
+        grid_x, grid_y = self.to_grid(screen_x, screen_y)
+        zoom = min(max(zoom, self.min_zoom()), MAX_ZOOM)
+        if zoom >= FACE_MIN_PX:
+            # Face levels are drawn at whole pixels per die
+            zoom = float(round(zoom))
+        self.zoom = zoom
+        self.center_x = grid_x - (screen_x - self.view_width / 2) / zoom
+        self.center_y = grid_y - (screen_y - self.view_height / 2) / zoom
+        self.clamp()
+
+    def zoom_by(self, factor, screen_x=None, screen_y=None):
+        zoom = self.zoom * factor
+        if self.zoom >= FACE_MIN_PX and round(zoom) == self.zoom:
+            # Make sure small steps still move at whole-pixel zoom levels
+            zoom = self.zoom + (1 if factor > 1 else -1)
+        self.set_zoom(zoom, screen_x, screen_y)
+
+    def pan(self, dx, dy):
+        """Move the view by a screen-pixel drag"""
+        self.center_x -= dx / self.zoom
+        self.center_y -= dy / self.zoom
+        self.clamp()
+
+    def clamp(self):
+        """Keep the view center on the grid"""
+        self.center_x = min(max(self.center_x, 0.0), float(self.grid_width))
+        self.center_y = min(max(self.center_y, 0.0), float(self.grid_height))
+
+    def to_grid(self, screen_x, screen_y):
+        """Convert a view position to grid coordinates in cells"""
+        return (self.center_x + (screen_x - self.view_width / 2) / self.zoom,
+                self.center_y + (screen_y - self.view_height / 2) / self.zoom)
+
+    def origin(self):
+        """Top-left corner of the view in mosaic pixels at the current zoom"""
+        return (self.center_x * self.zoom - self.view_width / 2,
+                self.center_y * self.zoom - self.view_height / 2)
+
+    def visible_cells(self):
+        """Return (row0, row1, col0, col1) of the cells at least partly in view"""
+        left, top = self.origin()
+        col0 = max(0, int(math.floor(left / self.zoom)))
+        row0 = max(0, int(math.floor(top / self.zoom)))
+        col1 = min(self.grid_width, int(math.ceil((left + self.view_width) / self.zoom)))
+        row1 = min(self.grid_height, int(math.ceil((top + self.view_height) / self.zoom)))
+        return row0, row1, col0, col1
+
+    def render(self):
+        """Draw the current view as an RGB image of the view size"""
+        if self.zoom >= FACE_MIN_PX:
+            return self._render_faces()
+        return self._render_colors()
+
+    @staticmethod
+    def block_cells(die_px):
+        return max(1, BLOCK_PX // die_px)
+
+    def _block(self, die_px, block_row, block_col):
+        key = (die_px, block_row, block_col)
+        block = self._blocks.get(key)
+        if block is not None:
+            self._blocks.move_to_end(key)
+            return block
+        cells = self.block_cells(die_px)
+        sub = self.grid[block_row * cells:(block_row + 1) * cells, block_col * cells:(block_col + 1) * cells]
+        block = render_mosaic(sub, die_px, self.scheme, self.atlas)
+        self._blocks[key] = block
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def _render_faces(self):
+        die_px = int(self.zoom)
+        view = Image.new("RGB", (self.view_width, self.view_height), BACKGROUND)
+        left, top = (int(math.floor(v)) for v in self.origin())
+        row0, row1, col0, col1 = self.visible_cells()
+        if row0 >= row1 or col0 >= col1:
+            return view
+
+        cells = self.block_cells(die_px)
+        span = cells * die_px
+        for block_row in range(row0 // cells, (row1 - 1) // cells + 1):
+            for block_col in range(col0 // cells, (col1 - 1) // cells + 1):
+                block = self._block(die_px, block_row, block_col)
+                view.paste(block, (block_col * span - left, block_row * span - top))
+        return view
+
+    def _color_levels(self):
+        """Mean-color mip chain: level k has 2**-k pixels per die"""
+        if self._levels is None:
+            self._colors = mean_colors(self.grid, self.scheme, self.atlas)
+            level = self._colors[0][self.grid]
+            levels = [level]
+            while max(level.shape[:2]) > 1:
+                level = halve(level)
+                levels.append(level)
+            self._levels = levels
+        return self._levels
+
+    def _update_levels(self, box):
+        """Recompute the mip chain inside a box of changed cells"""
+        row0, row1, col0, col1 = box
+        table, _ = self._colors = mean_colors(self.grid[row0:row1, col0:col1], self.scheme, self.atlas,
+                                              *self._colors)
+        levels = self._levels
+        levels[0][row0:row1, col0:col1] = table[self.grid[row0:row1, col0:col1]]
+        for k in range(1, len(levels)):
+            # The parent box, widened to whole 2x2 groups
+            row0, row1, col0, col1 = row0 // 2, (row1 + 1) // 2, col0 // 2, (col1 + 1) // 2
+            parent = levels[k - 1][row0 * 2:row1 * 2, col0 * 2:col1 * 2]
+            levels[k][row0:row1, col0:col1] = halve(parent)
+
+    def _render_colors(self):
+        levels = self._color_levels()
+        # Finest level that is not more detailed than needed
+        k = 0 if self.zoom >= 1 else min(len(levels) - 1, int(math.floor(math.log2(1 / self.zoom))))
+        level = levels[k]
+        scale = 2 ** k
+
+        view = Image.new("RGB", (self.view_width, self.view_height), BACKGROUND)
+        row0, row1, col0, col1 = self.visible_cells()
+        if row0 >= row1 or col0 >= col1:
+            return view
+
+        # Visible part of the level, and its destination rectangle in the view
+        left, top = self.origin()
+        crop_x0, crop_y0 = col0 // scale, row0 // scale
+        crop = level[crop_y0:-(-row1 // scale), crop_x0:-(-col1 // scale)]
+        box = (col0 / scale - crop_x0, row0 / scale - crop_y0,
+               min(col1 / scale - crop_x0, crop.shape[1]), min(row1 / scale - crop_y0, crop.shape[0]))
+        x0, y0 = int(round(col0 * self.zoom - left)), int(round(row0 * self.zoom - top))
+        x1, y1 = int(round(col1 * self.zoom - left)), int(round(row1 * self.zoom - top))
+        if x1 <= x0 or y1 <= y0:
+            return view
+        resample = Image.NEAREST if self.zoom >= 1 else Image.BILINEAR
+        view.paste(Image.fromarray(crop, "RGB").resize((x1 - x0, y1 - y0), resample, box=box), (x0, y0))
+        return view
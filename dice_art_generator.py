@@ -1,10 +1,29 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk, Scale
-from PIL import Image, ImageTk, ImageDraw, ImageEnhance
-import numpy as np
+from tkinter import filedialog, messagebox, simpledialog, ttk
+import importlib
+import math
 import os
-import json
-from datetime import datetime
+import threading
+
+# Only what the first window needs is imported here. The engine (NumPy,
+# Pillow and the dice_art modules built on them) is imported by the methods
+# that use it, and preloaded in the background once the window is drawn;
+# see benchmarks/bench_startup.py.
+from dice_art.jobs import JobRunner
+from dice_art.options import DICE_COLORS, DICE_FACES, MAPPINGS, parse_panel
+from dice_art.profiling import profiled
+
+
+# Thumbnail size on the GUI's contact sheet
+SWEEP_THUMB_PX = 120
+
+# Modules preloaded after startup, so the first image load doesn't wait for them
+PRELOAD_MODULES = ("PIL.ImageTk", "dice_art.preview", "dice_art.stages", "dice_art.viewport", "dice_art.editing")
+
+
+def preload_modules():
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
 
 
 class EnhancedDiceArtGenerator:
@@ -27,23 +46,38 @@ class EnhancedDiceArtGenerator:
 
         # Variables
         self.image_path = ""
+        self.preview_source = None  # Decoded source with cached preview copy
+        self._stages = None  # Memoized adjust/resample/quantize results for the source, made on first use
+        self._preview_job = None
+        self._view_redraw = None
+        self._drag_from = None
+        self.mosaic_view = None  # Pan/zoom viewport over the dice grid
         self.dice_grid = None
+        self.editor = None  # Edit history of the current dice grid
+        self._edit_from = None
         self.total_dice = 0
         self.dice_width = tk.IntVar(value=30)
         self.dice_size = tk.IntVar(value=20)  # Size of each die in preview
         self.dice_color = tk.StringVar(value="white")
         self.brightness = tk.DoubleVar(value=1.0)
         self.contrast = tk.DoubleVar(value=1.0)
+        self.mapping = tk.StringVar(value="linear")
+        self.palette_schemes = tk.StringVar(value="white, black")  # Used by the palette mapping
+        self.show_metrics = tk.BooleanVar(value=False)  # Fidelity metrics in the status bar, computed on demand
+        self.inventory_text = "white=2000, black=2000"
+        self.sweep_text = {"widths": "20:100:5", "brightness": "0.8:1.2:5", "contrast": "0.8:1.2:5", "colors": ""}
+        self.edit_tool = tk.StringVar(value="pan")  # Left button on the dice preview: pan, brush or rect
+        self.edit_action = tk.StringVar(value="adjust")
+        self.edit_brightness = tk.DoubleVar(value=1.3)
+        self.edit_contrast = tk.DoubleVar(value=1.0)
+        self.pin_face = tk.IntVar(value=1)
+        self.brush_radius = tk.IntVar(value=2)
         self.preview_size = 300
         self.dice_values = [1, 2, 3, 4, 5, 6]
-        self.dice_colors = {
-            "white": ("#e0e0e0", "#2c3e50"),
-            "black": ("#2c3e50", "#e0e0e0"),
-            "wood": ("#d2b48c", "#2c3e50"),
-            "red": ("#e74c3c", "#f9e9e8"),
-            "blue": ("#3498db", "#eaf4fc")
-        }
+        self.dice_colors = DICE_COLORS
         self.current_project = None
+        self.jobs = JobRunner(root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Create main frames
         self.control_frame = ttk.Frame(root, padding=10)
@@ -123,6 +157,22 @@ class EnhancedDiceArtGenerator:
         color_combo.pack(fill=tk.X, padx=5, pady=2)
         color_combo.bind("<<ComboboxSelected>>", self.update_dice_preview)
 
+        ttk.Label(dice_frame, text="Mapping:").pack(anchor="w", padx=5, pady=(5, 0))
+        mapping_combo = ttk.Combobox(
+            dice_frame,
+            textvariable=self.mapping,
+            state="readonly",
+            width=10
+        )
+        mapping_combo['values'] = MAPPINGS
+        mapping_combo.pack(fill=tk.X, padx=5, pady=2)
+        mapping_combo.bind("<<ComboboxSelected>>", lambda event: self.jobs.cancel("generate dice art"))
+
+        ttk.Label(dice_frame, text="Palette (mixed schemes):").pack(anchor="w", padx=5, pady=(5, 0))
+        ttk.Entry(dice_frame, textvariable=self.palette_schemes).pack(fill=tk.X, padx=5, pady=2)
+        ttk.Checkbutton(dice_frame, text="Show fidelity metrics",
+                        variable=self.show_metrics).pack(anchor="w", padx=5, pady=2)
+
         ttk.Label(dice_frame, text="Preview Dice Size:").pack(anchor="w", padx=5, pady=(5, 0))
         dice_size_slider = ttk.Scale(
             dice_frame,
@@ -135,6 +185,11 @@ class EnhancedDiceArtGenerator:
         self.dice_size_label = ttk.Label(dice_frame, text=f"Dice Size: {self.dice_size.get()}px")
         self.dice_size_label.pack(anchor="w", padx=5)
 
+        # Region editing on the dice art preview; filled in by finish_startup
+        self.edit_frame = ttk.LabelFrame(self.control_frame, text="Edit Region")
+        self.edit_frame.pack(fill=tk.X, pady=5)
+        self.undo_button = self.redo_button = None
+
         # Dice preview
         ttk.Label(self.control_frame, text="Dice Preview:").pack(anchor="w", pady=(15, 0))
         self.dice_preview_frame = ttk.Frame(self.control_frame, height=120, width=120, relief="solid")
@@ -164,26 +219,20 @@ class EnhancedDiceArtGenerator:
             command=self.export_dice_grid
         ).pack(side=tk.LEFT, fill=tk.X, expand=True)
 
-        # Advanced export
-        adv_frame = ttk.LabelFrame(self.control_frame, text="Advanced Export")
-        adv_frame.pack(fill=tk.X, pady=10)
-
-        ttk.Button(
-            adv_frame,
-            text="Export as Image",
-            command=self.export_image
-        ).pack(fill=tk.X, padx=5, pady=2)
-
-        ttk.Button(
-            adv_frame,
-            text="Generate Dice List",
-            command=self.generate_dice_list
-        ).pack(fill=tk.X, padx=5, pady=2)
+        # Advanced export; filled in by finish_startup
+        self.adv_frame = ttk.LabelFrame(self.control_frame, text="Advanced Export")
+        self.adv_frame.pack(fill=tk.X, pady=10)
 
-        # Status bar
+        # Status bar with job progress and cancellation
+        status_frame = ttk.Frame(root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
         self.status_var = tk.StringVar(value="Ready")
-        status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", command=self.cancel_jobs, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(status_frame, variable=self.progress_var, maximum=100, length=150).pack(side=tk.RIGHT, padx=5)
 
         # Preview area
         preview_top = ttk.Frame(self.preview_frame)
@@ -216,16 +265,184 @@ class EnhancedDiceArtGenerator:
                                         background="#34495e", foreground="#bdc3c7")
         self.dice_img_label.place(relx=0.5, rely=0.5, anchor="center")
 
+        # Drag to pan (or edit, with an edit tool selected), wheel to zoom, double-click to fit
+        self.dice_img_canvas.bind("<Configure>", self.on_view_resized)
+        self.dice_img_canvas.bind("<ButtonPress-1>", self.on_view_press)
+        self.dice_img_canvas.bind("<B1-Motion>", self.on_view_drag)
+        self.dice_img_canvas.bind("<ButtonRelease-1>", self.on_view_release)
+        self.dice_img_canvas.bind("<Double-Button-1>", self.on_view_fit)
+        self.dice_img_canvas.bind("<MouseWheel>", self.on_view_wheel)
+        self.dice_img_canvas.bind("<Button-4>", self.on_view_wheel)
+        self.dice_img_canvas.bind("<Button-5>", self.on_view_wheel)
+
+        # Show the window first; the rest of startup runs once it is drawn
+        self.root.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Second startup phase: panels not needed to paint the first window, then engine preloading"""
+        self.build_edit_panel(self.edit_frame)
+        self.build_advanced_panel(self.adv_frame)
+        self.update_edit_buttons()
+
         # Draw initial dice preview
         self.draw_dice_preview(3)
+        threading.Thread(target=preload_modules, name="preload", daemon=True).start()
+
+    def build_edit_panel(self, frame):
+        tool_row = ttk.Frame(frame)
+        tool_row.pack(fill=tk.X, padx=5, pady=2)
+        for text, value in (("Pan", "pan"), ("Brush", "brush"), ("Rectangle", "rect")):
+            ttk.Radiobutton(tool_row, text=text, value=value, variable=self.edit_tool).pack(side=tk.LEFT)
+        ttk.Label(tool_row, text="Radius:").pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Spinbox(tool_row, from_=0, to=20, width=3, textvariable=self.brush_radius).pack(side=tk.LEFT)
+
+        adjust_row = ttk.Frame(frame)
+        adjust_row.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Radiobutton(adjust_row, text="Adjust", value="adjust", variable=self.edit_action).pack(side=tk.LEFT)
+        ttk.Label(adjust_row, text="B:").pack(side=tk.LEFT)
+        ttk.Spinbox(adjust_row, from_=0.5, to=2.0, increment=0.1, width=4,
+                    textvariable=self.edit_brightness).pack(side=tk.LEFT)
+        ttk.Label(adjust_row, text="C:").pack(side=tk.LEFT)
+        ttk.Spinbox(adjust_row, from_=0.5, to=2.0, increment=0.1, width=4,
+                    textvariable=self.edit_contrast).pack(side=tk.LEFT)
+
+        pin_row = ttk.Frame(frame)
+        pin_row.pack(fill=tk.X, padx=5, pady=2)
+        ttk.Radiobutton(pin_row, text="Pin face", value="pin", variable=self.edit_action).pack(side=tk.LEFT)
+        ttk.Spinbox(pin_row, from_=1, to=6, width=3, textvariable=self.pin_face).pack(side=tk.LEFT)
+        self.redo_button = ttk.Button(pin_row, text="Redo", command=self.redo_edit, state=tk.DISABLED)
+        self.redo_button.pack(side=tk.RIGHT)
+        self.undo_button = ttk.Button(pin_row, text="Undo", command=self.undo_edit, state=tk.DISABLED)
+        self.undo_button.pack(side=tk.RIGHT, padx=2)
+        self.root.bind("<Control-z>", self.undo_edit)
+        self.root.bind("<Control-y>", self.redo_edit)
+
+    def build_advanced_panel(self, frame):
+        ttk.Button(
+            frame,
+            text="Export as Image",
+            command=self.export_image
+        ).pack(fill=tk.X, padx=5, pady=2)
+
+        ttk.Button(
+            frame,
+            text="Import Dice Grid...",
+            command=self.import_dice_grid
+        ).pack(fill=tk.X, padx=5, pady=2)
+
+        ttk.Button(
+            frame,
+            text="Export Build Plan...",
+            command=self.export_build_plan
+        ).pack(fill=tk.X, padx=5, pady=2)
+
+        ttk.Button(
+            frame,
+            text="Export Animation...",
+            command=self.export_animation
+        ).pack(fill=tk.X, padx=5, pady=2)
+
+        ttk.Button(
+            frame,
+            text="Generate Dice List",
+            command=self.generate_dice_list
+        ).pack(fill=tk.X, padx=5, pady=2)
+
+        ttk.Button(
+            frame,
+            text="Fit to Inventory...",
+            command=self.fit_to_inventory
+        ).pack(fill=tk.X, padx=5, pady=2)
+
+        ttk.Button(
+            frame,
+            text="Parameter Sweep...",
+            command=self.parameter_sweep
+        ).pack(fill=tk.X, padx=5, pady=2)
+
+        ttk.Button(
+            frame,
+            text="Auto-Tune",
+            command=self.tune_settings
+        ).pack(fill=tk.X, padx=5, pady=2)
 
     def set_status(self, message):
         self.status_var.set(message)
         self.root.update_idletasks()
 
+    def has_image(self):
+        return self.preview_source is not None
+
+    @property
+    def stages(self):
+        if self._stages is None:
+            from dice_art.stages import StageCache
+            self._stages = StageCache()
+        return self._stages
+
+    def set_source(self, preview_source):
+        self.jobs.cancel()
+        self.preview_source = preview_source
+        if preview_source is None:
+            self.stages.set_source(None)
+        elif preview_source.decoded_image is not None:
+            # A project's embedded image, even when its original file still exists
+            self.stages.set_source(preview_source.decoded_image)
+        else:
+            # Decoded on demand at the scale each grid width needs
+            self.stages.set_source(path=preview_source.path)
+
+    def start_job(self, name, fn, on_done, message):
+        """Run fn(job) on the worker thread and deliver its result to on_done"""
+        self.set_status(message)
+        self.progress_var.set(0)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.jobs.submit(
+            name, fn,
+            on_done=lambda result: self.finish_job(on_done, result),
+            on_progress=self.on_job_progress,
+            on_error=lambda error: self.on_job_error(name, error),
+            on_cancel=self.on_job_cancelled
+        )
+
+    def finish_job(self, on_done, result):
+        self.progress_var.set(100)
+        self.update_cancel_button()
+        on_done(result)
+
+    def on_job_progress(self, fraction, message=""):
+        self.progress_var.set(fraction * 100)
+        if message:
+            self.set_status(message)
+
+    def on_job_error(self, name, error):
+        self.progress_var.set(0)
+        self.update_cancel_button()
+        messagebox.showerror("Error", f"Failed to {name}: {str(error)}")
+        self.set_status(f"Error: could not {name}")
+
+    def on_job_cancelled(self):
+        self.progress_var.set(0)
+        self.update_cancel_button()
+        self.set_status("Cancelled")
+
+    def update_cancel_button(self):
+        self.cancel_button.config(state=tk.NORMAL if self.jobs.busy() else tk.DISABLED)
+
+    def cancel_jobs(self):
+        self.jobs.cancel()
+
+    def on_close(self):
+        self.jobs.shutdown()
+        self.root.destroy()
+
     def new_project(self):
+        self.jobs.cancel()
         self.image_path = ""
+        self.set_source(None)
         self.dice_grid = None
+        self.set_editor(None)
+        self.mosaic_view = None
         self.total_dice = 0
         self.img_path_label.config(text="No image selected")
         self.orig_img_canvas.delete("all")
@@ -237,7 +454,7 @@ class EnhancedDiceArtGenerator:
         self.current_project = None
 
     def save_project(self):
-        if not self.image_path or not self.dice_grid:
+        if self.dice_grid is None:
             messagebox.showwarning("No Data", "No dice art to save")
             return
 
@@ -246,19 +463,20 @@ class EnhancedDiceArtGenerator:
             filetypes=[("Dice Art Project", "*.diceproj"), ("All Files", "*.*")]
         )
         if file_path:
+            from dice_art.project import EMBED_MAX_SIZE, DiceProject, save_project
             try:
-                project_data = {
-                    "image_path": self.image_path,
-                    "dice_width": self.dice_width.get(),
-                    "dice_color": self.dice_color.get(),
-                    "brightness": self.brightness.get(),
-                    "contrast": self.contrast.get(),
-                    "dice_grid": self.dice_grid,
-                    "total_dice": self.total_dice
-                }
-
-                with open(file_path, "w") as f:
-                    json.dump(project_data, f)
+                project = DiceProject(
+                    self.dice_grid,
+                    self.dice_width.get(),
+                    self.dice_color.get(),
+                    self.brightness.get(),
+                    self.contrast.get(),
+                    self.mapping.get(),
+                    source=self.preview_source.image_at((EMBED_MAX_SIZE, EMBED_MAX_SIZE)) if self.has_image() else None,
+                    image_path=self.image_path
+                )
+                with profiled("save project"):
+                    save_project(file_path, project)
 
                 self.current_project = file_path
                 self.set_status(f"Project saved to {file_path}")
@@ -270,25 +488,35 @@ class EnhancedDiceArtGenerator:
             filetypes=[("Dice Art Project", "*.diceproj"), ("All Files", "*.*")]
         )
         if file_path:
+            from dice_art.editing import GridEditor
+            from dice_art.preview import PreviewSource
+            from dice_art.project import load_project
             try:
-                with open(file_path, "r") as f:
-                    project_data = json.load(f)
-
-                self.image_path = project_data["image_path"]
-                self.dice_width.set(project_data["dice_width"])
-                self.dice_color.set(project_data["dice_color"])
-                self.brightness.set(project_data["brightness"])
-                self.contrast.set(project_data["contrast"])
-                self.dice_grid = project_data["dice_grid"]
-                self.total_dice = project_data["total_dice"]
+                # Not memory-mapped: Windows cannot save over a file while it is mapped
+                with profiled("load project"):
+                    project = load_project(file_path, mmap=False)
+
+                self.image_path = project.image_path
+                source = project.source
+                self.set_source(PreviewSource(source, self.preview_size, project.image_path) if source else None)
+                self.dice_width.set(project.dice_width)
+                self.dice_color.set(project.dice_color)
+                self.brightness.set(project.brightness)
+                self.contrast.set(project.contrast)
+                self.mapping.set(project.mapping)
+                self.dice_grid = project.grid
+                # The parameters are saved but not the palette, so saved grids are edited by pinning
+                self.set_editor(GridEditor(project.grid))
+                self.total_dice = project.total_dice
 
                 # Update UI
-                self.img_path_label.config(text=os.path.basename(self.image_path))
-                self.display_image(self.image_path)
+                self.img_path_label.config(text=os.path.basename(self.image_path) or "Embedded image")
+                if self.has_image():
+                    self.display_image()
                 self.update_size_label()
                 self.dice_count_label.config(text=f"Total Dice: {self.total_dice}")
                 self.create_dice_art_preview()
-                self.draw_dice_preview(self.dice_grid[0][0])
+                self.draw_dice_preview(self.dice_grid.face(0, 0))
                 self.current_project = file_path
                 self.set_status(f"Project loaded: {file_path}")
             except Exception as e:
@@ -299,20 +527,24 @@ class EnhancedDiceArtGenerator:
             filetypes=[("Image Files", "*.jpg *.jpeg *.png *.bmp *.gif")]
         )
         if file_path:
+            from dice_art.preview import PreviewSource
+            try:
+                with profiled("load image"):
+                    self.set_source(PreviewSource.open(file_path, self.preview_size))
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load image: {str(e)}")
+                return
             self.image_path = file_path
             self.img_path_label.config(text=os.path.basename(file_path))
-            self.display_image(file_path)
+            self.display_image()
             self.update_size_label()
             self.set_status(f"Loaded image: {os.path.basename(file_path)}")
 
-    def display_image(self, path):
+    def display_image(self):
+        from PIL import ImageTk
         try:
-            img = Image.open(path)
-
-            # Apply adjustments
-            img = self.apply_adjustments(img)
-
-            img.thumbnail((self.preview_size, self.preview_size))
+            # Adjust the cached preview-resolution copy through a single LUT
+            img = self.preview_source.adjusted(self.brightness.get(), self.contrast.get())
             self.tk_img = ImageTk.PhotoImage(img)
 
             # Clear canvas and display image
@@ -327,63 +559,53 @@ class EnhancedDiceArtGenerator:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {str(e)}")
 
-    def apply_adjustments(self, img):
-        """Apply brightness and contrast adjustments to image"""
-        # Convert to RGB for adjustments
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-
-        # Apply brightness
-        enhancer = ImageEnhance.Brightness(img)
-        img = enhancer.enhance(self.brightness.get())
-
-        # Apply contrast
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(self.contrast.get())
+    def preview_adjustments(self, *args):
+        # A running generation no longer matches the sliders
+        self.jobs.cancel("generate dice art")
 
-        return img
+        # Coalesce rapid slider events into a single refresh
+        from dice_art.preview import PREVIEW_DEBOUNCE_MS
+        if self._preview_job is not None:
+            self.root.after_cancel(self._preview_job)
+        self._preview_job = self.root.after(PREVIEW_DEBOUNCE_MS, self.refresh_preview)
 
-    def preview_adjustments(self, *args):
-        if self.image_path:
-            self.display_image(self.image_path)
+    def refresh_preview(self):
+        self._preview_job = None
+        if self.has_image():
+            self.display_image()
 
     def update_size_label(self, *args):
-        if not self.image_path:
+        self.jobs.cancel("generate dice art")
+        if not self.has_image():
             self.size_label.config(text="Grid Size: 30 x ?")
             return
 
+        from dice_art.quantize import grid_dimensions
         try:
-            with Image.open(self.image_path) as img:
-                width = self.dice_width.get()
-                aspect_ratio = img.height / img.width
-                height = max(1, round(width * aspect_ratio))
-                self.size_label.config(text=f"Grid Size: {width} x {height}")
+            width, height = grid_dimensions(self.preview_source.size, self.dice_width.get())
+            self.size_label.config(text=f"Grid Size: {width} x {height}")
         except:
             self.size_label.config(text="Grid Size: 30 x ?")
 
     def update_dice_size(self, *args):
         self.dice_size_label.config(text=f"Dice Size: {int(self.dice_size.get())}px")
-        if self.dice_grid:
-            self.create_dice_art_preview()
+        if self.mosaic_view is not None:
+            self.mosaic_view.set_zoom(self.dice_size.get())
+            self.schedule_view_redraw()
 
     def update_dice_preview(self, *args):
-        if self.dice_grid:
-            self.draw_dice_preview(self.dice_grid[0][0] if self.dice_grid else 3)
-            self.create_dice_art_preview()
+        if self.dice_grid is not None:
+            self.draw_dice_preview(self.dice_grid.face(0, 0))
+            if self.mosaic_view is not None:
+                # Only the render stage depends on the color: re-render what is on screen
+                self.mosaic_view.set_grid(self.dice_grid, self.dice_color.get())
+                self.schedule_view_redraw()
+            else:
+                self.create_dice_art_preview()
 
     def draw_dice_preview(self, value):
         self.dice_preview_canvas.delete("all")
 
-        # Dice face representations
-        dice_faces = {
-            1: [(0.5, 0.5)],
-            2: [(0.3, 0.3), (0.7, 0.7)],
-            3: [(0.3, 0.3), (0.5, 0.5), (0.7, 0.7)],
-            4: [(0.3, 0.3), (0.3, 0.7), (0.7, 0.3), (0.7, 0.7)],
-            5: [(0.3, 0.3), (0.3, 0.7), (0.5, 0.5), (0.7, 0.3), (0.7, 0.7)],
-            6: [(0.3, 0.3), (0.3, 0.5), (0.3, 0.7), (0.7, 0.3), (0.7, 0.5), (0.7, 0.7)]
-        }
-
         # Draw dice
         size = 100
         padding = 10
@@ -396,7 +618,7 @@ class EnhancedDiceArtGenerator:
 
         # Draw dots
         dot_radius = 8
-        for x, y in dice_faces[value]:
+        for x, y in DICE_FACES[value]:
             self.dice_preview_canvas.create_oval(
                 (x * size) + padding - dot_radius,
                 (y * size) + padding - dot_radius,
@@ -406,138 +628,491 @@ class EnhancedDiceArtGenerator:
             )
 
     def generate_dice_art(self):
-        if not self.image_path:
+        if not self.has_image():
+            messagebox.showwarning("No Image", "Please load an image first")
+            return
+        from dice_art.editing import GridEditor
+        from dice_art.metrics import grid_metrics
+
+        # Snapshot parameters here; the worker never touches Tk variables
+        show_metrics = self.show_metrics.get()
+        stages = self.stages
+        width = self.dice_width.get()
+        brightness = self.brightness.get()
+        contrast = self.contrast.get()
+        mapping = self.mapping.get()
+        palette = [name.strip() for name in self.palette_schemes.get().split(",") if name.strip()]
+        color = self.dice_color.get()
+        view_size, view_state = self.view_snapshot()
+
+        def work(job):
+            # Apply adjustments; unchanged sliders reuse the cached image
+            stages.adjusted(brightness, contrast)
+            job.progress(0.5, "Quantizing...")
+
+            # Create dice grid (1=lightest, 6=darkest), reusing any cached stage
+            grid = stages.grid(width, brightness, contrast, mapping, color, palette)
+            editor = GridEditor(grid, stages.resampled(width, brightness, contrast, mapping), mapping, color, palette)
+            metrics = grid_metrics(stages, grid, width, brightness, contrast, color) if show_metrics else None
+            job.progress(0.7, "Rendering preview...")
+            return grid, self.prepare_view(grid, color, view_size, view_state), editor, metrics
+
+        self.start_job("generate dice art", work, self.on_dice_art_generated, "Generating dice art...")
+
+    def on_dice_art_generated(self, result):
+        from dice_art.metrics import format_metrics
+        self.dice_grid, prepared_view, editor, metrics = result
+        self.set_editor(editor)
+        self.total_dice = self.dice_grid.size
+        self.dice_count_label.config(text=f"Total Dice: {self.total_dice}")
+
+        # Show dice art preview
+        self.show_dice_art_preview(prepared_view, self.dice_grid)
+
+        # Update dice preview
+        self.draw_dice_preview(self.dice_grid.face(0, 0))
+
+        status = f"Dice art generated! Total dice: {self.total_dice}"
+        self.set_status(f"{status} | {format_metrics(metrics)}" if metrics else status)
+
+    def fit_to_inventory(self):
+        if not self.has_image():
             messagebox.showwarning("No Image", "Please load an image first")
             return
 
+        text = simpledialog.askstring(
+            "Fit to Inventory",
+            "Dice in stock per scheme (e.g. white=4000, black=2500):",
+            initialvalue=self.inventory_text,
+            parent=self.root
+        )
+        if not text:
+            return
+        from dice_art.inventory import fit_inventory, parse_inventory
+        from dice_art.metrics import grid_metrics
         try:
-            self.set_status("Generating dice art...")
-            # Open and process image
-            img = Image.open(self.image_path)
-            width = self.dice_width.get()
-            aspect_ratio = img.height / img.width
-            height = max(1, round(width * aspect_ratio))
-            self.total_dice = width * height
-            self.dice_count_label.config(text=f"Total Dice: {self.total_dice}")
-
-            # Apply adjustments
-            img = self.apply_adjustments(img)
-
-            # Convert to grayscale and resize
-            img = img.convert('L')
-            img = img.resize((width, height))
-
-            # Create dice grid
-            self.dice_grid = []
-            for y in range(height):
-                row = []
-                for x in range(width):
-                    brightness = img.getpixel((x, y))
-                    # Map brightness to dice value (1=lightest, 6=darkest)
-                    dice_value = 6 - int(brightness / 42.5)  # 255/6 ≈ 42.5
-                    dice_value = max(1, min(6, dice_value))
-                    row.append(dice_value)
-                self.dice_grid.append(row)
-
-            # Create dice art preview
-            self.create_dice_art_preview()
-
-            # Update dice preview
-            self.draw_dice_preview(self.dice_grid[0][0])
-
-            self.set_status(f"Dice art generated! Total dice: {self.total_dice}")
+            inventory = parse_inventory(text)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Invalid inventory: {str(e)}")
+            return
+        self.inventory_text = text
+
+        stages = self.stages
+        brightness = self.brightness.get()
+        contrast = self.contrast.get()
+        color = self.dice_color.get()
+        show_metrics = self.show_metrics.get()
+        view_size, view_state = self.view_snapshot()
+
+        def work(job):
+            adjusted = stages.adjusted(brightness, contrast)
+            job.progress(0.3, "Assigning dice...")
+            result = fit_inventory(adjusted, inventory, pyramid=stages.pyramid(brightness, contrast))
+            metrics = (grid_metrics(stages, result.grid, result.width, brightness, contrast, color)
+                       if show_metrics else None)
+            job.progress(0.7, "Rendering preview...")
+            return result, self.prepare_view(result.grid, color, view_size, view_state), metrics
+
+        self.start_job("generate dice art", work, self.on_inventory_fitted, "Fitting to inventory...")
+
+    def on_inventory_fitted(self, result):
+        from dice_art.editing import GridEditor
+        fitted, prepared_view, metrics = result
+        self.dice_width.set(fitted.width)
+        # Re-quantizing would ignore the stock, so fitted grids are edited by pinning
+        self.on_dice_art_generated((fitted.grid, prepared_view, GridEditor(fitted.grid), metrics))
+        messagebox.showinfo("Inventory Fit", fitted.report())
+
+    def parameter_sweep(self):
+        if not self.has_image():
+            messagebox.showwarning("No Image", "Please load an image first")
+            return
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate dice art: {str(e)}")
-            self.set_status("Error generating dice art")
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Parameter Sweep")
+        dialog.transient(self.root)
+        ttk.Label(dialog, text="Values as a list (20 40 60) or start:stop:count (20:100:5)").grid(
+            row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky="w")
+        fields = {}
+        labels = (("widths", "Grid widths:"), ("brightness", "Brightness:"), ("contrast", "Contrast:"),
+                  ("colors", "Dice colors:"))
+        for row, (key, label) in enumerate(labels, start=1):
+            ttk.Label(dialog, text=label).grid(row=row, column=0, padx=10, pady=2, sticky="w")
+            fields[key] = tk.StringVar(value=self.sweep_text[key] or self.dice_color.get())
+            ttk.Entry(dialog, textvariable=fields[key], width=30).grid(row=row, column=1, padx=10, pady=2)
+
+        def run():
+            from dice_art.sweep import parse_values
+            try:
+                values = {
+                    "widths": parse_values(fields["widths"].get(), int),
+                    "brightness": parse_values(fields["brightness"].get()),
+                    "contrast": parse_values(fields["contrast"].get()),
+                    "colors": fields["colors"].get().replace(",", " ").split(),
+                }
+                unknown = set(values["colors"]) - set(self.dice_colors)
+                if unknown:
+                    raise ValueError(f"Unknown dice color(s): {', '.join(sorted(unknown))}")
+                if not values["colors"] or min(values["widths"]) < 1:
+                    raise ValueError("Give at least one color and widths of 1 or more")
+            except ValueError as e:
+                messagebox.showerror("Invalid Sweep", str(e), parent=dialog)
+                return
+            self.sweep_text = {key: var.get() for key, var in fields.items()}
+            dialog.destroy()
+            self.start_sweep(**values)
+
+        ttk.Button(dialog, text="Run Sweep", command=run).grid(row=len(labels) + 1, column=1, padx=10, pady=10,
+                                                               sticky="e")
+
+    def start_sweep(self, widths, brightness, contrast, colors):
+        from dice_art.sweep import contact_sheet, run_sweep
+        # A project's embedded image wins over its original file, as in set_source
+        source = self.preview_source.decoded_image
+        if source is None:
+            source = self.preview_source.path
+        mapping = self.mapping.get()
+        palette = [name.strip() for name in self.palette_schemes.get().split(",") if name.strip()]
+        total = len(widths) * len(brightness) * len(contrast) * len(colors)
+
+        # Threads rather than processes: nothing is forked from the GUI
+        def work(job):
+            entries = run_sweep(
+                source, widths, brightness, contrast, (mapping,), colors, palette, processes=False,
+                thumb_px=SWEEP_THUMB_PX,
+                progress=lambda fraction: job.progress(fraction, f"Sweeping {total} combinations..."))
+            return entries, contact_sheet(entries, thumb_px=SWEEP_THUMB_PX)
+
+        self.start_job("parameter sweep", work, self.on_sweep_finished, f"Sweeping {total} combinations...")
+
+    def on_sweep_finished(self, result):
+        from PIL import ImageTk
+        from dice_art.sweep import sheet_entry
+        entries, sheet = result
+        self.set_status(f"Sweep finished: {len(entries)} combinations")
+
+        window = tk.Toplevel(self.root)
+        window.title("Parameter Sweep - click a thumbnail to use its settings")
+        window.geometry(f"{min(sheet.width + 20, 1100)}x{min(sheet.height + 50, 750)}")
+        canvas = tk.Canvas(window, bg="#34495e", highlightthickness=0,
+                           scrollregion=(0, 0, sheet.width, sheet.height))
+        scroll_y = ttk.Scrollbar(window, orient=tk.VERTICAL, command=canvas.yview)
+        scroll_x = ttk.Scrollbar(window, orient=tk.HORIZONTAL, command=canvas.xview)
+        canvas.configure(yscrollcommand=scroll_y.set, xscrollcommand=scroll_x.set)
+        ttk.Button(window, text="Save Sheet", command=lambda: self.save_contact_sheet(sheet)).pack(
+            side=tk.BOTTOM, pady=5)
+        scroll_x.pack(side=tk.BOTTOM, fill=tk.X)
+        scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas.pack(fill=tk.BOTH, expand=True)
+        window.sheet_img = ImageTk.PhotoImage(sheet)
+        canvas.create_image(0, 0, image=window.sheet_img, anchor="nw")
+
+        def on_click(event):
+            entry = sheet_entry(entries, None, canvas.canvasx(event.x), canvas.canvasy(event.y), SWEEP_THUMB_PX)
+            if entry is not None:
+                self.apply_sweep_entry(entry)
+        canvas.bind("<Button-1>", on_click)
+
+    def tune_settings(self):
+        if not self.has_image():
+            messagebox.showwarning("No Image", "Please load an image first")
+            return
+        from dice_art.editing import GridEditor
+        from dice_art.metrics import auto_tune
+
+        stages = self.stages
+        width = self.dice_width.get()
+        color = self.dice_color.get()
+        # Palette matching is only a candidate when the user has chosen it
+        palette = None
+        if self.mapping.get() == "palette":
+            palette = [name.strip() for name in self.palette_schemes.get().split(",") if name.strip()]
+        view_size, view_state = self.view_snapshot()
+
+        def work(job):
+            best, results, grid = auto_tune(
+                stages, width, color, palette,
+                progress=lambda fraction: job.progress(fraction, "Searching settings..."))
+            # The stage cache holds only the last few combinations, so the
+            # winning grid is kept rather than generated again
+            brightness, contrast, mapping = best
+            editor = GridEditor(grid, stages.resampled(width, brightness, contrast, mapping), mapping, color, palette)
+            prepared_view = self.prepare_view(grid, color, view_size, view_state)
+            return best, (grid, prepared_view, editor, results[best])
+
+        self.start_job("auto-tune", work, self.on_auto_tuned, "Searching settings...")
+
+    def on_auto_tuned(self, result):
+        (brightness, contrast, mapping), generated = result
+        self.brightness.set(brightness)
+        self.contrast.set(contrast)
+        self.mapping.set(mapping)
+        self.refresh_preview()
+        self.on_dice_art_generated(generated)
+
+    def apply_sweep_entry(self, entry):
+        """Move the controls to a sweep combination and show its grid"""
+        self.dice_width.set(entry.width)
+        self.brightness.set(entry.brightness)
+        self.contrast.set(entry.contrast)
+        self.mapping.set(entry.mapping)
+        self.dice_color.set(entry.color)
+        self.update_size_label()
+        self.refresh_preview()
+        # Regenerated through the GUI's stage cache, so the grid can be edited and exported
+        self.generate_dice_art()
+
+    def save_contact_sheet(self, sheet):
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".png",
+            filetypes=[("PNG Files", "*.png"), ("JPEG Files", "*.jpg"), ("All Files", "*.*")]
+        )
+        if file_path:
+            try:
+                sheet.save(file_path)
+                self.set_status(f"Contact sheet saved to {file_path}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save file: {str(e)}")
 
     def create_dice_art_preview(self):
-        if not self.dice_grid:
+        if self.dice_grid is None:
             return
 
-        # Create a new image for the dice art preview
-        dice_size = int(self.dice_size.get())  # Size of each die in preview
-        height = len(self.dice_grid)
-        width = len(self.dice_grid[0])
+        grid = self.dice_grid
+        color = self.dice_color.get()
+        view_size, view_state = self.view_snapshot()
+        self.start_job(
+            "render preview",
+            lambda job: self.prepare_view(grid, color, view_size, view_state),
+            self.on_preview_rendered,
+            "Rendering preview..."
+        )
 
-        # Create a blank image
-        preview_img = Image.new("RGB", (width * dice_size, height * dice_size), "#34495e")
+    def on_preview_rendered(self, prepared_view):
+        self.show_dice_art_preview(prepared_view, self.dice_grid)
+        self.set_status("Preview updated")
+
+    def view_snapshot(self):
+        """Return the preview canvas size and the current pan/zoom, read on the main thread"""
+        width, height = self.dice_img_canvas.winfo_width(), self.dice_img_canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            width = height = self.preview_size
+        state = self.mosaic_view.state() if self.mosaic_view is not None else None
+        return (width, height), state
+
+    def prepare_view(self, grid, color, view_size, view_state):
+        """Build a viewport and its first frame (safe off the main thread)
+
+        Returns None when the current viewport shows a grid of the same shape
+        and color; show_dice_art_preview then repaints just the changed cells.
+        """
+        if view_state and tuple(view_state["shape"]) == grid.shape and view_state["scheme"] == color:
+            return None
+        from dice_art.viewport import MosaicViewport
+        view = MosaicViewport(grid, color, view_size)
+        view.restore(view_state)
+        return view, view.render()
+
+    def show_dice_art_preview(self, prepared_view, grid=None):
+        if prepared_view is None and self.mosaic_view is not None:
+            self.mosaic_view.update_grid(grid)
+            self.schedule_view_redraw()
+        elif prepared_view is None:
+            from dice_art.viewport import MosaicViewport
+            self.mosaic_view = MosaicViewport(grid, self.dice_color.get(), self.view_snapshot()[0])
+            self.draw_view_frame(self.mosaic_view.render())
+        else:
+            self.mosaic_view, frame = prepared_view
+            self.draw_view_frame(frame)
+        self.dice_img_label.place_forget()
 
-        # Draw each dice
-        for y in range(height):
-            for x in range(width):
-                dice_value = self.dice_grid[y][x]
-                self.draw_dice_on_image(preview_img, x * dice_size, y * dice_size, dice_size, dice_value)
+    def draw_view_frame(self, frame):
+        from PIL import ImageTk
+        self.dice_tk_img = ImageTk.PhotoImage(frame)
+        self.dice_img_canvas.delete("all")
+        self.dice_img_canvas.create_image(0, 0, image=self.dice_tk_img, anchor="nw")
+
+    def schedule_view_redraw(self):
+        # Coalesce bursts of drag and wheel events into one redraw
+        if self._view_redraw is None:
+            self._view_redraw = self.root.after_idle(self.redraw_view)
+
+    def redraw_view(self):
+        self._view_redraw = None
+        if self.mosaic_view is not None:
+            self.draw_view_frame(self.mosaic_view.render())
+
+    def on_view_resized(self, event):
+        if self.mosaic_view is not None:
+            self.mosaic_view.resize(event.width, event.height)
+            self.schedule_view_redraw()
+
+    def on_view_press(self, event):
+        self._drag_from = (event.x, event.y)
+        # Edits wait for running jobs, whose results would replace the grid
+        if self.edit_tool.get() == "pan" or self.editor is None or self.mosaic_view is None or self.jobs.busy():
+            return
+        self._edit_from = self.event_cell(event)
+        if self.edit_tool.get() == "brush":
+            self.editor.begin_stroke()
+            self.paint(self._edit_from, self._edit_from)
 
-        # Resize for display
-        preview_img.thumbnail((self.preview_size, self.preview_size))
-        self.dice_tk_img = ImageTk.PhotoImage(preview_img)
+    def on_view_drag(self, event):
+        if self.mosaic_view is None or self._drag_from is None:
+            return
+        if self._edit_from is not None:
+            cell = self.event_cell(event)
+            if self.edit_tool.get() == "brush":
+                self.paint(self._edit_from, cell)
+                self._edit_from = cell
+            else:
+                self.draw_selection(self._edit_from, cell)
+            return
+        self.mosaic_view.pan(event.x - self._drag_from[0], event.y - self._drag_from[1])
+        self._drag_from = (event.x, event.y)
+        self.schedule_view_redraw()
 
-        # Display on canvas
-        self.dice_img_canvas.delete("all")
-        self.dice_img_canvas.create_image(
-            self.preview_size / 2,
-            self.preview_size / 2,
-            image=self.dice_tk_img,
-            anchor="center"
+    def on_view_release(self, event):
+        self._drag_from = None
+        if self._edit_from is None:
+            return
+        if self.edit_tool.get() == "brush":
+            self.editor.end_stroke()
+        else:
+            self.dice_img_canvas.delete("selection")
+            from dice_art.editing import rect_region
+            row, col = self.event_cell(event)
+            self.apply_edit(rect_region(self.dice_grid.shape, *self._edit_from, row, col))
+        self._edit_from = None
+        self.update_edit_buttons()
+
+    def event_cell(self, event):
+        """(row, col) of the grid cell under a canvas event"""
+        x, y = self.mosaic_view.to_grid(event.x, event.y)
+        return math.floor(y), math.floor(x)
+
+    def paint(self, start, end):
+        """Apply the brush along a drag from one cell to another"""
+        from dice_art.editing import brush_region
+        radius = max(0, self.brush_radius.get())
+        steps = max(abs(end[0] - start[0]), abs(end[1] - start[1])) // max(1, radius) + 1
+        for step in range(1, steps + 1):
+            row = round(start[0] + (end[0] - start[0]) * step / steps)
+            col = round(start[1] + (end[1] - start[1]) * step / steps)
+            self.apply_edit(brush_region(self.dice_grid.shape, row, col, radius))
+
+    def draw_selection(self, start, end):
+        """Outline the cells of a rectangle drag on the dice art preview"""
+        view = self.mosaic_view
+        left, top = view.origin()
+        (row0, row1), (col0, col1) = sorted((start[0], end[0])), sorted((start[1], end[1]))
+        self.dice_img_canvas.delete("selection")
+        self.dice_img_canvas.create_rectangle(
+            col0 * view.zoom - left, row0 * view.zoom - top,
+            (col1 + 1) * view.zoom - left, (row1 + 1) * view.zoom - top,
+            outline="#e74c3c", width=2, dash=(4, 2), tags="selection"
         )
-        self.dice_img_label.place_forget()
 
-    def draw_dice_on_image(self, img, x, y, size, value):
-        from PIL import ImageDraw
+    def apply_edit(self, region):
+        """Pin or re-quantize the cells of a (box, mask) region"""
+        if self.edit_action.get() == "pin":
+            box = self.editor.pin(region, self.pin_face.get())
+        elif self.editor.can_adjust:
+            box = self.editor.adjust(region, self.edit_brightness.get(), self.edit_contrast.get())
+        else:
+            self.status_var.set("This grid was not generated here; use Pin face to edit it")
+            return
+        self.show_edited_grid(box)
 
-        draw = ImageDraw.Draw(img)
+    def show_edited_grid(self, box):
+        """Repaint only the cells of the editor's grid inside box"""
+        if box is None:
+            return
+        self.dice_grid = self.editor.grid
+        self.mosaic_view.update_grid(self.dice_grid, box)
+        self.schedule_view_redraw()
+
+    def undo_edit(self, event=None):
+        if self.editor is not None and self.mosaic_view is not None and not self.jobs.busy():
+            self.show_edited_grid(self.editor.undo())
+            self.update_edit_buttons()
+
+    def redo_edit(self, event=None):
+        if self.editor is not None and self.mosaic_view is not None and not self.jobs.busy():
+            self.show_edited_grid(self.editor.redo())
+            self.update_edit_buttons()
+
+    def set_editor(self, editor):
+        self.editor = editor
+        self._edit_from = None
+        self.update_edit_buttons()
+
+    def update_edit_buttons(self):
+        if self.undo_button is None:
+            return
+        editor = self.editor
+        self.undo_button.config(state=tk.NORMAL if editor is not None and editor.can_undo() else tk.DISABLED)
+        self.redo_button.config(state=tk.NORMAL if editor is not None and editor.can_redo() else tk.DISABLED)
 
-        # Dice colors
-        bg_color, dot_color = self.dice_colors.get(self.dice_color.get(), ("#e0e0e0", "#2c3e50"))
-        bg_rgb = tuple(int(bg_color.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4))
-        dot_rgb = tuple(int(dot_color.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4))
-
-        # Draw dice background
-        draw.rectangle([x, y, x + size - 1, y + size - 1], fill=bg_rgb, outline="#95a5a6")
-
-        # Dice face representations
-        dice_faces = {
-            1: [(0.5, 0.5)],
-            2: [(0.3, 0.3), (0.7, 0.7)],
-            3: [(0.3, 0.3), (0.5, 0.5), (0.7, 0.7)],
-            4: [(0.3, 0.3), (0.3, 0.7), (0.7, 0.3), (0.7, 0.7)],
-            5: [(0.3, 0.3), (0.3, 0.7), (0.5, 0.5), (0.7, 0.3), (0.7, 0.7)],
-            6: [(0.3, 0.3), (0.3, 0.5), (0.3, 0.7), (0.7, 0.3), (0.7, 0.5), (0.7, 0.7)]
-        }
+    def on_view_fit(self, event):
+        if self.mosaic_view is not None:
+            self.mosaic_view.fit()
+            self.schedule_view_redraw()
 
-        # Draw dots
-        dot_radius = size * 0.15
-        for pos in dice_faces[value]:
-            px = x + (pos[0] * size)
-            py = y + (pos[1] * size)
-            draw.ellipse(
-                [px - dot_radius, py - dot_radius,
-                 px + dot_radius, py + dot_radius],
-                fill=dot_rgb
-            )
+    def on_view_wheel(self, event):
+        if self.mosaic_view is None:
+            return
+        zoom_in = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.mosaic_view.zoom_by(1.25 if zoom_in else 0.8, event.x, event.y)
+        self.schedule_view_redraw()
 
     def export_dice_grid(self):
-        if not self.dice_grid:
+        if self.dice_grid is None:
             messagebox.showwarning("No Data", "Generate dice art first")
             return
 
         file_path = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+            filetypes=[("Text Files", "*.txt"), ("CSV Files", "*.csv"), ("JSON Files", "*.json"),
+                       ("Binary Dice Grid", "*.dgrid"), ("All Files", "*.*")]
         )
         if file_path:
+            from dice_art import pipeline
             try:
-                with open(file_path, "w") as f:
-                    for row in self.dice_grid:
-                        f.write(" ".join(map(str, row)) + "\n")
+                with profiled("export dice grid"):
+                    pipeline.export_dice_grid(self.dice_grid, file_path, self.dice_color.get())
                 messagebox.showinfo("Success", f"Dice grid saved to:\n{file_path}")
                 self.set_status(f"Dice grid exported to {file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {str(e)}")
 
+    def import_dice_grid(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Dice Grids", "*.txt *.csv *.json *.dgrid"), ("All Files", "*.*")]
+        )
+        if file_path:
+            from dice_art.editing import GridEditor
+            from dice_art.grid import load_grid
+            try:
+                grid = load_grid(file_path)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load dice grid: {str(e)}")
+                return
+
+            self.jobs.cancel("generate dice art")
+            self.dice_width.set(grid.width)
+            self.dice_grid = grid
+            # There is no source to re-quantize from, so imported grids are edited by pinning
+            self.set_editor(GridEditor(grid))
+            self.total_dice = grid.size
+            self.size_label.config(text=f"Grid Size: {grid.width} x {grid.height}")
+            self.dice_count_label.config(text=f"Total Dice: {self.total_dice}")
+            self.create_dice_art_preview()
+            self.draw_dice_preview(grid.face(0, 0))
+            self.set_status(f"Dice grid imported from {file_path}")
+
     def export_image(self):
-        if not self.dice_grid:
+        if self.dice_grid is None:
             messagebox.showwarning("No Data", "Generate dice art first")
             return
 
@@ -546,46 +1121,108 @@ class EnhancedDiceArtGenerator:
             filetypes=[("PNG Files", "*.png"), ("JPEG Files", "*.jpg"), ("All Files", "*.*")]
         )
         if file_path:
-            try:
-                self.set_status("Exporting image...")
-                dice_size = 20  # Use a fixed size for full export
-                height = len(self.dice_grid)
-                width = len(self.dice_grid[0])
-
-                # Create a blank image
-                export_img = Image.new("RGB", (width * dice_size, height * dice_size), "white")
-
-                # Draw each dice
-                for y in range(height):
-                    for x in range(width):
-                        dice_value = self.dice_grid[y][x]
-                        self.draw_dice_on_image(export_img, x * dice_size, y * dice_size, dice_size, dice_value)
-
-                export_img.save(file_path)
-                messagebox.showinfo("Success", f"Dice art image saved to:\n{file_path}")
-                self.set_status(f"Image exported to {file_path}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save image: {str(e)}")
+            from dice_art import pipeline
+            grid = self.dice_grid
+            color = self.dice_color.get()
 
-    def generate_dice_list(self):
-        if not self.dice_grid:
+            def work(job):
+                pipeline.export_image(grid, file_path, color,
+                                      progress=lambda fraction: job.progress(fraction, "Exporting image..."))
+                return file_path
+
+            self.start_job("export image", work, self.on_image_exported, "Exporting image...")
+
+    def on_image_exported(self, file_path):
+        messagebox.showinfo("Success", f"Dice art image saved to:\n{file_path}")
+        self.set_status(f"Image exported to {file_path}")
+
+    def export_build_plan(self):
+        if self.dice_grid is None:
             messagebox.showwarning("No Data", "Generate dice art first")
             return
 
-        # Count dice values
-        counts = {i: 0 for i in range(1, 7)}
-        for row in self.dice_grid:
-            for value in row:
-                counts[value] += 1
+        panel_text = simpledialog.askstring(
+            "Build Plan", "Dice per page (N or COLUMNSxROWS):", initialvalue="10", parent=self.root)
+        if not panel_text:
+            return
+        try:
+            panel = parse_panel(panel_text)
+        except ValueError as e:
+            messagebox.showerror("Invalid Panel Size", str(e))
+            return
 
-        # Create dice list text
-        dice_list = "Dice Requirements:\n"
-        dice_list += "------------------\n"
-        for value, count in counts.items():
-            dice_list += f"Dice {value}: {count}\n"
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF Files", "*.pdf"), ("SVG Files (one per page)", "*.svg")]
+        )
+        if file_path:
+            from dice_art.buildplan import export_build_plan
+            grid = self.dice_grid
+            color = self.dice_color.get()
+
+            def work(job):
+                return export_build_plan(
+                    grid, file_path, color, panel,
+                    progress=lambda fraction: job.progress(fraction, "Exporting build plan..."))
+
+            self.start_job("export build plan", work, self.on_build_plan_exported, "Exporting build plan...")
+
+    def on_build_plan_exported(self, paths):
+        if len(paths) == 1:
+            message = f"Build plan saved to:\n{paths[0]}"
+        else:
+            message = f"Build plan saved as {len(paths)} pages:\n{paths[0]} ..."
+        messagebox.showinfo("Success", message)
+        self.set_status(f"Build plan exported ({len(paths)} file(s))")
+
+    def export_animation(self):
+        if not self.image_path or not os.path.exists(self.image_path):
+            messagebox.showwarning("No Animation", "Load an animated GIF or PNG first")
+            return
+        from dice_art import animation
+        try:
+            frames = animation.source_frame_count(self.image_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to read frames: {str(e)}")
+            return
+        if frames < 2:
+            messagebox.showwarning("No Animation", "The loaded image has a single frame")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".gif",
+            filetypes=[("Animated GIF", "*.gif"), ("Animated PNG", "*.apng *.png")]
+        )
+        if file_path:
+            source = self.image_path
+            width = self.dice_width.get()
+            brightness = self.brightness.get()
+            contrast = self.contrast.get()
+            mapping = self.mapping.get()
+            palette = [name.strip() for name in self.palette_schemes.get().split(",") if name.strip()]
+            color = self.dice_color.get()
+
+            # Frames are quantized on this worker thread; no processes are forked from the GUI
+            def work(job):
+                animation.export_animation(
+                    source, file_path, width, brightness, contrast, mapping, color, palette,
+                    progress=lambda fraction: job.progress(fraction, f"Exporting {frames} frames..."))
+                return file_path
+
+            self.start_job("export animation", work, self.on_animation_exported, "Exporting animation...")
+
+    def on_animation_exported(self, file_path):
+        messagebox.showinfo("Success", f"Dice art animation saved to:\n{file_path}")
+        self.set_status(f"Animation exported to {file_path}")
+
+    def generate_dice_list(self):
+        if self.dice_grid is None:
+            messagebox.showwarning("No Data", "Generate dice art first")
+            return
 
-        dice_list += "------------------\n"
-        dice_list += f"Total Dice: {self.total_dice}\n"
+        from dice_art import pipeline
+        with profiled("generate dice list"):
+            dice_list = pipeline.format_dice_list(self.dice_grid, self.dice_color.get())
 
         # Show in a new window
         list_window = tk.Toplevel(self.root)